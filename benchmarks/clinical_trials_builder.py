@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Compare DataFrame construction strategies for ClinicalTrials.gov results.
+
+Runs the legacy list-of-dicts + ``drop_duplicates`` approach against
+:class:`retriever.Clinical_Trials_Retriever_Agent.StudyRecordBuilder` on
+synthetic study payloads and reports build time and peak traced memory::
+
+    python benchmarks/clinical_trials_builder.py --sizes 1000 10000 50000
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from retriever.Clinical_Trials_Retriever_Agent import (  # noqa: E402
+    TRIAL_COLUMNS,
+    StudyRecordBuilder,
+    _study_values,
+)
+
+
+def make_studies(count: int, duplicate_every: int = 20):
+    studies = []
+    for index in range(count):
+        nct_number = index - 1 if duplicate_every and index % duplicate_every == 0 and index else index
+        studies.append(
+            {
+                "protocolSection": {
+                    "identificationModule": {
+                        "nctId": f"NCT{nct_number:08d}",
+                        "briefTitle": f"Study of compound {index} in advanced solid tumours",
+                    },
+                    "statusModule": {"overallStatus": "RECRUITING"},
+                    "conditionsModule": {"conditions": ["Breast Cancer", "Metastatic Disease"]},
+                    "armsInterventionsModule": {
+                        "interventions": [{"name": f"Drug {index % 97}"}, {"name": "Placebo"}]
+                    },
+                    "designModule": {"phases": ["PHASE2"]},
+                }
+            }
+        )
+    return studies
+
+
+def build_legacy(studies):
+    rows = [dict(zip(TRIAL_COLUMNS, _study_values(study))) for study in studies]
+    return pd.DataFrame(rows).drop_duplicates(subset=["NCT Number"])
+
+
+def build_columnar(studies):
+    builder = StudyRecordBuilder(capacity=len(studies))
+    builder.extend(studies)
+    return builder.build()
+
+
+def measure(func, studies):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    df = func(studies)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(df), elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'studies':>8} {'strategy':>10} {'rows':>7} {'time (ms)':>10} {'peak (MiB)':>11}")
+    for size in args.sizes:
+        studies = make_studies(size)
+        for name, func in (("legacy", build_legacy), ("columnar", build_columnar)):
+            runs = [measure(func, studies) for _ in range(args.repeat)]
+            rows = runs[0][0]
+            best_time = min(run[1] for run in runs)
+            peak = min(run[2] for run in runs)
+            print(f"{size:>8} {name:>10} {rows:>7} {best_time * 1000:>10.1f} {peak / 2**20:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
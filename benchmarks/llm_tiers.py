@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""Compare LLM model tiers on a fixed query set for latency and accuracy.
+
+Each model answers the router, field-extraction, entity-extraction and
+combined prompts for every query in ``QUERIES``. For each model and task,
+the script reports the median and worst latency, how often the reply passed
+validation, and how often it matched the expected answer. The ``tiered``
+rows run the same prompts through :func:`utils.llm_tiers.run_with_escalation`,
+so they show the cost and accuracy of the configured escalation path::
+
+    python benchmarks/llm_tiers.py --models gemma2:2b gemma2:latest --repeat 3
+
+Calls bypass the gateway's concurrency limit, so run this against an
+otherwise idle Ollama server.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from main import _route_label, get_router_chain  # noqa: E402
+from query_parser.Clinical_Trials_Query_Parser_Agent import _validate_fields, get_keyword_chain  # noqa: E402
+from query_parser.combined_parser import _decode_analysis, get_combined_chain  # noqa: E402
+from query_parser.open_targets_query_parser import QueryParser, _validate_entities  # noqa: E402
+from utils.llm_tiers import models_for, run_with_escalation, tier_models  # noqa: E402
+
+# (query, route, expected trial fields, expected entities). Only the listed
+# fields and entities are scored; the comparison ignores case.
+QUERIES = [
+    (
+        "Recruiting phase 3 trials of semaglutide for heart failure in Denmark",
+        "clinical_trials",
+        {"Condition/Disease": "heart failure", "Intervention/Treatment/Drug": "semaglutide", "Location": "Denmark"},
+        {"drug": ["semaglutide"], "disease": ["heart failure"]},
+    ),
+    (
+        "Which drugs target EGFR in non-small cell lung cancer?",
+        "open_targets",
+        {"Condition/Disease": "non-small cell lung cancer"},
+        {"disease": ["non-small cell lung cancer"], "target": ["EGFR"]},
+    ),
+    (
+        "Completed studies of pembrolizumab in melanoma since 2018",
+        "clinical_trials",
+        {"Condition/Disease": "melanoma", "Intervention/Treatment/Drug": "pembrolizumab"},
+        {"drug": ["pembrolizumab"], "disease": ["melanoma"]},
+    ),
+    (
+        "Targets associated with Parkinson's disease and trials testing LRRK2 inhibitors",
+        "both",
+        {"Condition/Disease": "Parkinson's disease"},
+        {"disease": ["Parkinson's disease"], "target": ["LRRK2"]},
+    ),
+    (
+        "Is olaparib effective against BRCA-mutated ovarian cancer?",
+        "both",
+        {"Condition/Disease": "ovarian cancer", "Intervention/Treatment/Drug": "olaparib"},
+        {"drug": ["olaparib"], "disease": ["ovarian cancer"], "target": ["BRCA"]},
+    ),
+    (
+        "Trials at Mayo Clinic on long COVID fatigue outcomes",
+        "clinical_trials",
+        {"Facility Name": "Mayo Clinic", "Condition/Disease": "covid"},
+        {"disease": ["COVID"]},
+    ),
+    (
+        "Mechanism of action of metformin in type 2 diabetes",
+        "open_targets",
+        {"Intervention/Treatment/Drug": "metformin"},
+        {"drug": ["metformin"], "disease": ["type 2 diabetes"]},
+    ),
+    ("What is the weather in Paris tomorrow?", "none", {}, {}),
+]
+
+
+def _contains(actual, expected):
+    return bool(actual) and expected.lower() in str(actual).lower()
+
+
+def score_route(value, query):
+    return value == query[1]
+
+
+def score_fields(value, query):
+    expected = query[2]
+    return all(_contains(value.get(key), text) for key, text in expected.items())
+
+
+def score_entities(value, query):
+    expected = query[3]
+    return all(
+        any(_contains(found, text) for found in value.get(key, [])) for key, texts in expected.items() for text in texts
+    )
+
+
+def score_analysis(value, query):
+    return (
+        score_route(value.route, query)
+        and score_fields(value.fields, query)
+        and score_entities(value.entities, query)
+    )
+
+
+TASKS = {
+    "router": (get_router_chain, _route_label, score_route),
+    "ct-fields": (get_keyword_chain, _validate_fields, score_fields),
+    "ot-entities": (QueryParser().chain_for, _validate_entities, score_entities),
+    "combined": (get_combined_chain, _decode_analysis, score_analysis),
+}
+
+
+def run_direct(task, model, text):
+    chain_for, validate, _ = TASKS[task]
+    return validate(chain_for(model).run(text))
+
+
+def run_tiered(task, model, text):
+    chain_for, validate, _ = TASKS[task]
+    result = run_with_escalation(task, chain_for, validate, text)
+    return result.value if result else None
+
+
+def measure(runner, task, model, repeat):
+    score = TASKS[task][2]
+    latencies, valid, correct = [], 0, 0
+    for query in QUERIES:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            try:
+                value = runner(task, model, query[0])
+            except Exception:
+                value = None
+            latencies.append(time.perf_counter() - started)
+            if value is not None:
+                valid += 1
+                correct += bool(score(value, query))
+    total = len(QUERIES) * repeat
+    return statistics.median(latencies), max(latencies), valid / total, correct / total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", nargs="+", default=None, help="models to compare (default: configured tiers)")
+    parser.add_argument("--tasks", nargs="+", default=list(TASKS), choices=list(TASKS))
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    models = args.models or tier_models()
+    print(f"{'task':>12} {'model':>24} {'p50 (ms)':>9} {'max (ms)':>9} {'valid':>6} {'correct':>8}")
+    for task in args.tasks:
+        # An untimed first call per model keeps load time out of the figures.
+        for model in models:
+            try:
+                run_direct(task, model, QUERIES[0][0])
+            except Exception as exc:
+                print(f"{task:>12} {model:>24} unavailable: {exc}")
+                continue
+            p50, worst, valid, correct = measure(run_direct, task, model, args.repeat)
+            print(f"{task:>12} {model:>24} {p50 * 1000:>9.0f} {worst * 1000:>9.0f} {valid:>6.0%} {correct:>8.0%}")
+        label = "tiered:" + ">".join(models_for(task))
+        p50, worst, valid, correct = measure(run_tiered, task, None, args.repeat)
+        print(f"{task:>12} {label:>24} {p50 * 1000:>9.0f} {worst * 1000:>9.0f} {valid:>6.0%} {correct:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
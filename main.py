@@ -1,18 +1,16 @@
 # query_router.py
 
-from langchain.prompts import PromptTemplate
-from langchain_community.llms import Ollama
-from langchain.chains import LLMChain
-
 from open_targets_copy import run_pipeline as run_open_targets
 from Clinical_Trials_Controller_Agent_copy import run_controller as run_clinical_trials
 
 from rich.console import Console
 
-console = Console()
+from query_parser.combined_parser import analyze_query
+from query_parser.schemas import ROUTES
+from utils.llm import get_chain
+from utils.llm_tiers import run_with_escalation
 
-# === Initialize LLM ===
-llm = Ollama(model="gemma2:latest")
+console = Console()
 
 # === Router Prompt ===
 router_template = """
@@ -35,32 +33,37 @@ Query: {query}
 Answer:
 """
 
-router_prompt = PromptTemplate(
-    input_variables=["query"],
-    template=router_template,
-)
 
-router_chain = LLMChain(
-    llm=llm,
-    prompt=router_prompt
-)
+def get_router_chain(model=None):
+    """Return the shared router chain for ``model``, building the LLM on first use."""
+    # The answer is a single label, so a few tokens are plenty.
+    return get_chain("router", router_template, ["query"], model=model, num_predict=8)
+
+
+def _route_label(response):
+    label = (response or "").strip().lower()
+    return label if label in ROUTES else None
 
 
-class DBFinder:
-    def __init__(self):
-        self.llm_router = router_chain
+class DBFinder:
+    def __init__(self):
         self.last_classification = None
         self.last_resolution = None
         self.last_rationale = ""
 
+    @property
+    def llm_router(self):
+        return get_router_chain()
+
     def classify_query(self, query: str) -> str:
         try:
-            response = self.llm_router.run(query).strip().lower()
-            if response in {"clinical_trials", "open_targets", "both", "none"}:
-                self.last_rationale = f"Router classified query as '{response}'."
-                return response
+            # A small model labels the query; larger tiers only see bad labels.
+            routed = run_with_escalation("router", get_router_chain, _route_label, query)
+            if routed is not None:
+                self.last_rationale = f"Router ({routed.model}) classified query as '{routed.value}'."
+                return routed.value
             self.last_rationale = (
-                f"Router returned unexpected label '{response}'. Falling back to broad coverage."
+                "Router returned no valid label on any model tier. Falling back to broad coverage."
             )
             return "unknown"
         except Exception as e:
@@ -68,8 +71,27 @@ class DBFinder:
             self.last_rationale = f"Router error: {e}. Fallback engaged."
             return "unknown"
 
-    def route_and_query(self, query: str, progress_callback=None):
-        classification = self.classify_query(query)
+    def route_and_query(self, query: str, progress_callback=None, budgets=None):
+        """Route ``query`` and run the selected pipelines.
+
+        ``budgets`` optionally maps a source (``clinical_trials`` or
+        ``open_targets``) to the maximum number of results it may return.
+        """
+        budgets = budgets or {}
+        trials_budget = budgets.get("clinical_trials")
+        targets_budget = budgets.get("open_targets")
+        # One combined pass yields the route and both pipelines' inputs;
+        # the standalone router and parsers are only used if it fails.
+        analysis = analyze_query(query)
+        if analysis is not None:
+            classification = analysis.route
+            parsed, entities = analysis.fields, analysis.entities
+            self.last_rationale = (
+                f"Combined analysis ({analysis.source}) classified query as '{classification}'."
+            )
+        else:
+            classification = self.classify_query(query)
+            parsed = entities = None
         self.last_classification = classification
         self.last_resolution = classification
         console.print(f"[bold blue]Query classified as:[/bold blue] {classification}")
@@ -95,26 +117,26 @@ class DBFinder:
         if classification == "clinical_trials":
             notify(45, "Running ClinicalTrials.gov pipeline")
             console.print("[yellow]Fetching from Clinical Trials...[/yellow]")
-            add_result(run_clinical_trials(query))
+            add_result(run_clinical_trials(query, max_results=trials_budget, parsed=parsed))
 
         elif classification == "open_targets":
             notify(45, "Running Open Targets pipeline")
             console.print("[yellow]Fetching from Open Targets...[/yellow]")
-            add_result(run_open_targets(query))
+            add_result(run_open_targets(query, max_results=targets_budget, entities=entities))
 
         elif classification == "both":
             notify(40, "Running ClinicalTrials.gov pipeline")
             console.print("[yellow]Fetching from both sources...[/yellow]")
-            add_result(run_clinical_trials(query))
+            add_result(run_clinical_trials(query, max_results=trials_budget, parsed=parsed))
             notify(65, "Running Open Targets pipeline")
-            add_result(run_open_targets(query))
+            add_result(run_open_targets(query, max_results=targets_budget, entities=entities))
 
         elif classification in {"none", "unknown"}:
             notify(40, "Running ClinicalTrials.gov pipeline (fallback)")
             console.print("[yellow]Fallback: querying both data sources...[/yellow]")
-            add_result(run_clinical_trials(query))
+            add_result(run_clinical_trials(query, max_results=trials_budget, parsed=parsed))
             notify(65, "Running Open Targets pipeline (fallback)")
-            add_result(run_open_targets(query))
+            add_result(run_open_targets(query, max_results=targets_budget, entities=entities))
             self.last_resolution = "both"
             self.last_rationale += " Fallback executed to cover both pipelines."
 
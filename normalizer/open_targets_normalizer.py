@@ -1,23 +1,49 @@
-import requests
+import os
 import logging
-import mygene
+import threading
 
-try:
-    from chembl_webresource_client.new_client import new_client
-except Exception as exc:  # pragma: no cover - network dependent import
-    new_client = None
-    logging.warning(
-        "Unable to initialise ChEMBL new_client during import: %s", exc
-    )
+from utils import http_client
+
+_chembl_client = None
+_chembl_unavailable = False
+_chembl_lock = threading.Lock()
+
+
+def get_chembl_client():
+    """Return the ChEMBL ``new_client``, importing it on first use.
+
+    Importing ``chembl_webresource_client`` may perform network I/O, so it is
+    deferred until a drug actually needs a ChEMBL lookup. A failed import is
+    remembered and ``None`` returned from then on.
+    """
+    global _chembl_client, _chembl_unavailable
+    if _chembl_client is None and not _chembl_unavailable:
+        with _chembl_lock:
+            if _chembl_client is None and not _chembl_unavailable:
+                try:
+                    from chembl_webresource_client.new_client import new_client
+                except Exception as exc:  # pragma: no cover - network dependent import
+                    _chembl_unavailable = True
+                    logging.warning("Unable to initialise ChEMBL new_client: %s", exc)
+                else:
+                    _chembl_client = new_client
+    return _chembl_client
+
+ZOOMA_URL = "https://www.ebi.ac.uk/spot/zooma/v2/api/services/annotate"
+ZOOMA_TIMEOUT = float(os.environ.get("GRID_ZOOMA_TIMEOUT", "15"))
 
 
 class Normalizer:
     @staticmethod
     def get_efo_id_from_zooma(term: str) -> str:
-        url = f"https://www.ebi.ac.uk/spot/zooma/v2/api/services/annotate?propertyValue={term}"
         headers = {"Accept": "application/json"}
 
-        response = requests.get(url, headers=headers)
+        response = http_client.get(
+            ZOOMA_URL,
+            params={"propertyValue": term},
+            headers=headers,
+            timeout=ZOOMA_TIMEOUT,
+        )
         if response.status_code != 200:
             raise Exception(f"ZOOMA request failed: {response.status_code}")
 
@@ -32,6 +58,7 @@ class Normalizer:
 
     @staticmethod
     def get_chembl_id(term: str) -> str:
+        new_client = get_chembl_client()
         if new_client is None:
             logging.warning(
                 "ChEMBL client unavailable, skipping lookup for '%s'", term
@@ -58,6 +85,8 @@ class Normalizer:
 
     @staticmethod
     def get_ensembl_id(term: str, species: str = "human") -> str:
+        import mygene
+
         mg = mygene.MyGeneInfo()
         try:
             result = mg.query(term, species=species, fields="ensembl.gene")
@@ -1,107 +1,96 @@
-import json
 import logging
 from rich.console import Console
 
 from query_parser.open_targets_query_parser import QueryParser
 from normalizer.open_targets_normalizer import Normalizer
 from retriever.open_targets_retriever import (
-    query_disease_known_drugs,
-    query_drug_indications,
-    query_target_associated_diseases,
+    collect_rows,
+    fetch_lookups,
+    row_budget,
     merge_and_rank,
+    limit_results,
 )
+from utils.fanout import map_concurrent
 from utils.helpers import save_results
 
 logging.basicConfig(level=logging.INFO)
 console = Console()
 
-def extract_and_normalize(sentence):
-    parser = QueryParser()
+def extract_and_normalize(sentence, entities=None):
     normalizer = Normalizer()
 
-    output_json_str = parser.extract_entities(sentence)
-
-    if output_json_str.startswith("```"):
-        output_json_str = output_json_str.strip("` \n\r")
-        if output_json_str.lower().startswith("json"):
-            output_json_str = output_json_str[4:].strip()
-
-    try:
-        entities = json.loads(output_json_str)
-    except json.JSONDecodeError as e:
-        logging.error(f"Failed to parse JSON output from LLM. Error: {e}")
-        logging.error(f"Raw output was: {output_json_str}")
-        return None
-
-    efo_results = {}
-    for key in ["drug", "disease", "target"]:
+    # The router may already have extracted the entities in its combined pass.
+    if entities is None:
+        # Validated against the entity schema; None means the reply was unusable.
+        entities = QueryParser().parse_entities(sentence)
+        if entities is None:
+            logging.error("Failed to extract entities from the query.")
+            return None
+
+    keys = ["drug", "disease", "target"]
+    pending = []
+    for key in keys:
         terms = entities.get(key, [])
         if not isinstance(terms, list):
             terms = [terms] if terms else []
-
-        normalized_list = []
-        for term in terms:
-            term = term.strip()
-            if term:
-                efo_id = None
-                chembl_id = None
-                try:
-                    efo_id = normalizer.get_efo_id_from_zooma(term)
-                except Exception as e:
-                    logging.warning(f"No EFO ID for {key} '{term}': {e}")
-
-                if key == "drug" and efo_id is None:
-                    chembl_id = normalizer.get_chembl_id(term)
-
-                normalized_list.append({
-                    "term": term,
-                    "efo_id": efo_id,
-                    "chembl_id": chembl_id
-                })
-        efo_results[key] = normalized_list
+        pending.extend((key, term.strip()) for term in terms if term.strip())
+
+    def normalize(item):
+        key, term = item
+        efo_id = None
+        chembl_id = None
+        try:
+            efo_id = normalizer.get_efo_id_from_zooma(term)
+        except Exception as e:
+            logging.warning(f"No EFO ID for {key} '{term}': {e}")
+
+        if key == "drug" and efo_id is None:
+            chembl_id = normalizer.get_chembl_id(term)
+        return {"term": term, "efo_id": efo_id, "chembl_id": chembl_id}
+
+    # Every term is looked up concurrently; results keep the input order.
+    efo_results = {key: [] for key in keys}
+    for (key, term), (normalized, error) in zip(pending, map_concurrent(normalize, pending)):
+        if error is not None:
+            logging.warning(f"Normalization of {key} '{term}' failed: {error}")
+            normalized = {"term": term, "efo_id": None, "chembl_id": None}
+        efo_results[key].append(normalized)
 
     return efo_results
 
-def run_pipeline(input_sentence: str):
+def run_pipeline(input_sentence: str, *, max_results=None, entities=None):
     console.print(f"[bold blue]Running pipeline for:[/bold blue] {input_sentence}")
-    results = extract_and_normalize(input_sentence)
+    results = extract_and_normalize(input_sentence, entities=entities)
     if results is None:
         console.print("[red]Entity extraction or normalization failed.[/red]")
         return []
 
-    disease_known_drugs_rows = []
-    drug_indications_rows = []
-    target_associated_diseases_rows = []
-
+    # Every lookup goes out in one aliased GraphQL request (see fetch_lookups).
+    lookups = []
     for item in results["disease"]:
         if item["efo_id"]:
-            try:
-                rows = query_disease_known_drugs(item["efo_id"])
-                disease_known_drugs_rows.extend(rows)
-            except Exception as e:
-                console.print(f"[red]Error: {e}[/red]")
-
+            lookups.append(("disease_known_drugs", item["efo_id"]))
+            lookups.append(("target_associated_diseases", item["efo_id"]))
     for item in results["drug"]:
         if item["chembl_id"]:
-            try:
-                rows = query_drug_indications(item["chembl_id"])
-                drug_indications_rows.extend(rows)
-            except Exception as e:
-                console.print(f"[red]Error: {e}[/red]")
+            lookups.append(("drug_indications", item["chembl_id"]))
 
-    for item in results["disease"]:
-        if item["efo_id"]:
-            try:
-                rows = query_target_associated_diseases(item["efo_id"])
-                target_associated_diseases_rows.extend(rows)
-            except Exception as e:
-                console.print(f"[red]Error: {e}[/red]")
+    # Pages are followed until each lookup has enough rows to rank.
+    rows, errors = fetch_lookups(lookups, max_rows=row_budget(max_results))
+    for (kind, identifier), e in errors.items():
+        console.print(f"[red]Error ({kind} {identifier}): {e}[/red]")
+
+    disease_known_drugs_rows = collect_rows(rows, "disease_known_drugs")
+    drug_indications_rows = collect_rows(rows, "drug_indications")
+    target_associated_diseases_rows = collect_rows(rows, "target_associated_diseases")
 
     merged_df, targets_df = merge_and_rank(
         disease_known_drugs_rows,
         drug_indications_rows,
         target_associated_diseases_rows
     )
+    merged_df = limit_results(merged_df, max_results)
+    targets_df = limit_results(targets_df, max_results)
 
     outputs = []
 
@@ -136,8 +125,8 @@ def run_pipeline(input_sentence: str):
     save_results(disease_known_drugs_rows, "disease_known_drugs.csv")
     save_results(drug_indications_rows, "drug_indications.csv")
     save_results(target_associated_diseases_rows, "target_associated_targets.csv")
-    save_results(merged_df.to_dict(orient="records"), "merged_results.csv")
-    save_results(targets_df.to_dict(orient="records"), "targets_only.csv")
+    save_results(merged_df, "merged_results.csv")
+    save_results(targets_df, "targets_only.csv")
 
     if outputs:
         console.print("[bold green]Pipeline completed successfully![/bold green]")
@@ -1,32 +1,30 @@
 # -*- coding: utf-8 -*-
-import re
-import json
-import ast
 import logging
 from rich.console import Console
-from langchain import PromptTemplate
-from langchain_community.llms import Ollama
-from langchain.chains import LLMChain
+
+from query_parser.rule_based_parser import rule_based_parse
+from query_parser.schemas import decode_json_object, validate_trial_fields
+from utils.cache import PARSE_CACHE_TTL, get_cache, make_key, normalize_text
+from utils.llm import JSON_NUM_PREDICT, get_chain
+from utils.llm_tiers import run_with_escalation
 
 # === Setup ===
 console = Console()
 
+# Bump whenever KEYWORD_TEMPLATE changes so stale parses are not reused.
+PROMPT_VERSION = "ct-fields-v2"
+
 # Logging
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-# === Initialize LLM ===
-llm = Ollama(model="gemma2:latest")
-
 # === Prompt ===
-keyword_prompt = PromptTemplate(
-    input_variables=["sentence"],
-    template="""
+KEYWORD_TEMPLATE = """
 Extract the following information from the user query. 
 If not present, return null for that field. 
-Output JSON ONLY, no commentary.
+Output a single JSON object using the field names below as keys, no commentary.
 
 Fields:
 - Condition/Disease
@@ -42,29 +40,18 @@ Fields:
 Sentence: "{sentence}"
 JSON:
 """
-)
 
-keyword_chain = LLMChain(llm=llm, prompt=keyword_prompt)
 
-# === Utility: JSON Parser ===
-def parse_json_flex(text):
-    if not text or not isinstance(text, str):
-        return None
-    try:
-        return json.loads(text)
-    except Exception:
-        pass
-    m = re.search(r"\{.*\}", text, flags=re.DOTALL)
-    if m:
-        candidate = m.group(0)
-        try:
-            return json.loads(candidate)
-        except Exception:
-            try:
-                return ast.literal_eval(candidate)
-            except Exception:
-                pass
-    return None
+def get_keyword_chain(model=None):
+    """Return the field-extraction chain for ``model``, building the LLM on first use."""
+    return get_chain(
+        "ct-fields", KEYWORD_TEMPLATE, ["sentence"], model=model, json_mode=True, num_predict=JSON_NUM_PREDICT
+    )
+
+
+def _validate_fields(llm_output):
+    # JSON mode returns one document; anything else is unusable.
+    return validate_trial_fields(decode_json_object(llm_output))
 
 # === Fallback ===
 def fallback_extract(sentence):
@@ -80,6 +67,10 @@ def fallback_extract(sentence):
         "Date Range": None
     }
 
+# === Parse cache ===
+def _parse_cache_key(user_input):
+    return make_key("ct-parse", {"prompt": PROMPT_VERSION, "text": normalize_text(user_input)})
+
 # === Main Parser ===
 def parse_query(user_input: str) -> dict:
     console.rule(f"[bold cyan]Query Parser Agent[/bold cyan] {user_input}")
@@ -87,14 +78,34 @@ def parse_query(user_input: str) -> dict:
     # ?? Always initialize
     extracted = None  
 
+    # Simple queries are fully understood by the rule-based parser.
+    rule_parse = rule_based_parse(user_input)
+    if rule_parse.confident:
+        console.log(
+            f"[green]Extracted fields (rules, confidence {rule_parse.confidence:.2f}):[/green] {rule_parse.fields}"
+        )
+        return rule_parse.fields
+    logging.debug("Rule-based parse not confident (%.2f); unmatched %s", rule_parse.confidence, rule_parse.unmatched)
+
+    cache = get_cache("llm_parse")
+    cache_key = _parse_cache_key(user_input)
+    if cache is not None:
+        cached = validate_trial_fields(cache.get(cache_key))
+        if cached is not None:
+            console.log(f"[green]Extracted fields (cached):[/green] {cached}")
+            return cached
+
     try:
-        llm_output = keyword_chain.run(user_input)
-        console.log(f"[blue]LLM raw output:[/blue] {llm_output}")
-        parsed = parse_json_flex(llm_output)
-        if parsed and isinstance(parsed, dict):
-            extracted = parsed
+        # The small model answers first; larger tiers only see invalid replies.
+        parsed = run_with_escalation("ct-fields", get_keyword_chain, _validate_fields, user_input)
+        if parsed is not None:
+            console.log(f"[blue]Parsed by {parsed.model} (attempt {parsed.attempts})[/blue]")
+            extracted = parsed.value
+            # Only successful LLM parses are cached; fallbacks are retried.
+            if cache is not None:
+                cache.set(cache_key, extracted, expire=PARSE_CACHE_TTL)
         else:
-            console.log("[yellow]LLM output not valid JSON; falling back.[/yellow]")
+            console.log("[yellow]No model tier returned output matching the field schema; falling back.[/yellow]")
     except Exception as e:
         console.log(f"[red]Parser LLM failed: {e}. Using fallback.[/red]")
 
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""Single-pass query analysis: route, trial fields and entities together.
+
+Before this module existed, a "both" query made three LLM calls in a row:
+the router, ``parse_query`` and ``QueryParser.extract_entities``.
+:func:`analyze_query` asks for all three in one structured prompt. The
+router then hands the trial fields and entity lists straight to the
+pipelines.
+
+The rule-based parser is tried first. When it understands the whole query
+and the route follows from what it matched, the LLM is skipped entirely.
+Results from the LLM are cached like the individual parsers' results.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from query_parser.rule_based_parser import RuleParse, rule_based_parse
+from query_parser.schemas import (
+    ENTITY_KEYS,
+    ROUTES,
+    TRIAL_FIELDS,
+    decode_json_object,
+    validate_entities,
+    validate_trial_fields,
+)
+from utils.cache import PARSE_CACHE_TTL, get_cache, make_key, normalize_text
+from utils.llm import JSON_NUM_PREDICT, get_chain
+from utils.llm_tiers import run_with_escalation
+
+# Bump whenever COMBINED_TEMPLATE changes so stale analyses are not reused.
+PROMPT_VERSION = "combined-v2"
+
+COMBINED_TEMPLATE = """
+You analyse biomedical search queries. Return a single JSON object and nothing else, with keys:
+
+"route": one of "clinical_trials" (questions about clinical trials or studies), "open_targets"
+  (drug, disease or target evidence), "both" or "none".
+"clinical_trials": an object with the keys "Condition/Disease", "Intervention/Treatment/Drug",
+  "Location", "Status", "Phase", "Outcome/Results/Conclusion", "Study IDs/NCT IDs",
+  "Facility Name" and "Date Range". Use null for anything not mentioned.
+"entities": an object with the keys "drug", "disease" and "target", each a list of strings
+  (empty when none are mentioned).
+
+Query: "{query}"
+JSON:
+"""
+
+# Words that show which source a rule-parsed query is aimed at.
+_TRIAL_WORDS = re.compile(r"\b(?:trials?|studies|study|recruit\w*|enrol\w*)\b", flags=re.IGNORECASE)
+_TARGET_WORDS = re.compile(
+    r"\b(?:targets?|targeting|targeted|evidence|associations?|associated|mechanisms?)\b",
+    flags=re.IGNORECASE,
+)
+_TRIAL_FIELDS = ("Status", "Phase", "Study IDs/NCT IDs", "Facility Name", "Date Range", "Location")
+
+
+@dataclass
+class QueryAnalysis:
+    """Route plus the inputs each pipeline needs."""
+
+    route: str
+    fields: Dict[str, Optional[str]]
+    entities: Dict[str, List[str]]
+    source: str
+
+
+def _rule_route(parse: RuleParse, text: str) -> Optional[str]:
+    wants_trials = bool(_TRIAL_WORDS.search(text)) or any(parse.fields[key] for key in _TRIAL_FIELDS)
+    wants_targets = bool(_TARGET_WORDS.search(text)) or bool(parse.entities["target"])
+    if wants_trials and wants_targets:
+        return "both"
+    if wants_trials:
+        return "clinical_trials"
+    if wants_targets:
+        return "open_targets"
+    return None
+
+
+def coerce_analysis(payload: Any) -> Optional[QueryAnalysis]:
+    """Validate a decoded LLM reply, returning ``None`` when it is unusable."""
+
+    if not isinstance(payload, dict):
+        return None
+    route = str(payload.get("route") or "").strip().lower()
+    fields_in = payload.get("clinical_trials")
+    entities_in = payload.get("entities")
+    if route not in ROUTES or not isinstance(fields_in, dict) or not isinstance(entities_in, dict):
+        return None
+    # Either part may legitimately be empty, so only its type is checked above.
+    fields = validate_trial_fields(fields_in) or dict.fromkeys(TRIAL_FIELDS)
+    entities = validate_entities(entities_in) or {key: [] for key in ENTITY_KEYS}
+    return QueryAnalysis(route=route, fields=fields, entities=entities, source="llm")
+
+
+def get_combined_chain(model: Optional[str] = None):
+    """Return the combined analysis chain for ``model``, building the LLM on first use."""
+    return get_chain(
+        "combined", COMBINED_TEMPLATE, ["query"], model=model, json_mode=True, num_predict=JSON_NUM_PREDICT
+    )
+
+
+def _decode_analysis(reply: Any) -> Optional[QueryAnalysis]:
+    return coerce_analysis(decode_json_object(reply))
+
+
+def analyze_query(query: str) -> Optional[QueryAnalysis]:
+    """Return the route, trial fields and entities for ``query``.
+
+    Returns ``None`` when the LLM fails or replies with something unusable;
+    callers then fall back to the per-pipeline parsers.
+    """
+
+    rule_parse = rule_based_parse(query)
+    # Only fully explained, negation-free queries bypass the LLM.
+    if rule_parse.confident:
+        route = _rule_route(rule_parse, query)
+        if route:
+            return QueryAnalysis(route, rule_parse.fields, rule_parse.entities, source="rules")
+
+    cache = get_cache("llm_parse")
+    cache_key = make_key("combined", {"prompt": PROMPT_VERSION, "text": normalize_text(query)})
+    if cache is not None:
+        cached = coerce_analysis(cache.get(cache_key))
+        if cached is not None:
+            cached.source = "cache"
+            return cached
+
+    try:
+        result = run_with_escalation("combined", get_combined_chain, _decode_analysis, query)
+    except Exception as exc:
+        logging.warning("Combined query analysis failed: %s", exc)
+        return None
+
+    if result is None:
+        logging.warning("Combined query analysis returned no usable reply on any model tier")
+        return None
+    analysis = result.value
+    if cache is not None:
+        payload = {"route": analysis.route, "clinical_trials": analysis.fields, "entities": analysis.entities}
+        cache.set(cache_key, payload, expire=PARSE_CACHE_TTL)
+    return analysis
@@ -1,33 +1,74 @@
+import json
 import logging
-from langchain import PromptTemplate
-from langchain.chains import LLMChain
-from langchain_community.llms import Ollama
+from typing import Dict, List, Optional
 
-# Initialize LLM
-llm = Ollama(model="gemma2:latest")
+from query_parser.rule_based_parser import rule_based_parse
+from query_parser.schemas import decode_json_object, validate_entities
+from utils.cache import PARSE_CACHE_TTL, get_cache, make_key, normalize_text
+from utils.llm import JSON_NUM_PREDICT, get_chain
+from utils.llm_tiers import run_with_escalation
 
-class QueryParser:
-    def __init__(self):
-        self.chain = LLMChain(
-            llm=llm,
-            prompt=PromptTemplate(
-                input_variables=["sentence"],
-                template="""
+ENTITY_TEMPLATE = """
 Extract all drug names, disease names, and target names mentioned in the following sentence.
 If none are mentioned, use an empty list for that field.
 
 Sentence: "{sentence}"
 
-Output the result in JSON format with keys: "drug", "disease", and "target". Each key should map to a list of strings.
+Output a single JSON object with keys: "drug", "disease", and "target". Each key should map to a list of strings.
 """
-            )
+
+# Bump whenever ENTITY_TEMPLATE changes so stale extractions are not reused.
+PROMPT_VERSION = "ot-entities-v2"
+
+
+def _validate_entities(result):
+    return validate_entities(decode_json_object(result))
+
+
+class QueryParser:
+    @property
+    def chain(self):
+        return self.chain_for()
+
+    def chain_for(self, model=None):
+        # Shared per process and only built when the rules and cache miss.
+        return get_chain(
+            "ot-entities", ENTITY_TEMPLATE, ["sentence"], model=model, json_mode=True, num_predict=JSON_NUM_PREDICT
         )
 
-    def extract_entities(self, sentence: str) -> str:
+    def parse_entities(self, sentence: str) -> Optional[Dict[str, List[str]]]:
+        """Return the drug/disease/target lists, or ``None`` if the LLM reply is unusable."""
+        rule_parse = rule_based_parse(sentence)
+        if rule_parse.confident:
+            logging.info(
+                f"Extracted entities (rules, confidence {rule_parse.confidence:.2f}): {rule_parse.entities}"
+            )
+            return rule_parse.entities
+
+        cache = get_cache("llm_parse")
+        cache_key = make_key("ot-entities", {"prompt": PROMPT_VERSION, "text": normalize_text(sentence)})
+        if cache is not None:
+            cached = validate_entities(cache.get(cache_key))
+            if cached is not None:
+                logging.info(f"Extracted entities (cached): {cached}")
+                return cached
+
         try:
-            result = self.chain.run(sentence).strip()
-            logging.info(f"Extracted entities JSON: {result}")
-            return result
+            result = run_with_escalation("ot-entities", self.chain_for, _validate_entities, sentence)
         except Exception as e:
             logging.error(f"Failed to extract entities: {e}")
             raise
+
+        if result is None:
+            logging.error("No model tier returned entities matching the schema.")
+            return None
+        entities = result.value
+        logging.info(f"Extracted entities ({result.model}): {entities}")
+        # Unusable output is not cached so the next call asks the LLM again.
+        if cache is not None:
+            cache.set(cache_key, entities, expire=PARSE_CACHE_TTL)
+        return entities
+
+    def extract_entities(self, sentence: str) -> str:
+        """JSON-encoded :meth:`parse_entities` result (``"null"`` when unusable)."""
+        return json.dumps(self.parse_entities(sentence))
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""Deterministic fast-path parser for simply structured queries.
+
+Queries such as "phase 2 breast cancer trials recruiting in Germany" can be
+parsed without the LLM. :func:`rule_based_parse` matches NCT IDs, phases,
+recruitment statuses, date ranges and facility names with regular
+expressions, and diseases, drugs, targets and countries against small
+gazetteers. It fills both the ``parse_query`` field schema and the
+drug/disease/target lists used by the Open Targets pipeline.
+
+The confidence score is the share of the query's words that were either
+matched or are known filler ("trials", "in", "targeting", ...). A parse is
+only :attr:`RuleParse.confident` when every content word was explained and
+the query holds no negation ("not", "without", "excluding", ...) outside a
+status such as "not yet recruiting". Otherwise the callers fall back to the
+LLM, since one ignored word can invert the meaning of the query.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from query_parser.schemas import TRIAL_FIELDS as FIELDS
+from retriever.Clinical_Trials_Retriever_Agent import extract_nct_ids, extract_phase
+
+DISEASES = (
+    "Alzheimer's disease", "Parkinson's disease", "Huntington's disease", "multiple sclerosis",
+    "amyotrophic lateral sclerosis", "ALS", "epilepsy", "migraine", "depression",
+    "major depressive disorder", "schizophrenia", "bipolar disorder", "autism",
+    "breast cancer", "triple negative breast cancer", "lung cancer", "non-small cell lung cancer",
+    "NSCLC", "small cell lung cancer", "prostate cancer", "colorectal cancer", "pancreatic cancer",
+    "ovarian cancer", "cervical cancer", "gastric cancer", "liver cancer", "hepatocellular carcinoma",
+    "bladder cancer", "kidney cancer", "renal cell carcinoma", "thyroid cancer", "melanoma",
+    "glioblastoma", "leukemia", "acute myeloid leukemia", "chronic lymphocytic leukemia",
+    "lymphoma", "multiple myeloma", "cancer", "type 1 diabetes", "type 2 diabetes", "diabetes",
+    "obesity", "hypertension", "heart failure", "atrial fibrillation", "coronary artery disease",
+    "stroke", "asthma", "COPD", "cystic fibrosis", "rheumatoid arthritis", "osteoarthritis",
+    "psoriasis", "lupus", "Crohn's disease", "ulcerative colitis", "HIV", "hepatitis B",
+    "hepatitis C", "tuberculosis", "malaria", "COVID-19", "influenza", "sickle cell disease",
+    "hemophilia", "Duchenne muscular dystrophy", "spinal muscular atrophy", "NASH",
+)
+
+DRUGS = (
+    "olaparib", "niraparib", "rucaparib", "talazoparib", "tamoxifen", "letrozole", "anastrozole",
+    "trastuzumab", "pertuzumab", "palbociclib", "ribociclib", "abemaciclib", "pembrolizumab",
+    "nivolumab", "atezolizumab", "durvalumab", "ipilimumab", "osimertinib", "erlotinib",
+    "gefitinib", "imatinib", "dasatinib", "nilotinib", "ibrutinib", "venetoclax", "rituximab",
+    "bevacizumab", "cetuximab", "sorafenib", "lenvatinib", "cisplatin", "carboplatin",
+    "paclitaxel", "docetaxel", "doxorubicin", "gemcitabine", "capecitabine", "fluorouracil",
+    "metformin", "insulin", "semaglutide", "liraglutide", "empagliflozin", "dapagliflozin",
+    "atorvastatin", "aspirin", "warfarin", "apixaban", "adalimumab", "infliximab", "etanercept",
+    "tofacitinib", "methotrexate", "prednisone", "dexamethasone", "remdesivir", "lecanemab",
+    "donanemab", "aducanumab", "levodopa", "nusinersen",
+)
+
+TARGETS = (
+    "BRCA1", "BRCA2", "TP53", "EGFR", "HER2", "ERBB2", "KRAS", "NRAS", "BRAF", "ALK", "ROS1",
+    "MET", "RET", "PIK3CA", "PTEN", "AKT1", "MTOR", "CDK4", "CDK6", "PARP1", "PD-1", "PDCD1",
+    "PD-L1", "CD274", "CTLA4", "VEGFA", "KIT", "FLT3", "IDH1", "IDH2", "JAK2", "BCL2", "BTK",
+    "APP", "APOE", "MAPT", "SNCA", "LRRK2", "HTT", "CFTR", "DMD", "SMN1", "GLP1R", "PCSK9",
+    "ESR1", "AR", "TNF", "IL6", "IL17A",
+)
+
+COUNTRIES = (
+    "United States", "USA", "United Kingdom", "UK", "Canada", "Mexico", "Brazil", "Argentina",
+    "Germany", "France", "Spain", "Italy", "Netherlands", "Belgium", "Switzerland", "Austria",
+    "Sweden", "Norway", "Denmark", "Finland", "Poland", "Ireland", "Portugal", "Greece",
+    "Israel", "Turkey", "Egypt", "South Africa", "Nigeria", "Kenya", "India", "China", "Japan",
+    "South Korea", "Korea", "Taiwan", "Singapore", "Australia", "New Zealand", "Russia",
+)
+
+STATUSES = (
+    "not yet recruiting", "active, not recruiting", "active not recruiting",
+    "enrolling by invitation", "recruiting", "completed", "terminated", "withdrawn",
+    "suspended", "enrolling", "ongoing", "finished",
+)
+
+# Words that invert whatever they qualify; the rules cannot represent that.
+NEGATIONS = frozenset({"not", "no", "without", "excluding", "except", "exclude", "excluded", "non"})
+
+# Words that carry no extractable information in our query style.
+FILLER = frozenset(
+    """
+    a about all an and any are as at based be by can clinical drug drugs evidence find for from get give
+    have in include including is like list look looking me my of on or patients people
+    please related search searching show studies study such target targeted targeting targets
+    that the therapies therapy to treat treating treatment treatments trial trials using what
+    which with within
+    """.split()
+)
+
+_PHASE_SPAN = re.compile(
+    r"\bphase\s*(?:[1-4]|iv|i{1,3})(?:\s*(?:/|and|or|-)\s*(?:phase\s*)?(?:[1-4]|iv|i{1,3}))?\b",
+    flags=re.IGNORECASE,
+)
+_NCT_SPAN = re.compile(r"\bNCT\d{8}\b", flags=re.IGNORECASE)
+_YEAR = r"(?:19|20)\d{2}"
+_DATE_SPAN = re.compile(
+    rf"\b(?:(?:between|from)\s+)?{_YEAR}\s*(?:-|–|to|and|through|until)\s*{_YEAR}\b"
+    rf"|\b(?:since|after|before|from|until)\s+{_YEAR}\b"
+    r"|\b(?:(?:in|over)\s+the\s+)?(?:last|past)\s+\d+\s+years?\b"
+    rf"|\b(?:in\s+)?{_YEAR}\b",
+    flags=re.IGNORECASE,
+)
+_FACILITY_SPAN = re.compile(
+    r"\b(?:[A-Z][\w'&.]*\s+)(?:(?:of|for|and)\s+|[A-Z][\w'&.]*\s+)*?"
+    r"(?:Clinic|Hospital|Medical Center|Cancer Center|Cancer Centre|Institute|University)\b"
+    r"(?:\s+(?:of|for)\s+[A-Z][\w'&.]*(?:\s+[A-Z][\w'&.]*)*)?"
+)
+_WORD = re.compile(r"[A-Za-z0-9]+(?:['\-][A-Za-z0-9]+)*")
+
+Span = Tuple[int, int]
+
+
+def _gazetteer_pattern(
+    terms: Iterable[str], *, ignore_case: bool = True
+) -> Tuple["re.Pattern[str]", Dict[str, str]]:
+    canonical = {term.casefold(): term for term in terms}
+    # Longest terms first so "breast cancer" wins over "cancer".
+    alternatives = sorted(canonical.values(), key=len, reverse=True)
+    pattern = re.compile(
+        r"(?<![\w-])(?:" + "|".join(re.escape(term) for term in alternatives) + r")(?![\w-])",
+        flags=re.IGNORECASE if ignore_case else 0,
+    )
+    return pattern, canonical
+
+
+_GAZETTEERS = {
+    "disease": _gazetteer_pattern(DISEASES),
+    "drug": _gazetteer_pattern(DRUGS),
+    # Gene symbols such as MET, KIT or APP are also English words, so
+    # targets only match when written in upper case.
+    "target": _gazetteer_pattern(TARGETS, ignore_case=False),
+    "country": _gazetteer_pattern(COUNTRIES),
+    "status": _gazetteer_pattern(STATUSES),
+}
+
+
+@dataclass
+class RuleParse:
+    """Result of :func:`rule_based_parse`."""
+
+    fields: Dict[str, Optional[str]]
+    entities: Dict[str, List[str]]
+    confidence: float
+    unmatched: List[str] = field(default_factory=list)
+    negations: List[str] = field(default_factory=list)
+
+    @property
+    def confident(self) -> bool:
+        return self.confidence > 0 and not self.unmatched and not self.negations
+
+
+class _Claims:
+    """Non-overlapping character spans already attributed to a field."""
+
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+
+    def take(self, start: int, end: int) -> bool:
+        if any(start < other_end and other_start < end for other_start, other_end in self.spans):
+            return False
+        self.spans.append((start, end))
+        return True
+
+    def covers(self, start: int, end: int) -> bool:
+        return any(other_start <= start and end <= other_end for other_start, other_end in self.spans)
+
+
+def _match_all(pattern: "re.Pattern[str]", text: str, claims: _Claims) -> List["re.Match[str]"]:
+    return [match for match in pattern.finditer(text) if claims.take(*match.span())]
+
+
+def _gazetteer_matches(kind: str, text: str, claims: _Claims) -> List[str]:
+    pattern, canonical = _GAZETTEERS[kind]
+    values: List[str] = []
+    for match in _match_all(pattern, text, claims):
+        value = canonical[match.group(0).casefold()]
+        if value not in values:
+            values.append(value)
+    return values
+
+
+def _clean_date(text: str) -> str:
+    return re.sub(r"^(?:in|over)\s+(?:the\s+)?", "", text.strip(), flags=re.IGNORECASE)
+
+
+def rule_based_parse(text: str) -> RuleParse:
+    """Parse ``text`` with regexes and gazetteers, scoring how much was understood."""
+
+    text = text or ""
+    claims = _Claims()
+
+    nct_ids = extract_nct_ids([match.group(0) for match in _match_all(_NCT_SPAN, text, claims)])
+    phases = [match.group(0) for match in _match_all(_PHASE_SPAN, text, claims)]
+    facilities = [match.group(0) for match in _match_all(_FACILITY_SPAN, text, claims)]
+    dates = [_clean_date(match.group(0)) for match in _match_all(_DATE_SPAN, text, claims)]
+    statuses = _gazetteer_matches("status", text, claims)
+    diseases = _gazetteer_matches("disease", text, claims)
+    drugs = _gazetteer_matches("drug", text, claims)
+    targets = _gazetteer_matches("target", text, claims)
+    countries = _gazetteer_matches("country", text, claims)
+
+    words = list(_WORD.finditer(text))
+    unmatched = [
+        match.group(0)
+        for match in words
+        if not claims.covers(*match.span()) and match.group(0).lower() not in FILLER
+    ]
+    # Negations inside a claimed span ("not yet recruiting") are part of it.
+    negations = [
+        match.group(0)
+        for match in words
+        if not claims.covers(*match.span()) and match.group(0).lower() in NEGATIONS
+    ]
+    found_subject = bool(nct_ids or diseases or drugs or targets)
+    if not words or not found_subject:
+        confidence = 0.0
+    else:
+        confidence = round(1 - len(unmatched) / len(words), 3)
+
+    phase_labels: List[str] = []
+    for span in phases:
+        for part in re.split(r"\s*(?:/|\band\b|\bor\b|-)\s*", span, flags=re.IGNORECASE):
+            label = extract_phase(part if part.lower().startswith("phase") else f"phase {part}")
+            if label and label not in phase_labels:
+                phase_labels.append(label)
+
+    fields: Dict[str, Optional[str]] = dict.fromkeys(FIELDS)
+    fields.update({
+        "Condition/Disease": " OR ".join(diseases) or None,
+        "Intervention/Treatment/Drug": " OR ".join(drugs) or None,
+        "Location": ", ".join(countries) or None,
+        "Status": " / ".join(statuses) or None,
+        "Phase": " / ".join(phase_labels) or None,
+        "Study IDs/NCT IDs": ", ".join(nct_ids) or None,
+        "Facility Name": facilities[0] if facilities else None,
+        "Date Range": dates[0] if dates else None,
+    })
+    return RuleParse(
+        fields=fields,
+        entities={"drug": drugs, "disease": diseases, "target": targets},
+        confidence=confidence,
+        unmatched=unmatched,
+        negations=negations,
+    )
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""Typed shapes of the parser outputs and validation of LLM replies.
+
+The parser prompts run with Ollama's JSON mode (``format="json"``), so a
+reply is either one JSON document or unusable. There is no longer any regex
+scanning or ``literal_eval`` guessing. The validators below check the
+decoded object against the expected keys and coerce its values to the types
+the pipelines rely on. They return ``None`` when the reply does not
+describe the requested structure.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+TRIAL_FIELDS = (
+    "Condition/Disease",
+    "Intervention/Treatment/Drug",
+    "Location",
+    "Status",
+    "Phase",
+    "Outcome/Results/Conclusion",
+    "Study IDs/NCT IDs",
+    "Facility Name",
+    "Date Range",
+)
+ENTITY_KEYS = ("drug", "disease", "target")
+ROUTES = ("clinical_trials", "open_targets", "both", "none")
+
+TrialFields = Dict[str, Optional[str]]
+Entities = Dict[str, List[str]]
+
+_NULLS = {"null", "none", "n/a", "na", "not mentioned", "not specified", "unknown"}
+
+
+def decode_json_object(text: Any) -> Optional[Dict[str, Any]]:
+    """Decode a JSON-mode reply, returning ``None`` unless it is an object."""
+
+    if isinstance(text, dict):
+        return text
+    if not isinstance(text, str) or not text.strip():
+        return None
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def as_text(value: Any) -> Optional[str]:
+    """Coerce a field value to a non-empty string or ``None``.
+
+    Lists and objects (e.g. ``{"city": "Boston", "country": "USA"}``) are
+    joined on their values rather than rendered as a Python repr.
+    """
+
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        value = ", ".join(text for text in map(as_text, value) if text)
+    value = str(value).strip()
+    return value if value and value.lower() not in _NULLS else None
+
+
+def as_date_range(value: Any) -> Optional[str]:
+    """Coerce a ``Date Range`` value to text the retriever's date parser reads.
+
+    ``{"start": "2015", "end": "2020"}`` and ``["2015", "2020"]`` become
+    ``"2015 to 2020"``; an object with only a start or an end becomes
+    ``"from 2015"`` or ``"until 2020"``.
+    """
+
+    if isinstance(value, dict):
+        bounds = {str(key).lower(): as_text(item) for key, item in value.items()}
+        start = bounds.get("start") or bounds.get("from")
+        end = bounds.get("end") or bounds.get("to")
+        if start and end:
+            value = f"{start} to {end}"
+        elif start or end:
+            value = f"from {start}" if start else f"until {end}"
+    elif isinstance(value, (list, tuple)):
+        items = [text for text in map(as_text, value) if text]
+        value = f"{items[0]} to {items[-1]}" if len(items) > 1 else items
+    return as_text(value)
+
+
+def as_list(value: Any) -> List[str]:
+    """Coerce an entity value to a list of non-empty strings."""
+
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, (list, tuple)):
+        return []
+    items = [str(item).strip() for item in value if item is not None]
+    return [item for item in items if item and item.lower() not in _NULLS]
+
+
+def validate_trial_fields(payload: Any) -> Optional[TrialFields]:
+    """Return the clinical-trial fields of ``payload`` with every key present."""
+
+    if not isinstance(payload, dict) or not any(key in payload for key in TRIAL_FIELDS):
+        return None
+    fields = {key: as_text(payload.get(key)) for key in TRIAL_FIELDS}
+    fields["Date Range"] = as_date_range(payload.get("Date Range"))
+    return fields
+
+
+def validate_entities(payload: Any) -> Optional[Entities]:
+    """Return the drug/disease/target lists of ``payload``."""
+
+    if not isinstance(payload, dict) or not any(key in payload for key in ENTITY_KEYS):
+        return None
+    return {key: as_list(payload.get(key)) for key in ENTITY_KEYS}
@@ -5,13 +5,20 @@ from __future__ import annotations
 
 import os
 import re
+import sqlite3
+from datetime import date, timedelta
 from json import JSONDecodeError
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import pandas as pd
 import requests
 from rich.console import Console
 
+from retriever.clinical_trials_store import get_store
+from utils import http_client
+from utils.artifacts import write_artifact
+from utils.cache import get_cache, make_key
+
 try:  # pragma: no cover - optional dependency
     from IPython.display import display  # type: ignore
 except ImportError:  # pragma: no cover - IPython is optional for the CLI usage
@@ -52,8 +59,301 @@ def extract_phase(query: str) -> Optional[str]:
 
     return f"Phase {phase_number}"
 
+
+_NCT_PATTERN = re.compile(r"\bNCT\d{8}\b", flags=re.IGNORECASE)
+
+
+def extract_nct_ids(value: Any) -> List[str]:
+    """Return the unique NCT numbers mentioned in ``value``, in order of appearance.
+
+    ``value`` may be free text, a comma separated string or a list of either,
+    as produced by the query parser's ``Study IDs/NCT IDs`` field.
+    """
+
+    if not value:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        text = " ".join(str(item) for item in value if item)
+    else:
+        text = str(value)
+
+    seen: List[str] = []
+    for match in _NCT_PATTERN.findall(text):
+        nct_id = match.upper()
+        if nct_id not in seen:
+            seen.append(nct_id)
+    return seen
+
 # === ClinicalTrials.gov Fetcher ===
-def fetch_clinical_trials(
+CLINICAL_TRIALS_API_URL = "https://clinicaltrials.gov/api/v2/studies"
+CACHE_TTL = int(os.environ.get("GRID_CLINICAL_TRIALS_CACHE_TTL", str(24 * 60 * 60)))
+# ``api`` queries clinicaltrials.gov; ``local`` answers from the SQLite mirror.
+BACKEND = os.environ.get("GRID_CLINICAL_TRIALS_BACKEND", "api").lower()
+BACKENDS = ("api", "local")
+TRIAL_COLUMNS = [
+    "title",
+    "NCT Number",
+    "Status",
+    "Condition",
+    "Interventions",
+    "Phases",
+    "url",
+]
+
+
+# Only the modules consumed by ``_parse_study`` are requested from the API.
+STUDY_FIELDS = (
+    "protocolSection.identificationModule",
+    "protocolSection.statusModule",
+    "protocolSection.conditionsModule",
+    "protocolSection.armsInterventionsModule",
+    "protocolSection.designModule",
+)
+
+_STATUS_ALIASES = {
+    "open": "RECRUITING",
+    "enrolling": "RECRUITING",
+    "active": "ACTIVE_NOT_RECRUITING",
+    "ongoing": "ACTIVE_NOT_RECRUITING",
+    "finished": "COMPLETED",
+    "closed": "COMPLETED",
+}
+_STATUS_VALUES = {
+    "ACTIVE_NOT_RECRUITING",
+    "COMPLETED",
+    "ENROLLING_BY_INVITATION",
+    "NOT_YET_RECRUITING",
+    "RECRUITING",
+    "SUSPENDED",
+    "TERMINATED",
+    "WITHDRAWN",
+    "AVAILABLE",
+    "NO_LONGER_AVAILABLE",
+    "TEMPORARILY_NOT_AVAILABLE",
+    "APPROVED_FOR_MARKETING",
+    "WITHHELD",
+    "UNKNOWN",
+}
+
+
+def normalize_status(status: Optional[str]) -> Optional[str]:
+    """Map a free-text recruitment status onto ClinicalTrials.gov enum values.
+
+    ``"Recruiting"``, ``"not yet recruiting"`` or ``"Active, not recruiting"``
+    become ``RECRUITING``, ``NOT_YET_RECRUITING`` and ``ACTIVE_NOT_RECRUITING``.
+    Several statuses may be separated by ``/``, ``;``, ``|`` or ``or``; the
+    recognised values are joined with commas as expected by
+    ``filter.overallStatus``. ``None`` is returned when nothing is recognised.
+    """
+
+    if not status:
+        return None
+
+    tokens = re.split(r"\s*(?:/|;|\||\bor\b|\band\b)\s*", str(status), flags=re.IGNORECASE)
+    values: List[str] = []
+    for token in tokens:
+        cleaned = token.strip().lower()
+        if not cleaned:
+            continue
+        value = _STATUS_ALIASES.get(cleaned) or re.sub(r"[^a-z]+", "_", cleaned).strip("_").upper()
+        if value in _STATUS_VALUES and value not in values:
+            values.append(value)
+    return ",".join(values) or None
+
+
+def normalize_phase(phase: Optional[str]) -> Optional[str]:
+    """Map a phase label (``Phase 2``, ``phase II``, ``PHASE2``) onto the API enum."""
+
+    if not phase:
+        return None
+
+    compact = re.sub(r"[\s_\-]+", "", str(phase)).upper()
+    if compact in {"NA", "N/A"}:
+        return "NA"
+    if compact.startswith("EARLYPHASE1") or compact.startswith("EARLYPHASEI"):
+        return "EARLY_PHASE1"
+    if re.fullmatch(r"PHASE[1-4]", compact):
+        return compact
+
+    canonical = extract_phase(str(phase))
+    if not canonical:
+        return None
+    return canonical.replace(" ", "").upper()
+
+
+_PHASE_SEPARATOR = re.compile(r"\s*(?:/|,|;|\||&|\bor\b|\band\b)\s*", flags=re.IGNORECASE)
+_BARE_PHASE = re.compile(r"[1-4]|i{1,3}|iv", flags=re.IGNORECASE)
+
+
+def normalize_phases(phase: Optional[str]) -> List[str]:
+    """Map one or more phase labels onto API enum values.
+
+    ``"Phase 2 / Phase 3"``, ``"phase 2 or 3"`` and ``"Phase 1/2"`` yield one
+    value per phase, in order and without duplicates. A value that cannot be
+    split is passed whole to :func:`normalize_phase`.
+    """
+
+    if not phase:
+        return []
+
+    values: List[str] = []
+    for token in _PHASE_SEPARATOR.split(str(phase)):
+        if _BARE_PHASE.fullmatch(token):
+            token = f"Phase {token}"
+        value = normalize_phase(token)
+        if value and value not in values:
+            values.append(value)
+    if not values:
+        single = normalize_phase(phase)
+        values = [single] if single else []
+    return values
+
+
+_YEAR = r"(?:19|20)\d{2}"
+# ``2015-16`` is a span of years; a two-digit suffix of 01-12 stays a month.
+_YEAR_SPAN = rf"{_YEAR}[-/–](?:1[3-9]|[2-9]\d)(?![\d-])"
+_DATE = rf"(?:{_YEAR_SPAN}|{_YEAR}(?:-(?:0[1-9]|1[0-2])(?:-(?:0[1-9]|[12]\d|3[01]))?)?)"
+_RANGE_PATTERN = re.compile(
+    rf"(?P<start>{_DATE})\s*(?:-|–|to|until|through|and)\s*(?P<end>{_DATE})",
+    flags=re.IGNORECASE,
+)
+_SINCE_PATTERN = re.compile(
+    rf"\b(?P<word>since|after|from|starting)\s+(?:in\s+)?(?P<date>{_DATE})",
+    flags=re.IGNORECASE,
+)
+_ONWARDS_PATTERN = re.compile(
+    rf"(?P<date>{_DATE})\s*(?:onwards?|and\s+later|or\s+later)\b",
+    flags=re.IGNORECASE,
+)
+_BEFORE_PATTERN = re.compile(
+    rf"\b(?P<word>before|until|till|up\s+to|through|prior\s+to)\s+(?P<date>{_DATE})",
+    flags=re.IGNORECASE,
+)
+_LAST_YEARS_PATTERN = re.compile(
+    r"\b(?:last|past|previous)\s+(?P<count>\d+)\s+years?\b", flags=re.IGNORECASE
+)
+_SINGLE_DATE_PATTERN = re.compile(rf"\b(?P<date>{_DATE})\b")
+
+
+def _date_bound(value: str, *, end: bool) -> str:
+    """Expand ``YYYY``, ``YYYY-MM`` or ``YYYY-YY`` to the first or last day it covers.
+
+    Raises ``ValueError`` for dates that do not exist, such as ``2015-02-30``.
+    """
+
+    span = re.fullmatch(r"(\d{4})[-/–](\d{2})", value)
+    if span and int(span.group(2)) > 12:
+        first = int(span.group(1))
+        last = first - first % 100 + int(span.group(2))
+        if not first < last <= first + 10:
+            raise ValueError(f"Unclear year span '{value}'")
+        return f"{last:04d}-12-31" if end else f"{first:04d}-01-01"
+
+    parts = value.split("-")
+    if len(parts) == 3:
+        return date.fromisoformat(value).isoformat()
+    year = int(parts[0])
+    if len(parts) == 2:
+        month = int(parts[1])
+        if not end:
+            return f"{year:04d}-{month:02d}-01"
+        following = date(year + (month == 12), month % 12 + 1, 1)
+        return (following - timedelta(days=1)).isoformat()
+    return f"{year:04d}-12-31" if end else f"{year:04d}-01-01"
+
+
+def parse_date_range(value: Any) -> Optional[Tuple[str, str]]:
+    """Translate a parsed ``Date Range`` into ISO ``(start, end)`` bounds.
+
+    Open ends are returned as ``MIN``/``MAX`` as used by ClinicalTrials.gov
+    ``RANGE[...]`` filters. Handles explicit ranges (``2019-2021``,
+    ``between 2019 and 2021``), open ranges (``since 2020``, ``2015 onwards``,
+    ``before 2018``), relative ranges (``last 5 years``), single years,
+    year spans (``2015-16``) or dates, and mappings with ``start``/``end``
+    keys. Returns ``None`` when nothing is recognised and raises
+    ``ValueError`` for a recognised date that does not exist.
+    """
+
+    if not value:
+        return None
+    if isinstance(value, dict):
+        lowered = {str(key).lower(): item for key, item in value.items()}
+        start = lowered.get("start") or lowered.get("from")
+        end = lowered.get("end") or lowered.get("to")
+        start_bound = parse_date_range(start) if start else None
+        end_bound = parse_date_range(end) if end else None
+        if not start_bound and not end_bound:
+            return None
+        return (
+            start_bound[0] if start_bound else "MIN",
+            end_bound[1] if end_bound else "MAX",
+        )
+    if isinstance(value, (list, tuple)):
+        value = " to ".join(str(item) for item in value if item)
+
+    text = str(value)
+    match = _RANGE_PATTERN.search(text)
+    if match:
+        return (
+            _date_bound(match.group("start"), end=False),
+            _date_bound(match.group("end"), end=True),
+        )
+    match = _ONWARDS_PATTERN.search(text)
+    if match:
+        return _date_bound(match.group("date"), end=False), "MAX"
+    match = _SINCE_PATTERN.search(text)
+    if match:
+        exclusive = match.group("word").lower() == "after"
+        bound = _date_bound(match.group("date"), end=exclusive)
+        if exclusive:
+            bound = (date.fromisoformat(bound) + timedelta(days=1)).isoformat()
+        return bound, "MAX"
+    match = _BEFORE_PATTERN.search(text)
+    if match:
+        word = " ".join(match.group("word").lower().split())
+        exclusive = word in {"before", "prior to"}
+        bound = _date_bound(match.group("date"), end=not exclusive)
+        if exclusive:
+            bound = (date.fromisoformat(bound) - timedelta(days=1)).isoformat()
+        return "MIN", bound
+    match = _LAST_YEARS_PATTERN.search(text)
+    if match:
+        today = date.today()
+        years = int(match.group("count"))
+        try:
+            start = today.replace(year=today.year - years)
+        except ValueError:  # 29 February
+            start = today.replace(year=today.year - years, day=28)
+        return start.isoformat(), "MAX"
+    match = _SINGLE_DATE_PATTERN.search(text)
+    if match:
+        found = match.group("date")
+        return _date_bound(found, end=False), _date_bound(found, end=True)
+    return None
+
+
+def _advanced_filters(
+    phase: Optional[str],
+    date_range: Optional[Tuple[str, str]],
+    facility: Optional[str],
+) -> List[str]:
+    expressions: List[str] = []
+    api_phases = normalize_phases(phase)
+    if len(api_phases) == 1:
+        expressions.append(f"AREA[Phase]{api_phases[0]}")
+    elif api_phases:
+        expressions.append(f"AREA[Phase]({' OR '.join(api_phases)})")
+    if date_range:
+        start, end = date_range
+        expressions.append(f"AREA[StartDate]RANGE[{start},{end}]")
+    if facility:
+        cleaned = re.sub(r'["\\]', " ", str(facility)).strip()
+        if cleaned:
+            expressions.append(f'AREA[LocationFacility]"{cleaned}"')
+    return expressions
+
+
+def _build_search_params(
     condition: Optional[str] = None,
     intervention: Optional[str] = None,
     phase: Optional[str] = None,
@@ -61,95 +361,416 @@ def fetch_clinical_trials(
     location: Optional[str] = None,
     *,
     page_size: int = 50,
-    timeout: int = 20,
-) -> pd.DataFrame:
-    """Query the ClinicalTrials.gov v2 API and return a DataFrame of studies."""
+    date_range: Optional[Tuple[str, str]] = None,
+    facility: Optional[str] = None,
+) -> Dict[str, str]:
+    """Translate the retriever arguments into ClinicalTrials.gov query parameters.
+
+    Phase, status, start-date range and facility name are sent as server-side
+    filters so non-matching studies never leave the API, and ``fields``
+    restricts each study to the modules the parser reads.
+    """
 
-    base_url = "https://clinicaltrials.gov/api/v2/studies"
-    params: Dict[str, str] = {"pageSize": str(page_size)}
+    params: Dict[str, str] = {
+        "pageSize": str(page_size),
+        "fields": ",".join(STUDY_FIELDS),
+    }
     if condition:
         params["query.cond"] = condition
     if intervention:
         params["query.intr"] = intervention
-    if status:
-        params["filter.overallStatus"] = status
+    api_status = normalize_status(status)
+    if api_status:
+        params["filter.overallStatus"] = api_status
+    elif status:
+        console.log(f"[yellow]Ignoring unrecognised status filter:[/yellow] {status}")
+    advanced = _advanced_filters(phase, date_range, facility)
+    if advanced:
+        params["filter.advanced"] = " AND ".join(advanced)
     if location:
         params["query.locn"] = location
+    return params
 
-    trials: List[Dict[str, str]] = []
-    while True:
-        try:
-            response = requests.get(base_url, params=params, timeout=timeout)
-            response.raise_for_status()
-        except requests.RequestException as exc:
-            raise RuntimeError(f"ClinicalTrials.gov request failed: {exc}") from exc
 
+TRIAL_ATTRS = {
+    "source": "ClinicalTrials.gov",
+    "title_field": ("title", "NCT Number"),
+    "summary_field": ("Status",),
+    "link_field": ("url",),
+}
+_NCT_INDEX = TRIAL_COLUMNS.index("NCT Number")
+
+
+def _study_phases(study: Dict[str, Any]) -> List[str]:
+    return study.get("protocolSection", {}).get("designModule", {}).get("phases", [])
+
+
+def _study_values(study: Dict[str, Any]) -> Tuple[str, ...]:
+    """Flatten a ClinicalTrials.gov ``study`` payload into ``TRIAL_COLUMNS`` order."""
+
+    protocol = study.get("protocolSection", {})
+    identification = protocol.get("identificationModule", {})
+    nct_id = identification.get("nctId", "N/A")
+    title = identification.get("briefTitle") or nct_id or "Clinical trial"
+    status_val = protocol.get("statusModule", {}).get("overallStatus", "Unknown")
+    conditions = ", ".join(protocol.get("conditionsModule", {}).get("conditions", []))
+    interventions = protocol.get("armsInterventionsModule", {}).get("interventions", [])
+    interventions_str = (
+        ", ".join(intervention.get("name", "") for intervention in interventions)
+        or "None"
+    )
+    phases = ", ".join(_study_phases(study))
+    trial_url = (
+        f"https://clinicaltrials.gov/study/{nct_id}"
+        if nct_id and nct_id != "N/A"
+        else ""
+    )
+    return (title, nct_id, status_val, conditions, interventions_str, phases, trial_url)
+
+
+class StudyRecordBuilder:
+    """Column-oriented accumulator for ClinicalTrials.gov studies.
+
+    Every field is written into its own preallocated list and studies are
+    de-duplicated on NCT number as they are added, so a result set is
+    materialised once, when :meth:`build` creates the DataFrame, instead of as
+    one dictionary per study followed by ``drop_duplicates``.
+    """
+
+    def __init__(self, capacity: int = 0) -> None:
+        self._columns: List[List[Optional[str]]] = [[None] * capacity for _ in TRIAL_COLUMNS]
+        self._size = 0
+        self._seen: set = set()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return len(self._columns[0])
+
+    def reserve(self, capacity: int) -> None:
+        """Grow every column so at least ``capacity`` rows fit without resizing."""
+
+        extra = capacity - self.capacity
+        if extra > 0:
+            for column in self._columns:
+                column.extend([None] * extra)
+
+    def add_study(self, study: Dict[str, Any]) -> bool:
+        """Append ``study`` unless its NCT number was already added."""
+
+        values = _study_values(study)
+        nct_id = values[_NCT_INDEX]
+        if nct_id in self._seen:
+            return False
+        self._seen.add(nct_id)
+
+        if self._size == self.capacity:
+            self.reserve(max(16, self._size * 2))
+        row = self._size
+        for column, value in zip(self._columns, values):
+            column[row] = value
+        self._size += 1
+        return True
+
+    def extend(self, studies: Iterable[Dict[str, Any]]) -> int:
+        """Add every study in ``studies`` and return how many were new."""
+
+        return sum(1 for study in studies if self.add_study(study))
+
+    def build(self, start: int = 0) -> pd.DataFrame:
+        """Return rows ``start`` onwards as a DataFrame tagged with source metadata."""
+
+        df = pd.DataFrame(
+            {
+                name: column[start:self._size]
+                for name, column in zip(TRIAL_COLUMNS, self._columns)
+            },
+            columns=TRIAL_COLUMNS,
+        )
+        df.attrs.update(TRIAL_ATTRS)
+        return df
+
+
+def _resolve_backend(backend: Optional[str]) -> str:
+    resolved = (backend or BACKEND).lower()
+    if resolved not in BACKENDS:
+        raise ValueError(
+            f"Unknown ClinicalTrials.gov backend '{resolved}'; expected one of {BACKENDS}"
+        )
+    return resolved
+
+
+def _fetch_page(params: Dict[str, str], timeout: int, backend: str = "api") -> Dict[str, Any]:
+    """Return one search page, served from the shared disk cache when possible.
+
+    Pages are keyed on the canonicalised parameter set (including
+    ``pageToken``) and kept for ``GRID_CLINICAL_TRIALS_CACHE_TTL`` seconds.
+    The ``local`` backend answers the same parameters from the mirror
+    without any network call.
+    """
+
+    if backend == "local":
         try:
-            data = response.json()
-        except (ValueError, JSONDecodeError) as exc:
-            raise RuntimeError(
-                "ClinicalTrials.gov returned invalid JSON payload"
-            ) from exc
+            return get_store().search(params)
+        except sqlite3.Error as exc:
+            raise RuntimeError(f"Local ClinicalTrials.gov mirror query failed: {exc}") from exc
+
+    cache = get_cache("clinical_trials")
+    key = make_key("ctgov-page", params)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    try:
+        response = http_client.get(CLINICAL_TRIALS_API_URL, params=params, timeout=timeout)
+        response.raise_for_status()
+    except requests.RequestException as exc:
+        raise RuntimeError(f"ClinicalTrials.gov request failed: {exc}") from exc
+
+    try:
+        data = response.json()
+    except (ValueError, JSONDecodeError) as exc:
+        raise RuntimeError("ClinicalTrials.gov returned invalid JSON payload") from exc
+
+    if cache is not None:
+        cache.set(key, data, expire=CACHE_TTL)
+    return data
+
+
+def _iter_study_pages(
+    condition: Optional[str],
+    intervention: Optional[str],
+    phase: Optional[str],
+    status: Optional[str],
+    location: Optional[str],
+    *,
+    page_size: int,
+    timeout: int,
+    max_results: Optional[int],
+    backend: Optional[str],
+    date_range: Optional[Tuple[str, str]] = None,
+    facility: Optional[str] = None,
+) -> Iterator[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+    """Follow ``nextPageToken`` and yield ``(studies, meta)`` for every page.
+
+    ``studies`` holds the raw study payloads that passed the client-side phase
+    fallback and fit within ``max_results``; pages left empty are skipped.
+    ``meta`` carries ``total_count`` and ``truncated`` for the result set.
+    """
+
+    if max_results:
+        page_size = max(1, min(page_size, max_results))
+    params = _build_search_params(
+        condition,
+        intervention,
+        phase,
+        status,
+        location,
+        page_size=page_size,
+        date_range=date_range,
+        facility=facility,
+    )
+    params["countTotal"] = "true"
+    client_phase = None if normalize_phases(phase) or not phase else phase.lower()
+    remaining = max_results or None
+    total_count: Optional[int] = None
+    backend = _resolve_backend(backend)
+
+    while True:
+        data = _fetch_page(params, timeout, backend)
+        if total_count is None:
+            total_count = data.get("totalCount")
         studies = data.get("studies", [])
         if not studies:
             break
 
-        for study in studies:
-            protocol = study.get("protocolSection", {})
-            identification = protocol.get("identificationModule", {})
-            nct_id = identification.get("nctId", "N/A")
-            title = identification.get("briefTitle") or nct_id or "Clinical trial"
-            status_val = (
-                protocol.get("statusModule", {}).get("overallStatus", "Unknown")
-            )
-            conditions = ", ".join(
-                protocol.get("conditionsModule", {}).get("conditions", [])
-            )
-            interventions = protocol.get("armsInterventionsModule", {}).get(
-                "interventions", []
-            )
-            interventions_str = (
-                ", ".join(intervention.get("name", "") for intervention in interventions)
-                or "None"
-            )
-            phase_labels = protocol.get("designModule", {}).get("phases", [])
-            phases = ", ".join(phase_labels)
-            trial_url = (
-                f"https://clinicaltrials.gov/study/{nct_id}"
-                if nct_id and nct_id != "N/A"
-                else ""
-            )
-
-            if phase and phases and phase.lower() not in phases.lower():
-                continue
-
-            trials.append(
-                {
-                    "title": title,
-                    "NCT Number": nct_id,
-                    "Status": status_val,
-                    "Condition": conditions,
-                    "Interventions": interventions_str,
-                    "Phases": phases,
-                    "url": trial_url,
-                }
-            )
+        if client_phase:
+            studies = [
+                study
+                for study in studies
+                if not _study_phases(study)
+                or client_phase in ", ".join(_study_phases(study)).lower()
+            ]
 
         next_page_token = data.get("nextPageToken")
-        if next_page_token:
-            params["pageToken"] = next_page_token
-        else:
+        truncated = False
+        if remaining is not None:
+            if len(studies) >= remaining:
+                truncated = len(studies) > remaining or bool(next_page_token)
+                studies = studies[:remaining]
+            remaining -= len(studies)
+
+        if studies:
+            yield studies, {"total_count": total_count, "truncated": truncated}
+
+        if not next_page_token or remaining == 0:
             break
+        params["pageToken"] = next_page_token
+
+
+def iter_clinical_trials(
+    condition: Optional[str] = None,
+    intervention: Optional[str] = None,
+    phase: Optional[str] = None,
+    status: Optional[str] = None,
+    location: Optional[str] = None,
+    *,
+    page_size: int = 50,
+    timeout: int = 20,
+    max_results: Optional[int] = None,
+    backend: Optional[str] = None,
+    date_range: Optional[Tuple[str, str]] = None,
+    facility: Optional[str] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield one parsed DataFrame per ClinicalTrials.gov result page.
+
+    Pages are requested lazily while following ``nextPageToken``, so only the
+    current page is held in memory and callers may stop iterating at any point
+    without downloading the remainder of the result set. Phases that
+    :func:`normalize_phases` recognises are filtered by the API; any other
+    ``phase`` value falls back to substring matching on each page, in which
+    case pages left empty by the filter are skipped.
+
+    When ``max_results`` is set paging stops as soon as that many studies have
+    been yielded. Every page carries ``total_count`` (the number of matching
+    studies reported by the API) in ``attrs``, and the last page is flagged
+    with ``truncated`` when further results were left unfetched.
+
+    ``backend`` selects ``api`` (the live v2 API) or ``local`` (the SQLite
+    mirror in :mod:`retriever.clinical_trials_store`); it defaults to
+    ``GRID_CLINICAL_TRIALS_BACKEND``. Both produce identically shaped pages.
+
+    ``date_range`` (``(start, end)`` as returned by :func:`parse_date_range`)
+    restricts the study start date and ``facility`` the site name; both are
+    applied server-side.
+    """
+
+    for studies, meta in _iter_study_pages(
+        condition,
+        intervention,
+        phase,
+        status,
+        location,
+        page_size=page_size,
+        timeout=timeout,
+        max_results=max_results,
+        backend=backend,
+        date_range=date_range,
+        facility=facility,
+    ):
+        builder = StudyRecordBuilder(capacity=len(studies))
+        builder.extend(studies)
+        frame = builder.build()
+        frame.attrs.update(meta)
+        yield frame
 
-    df = pd.DataFrame(trials).drop_duplicates(subset=["NCT Number"])
-    df.attrs.update(
-        {
-            "source": "ClinicalTrials.gov",
-            "title_field": ("title", "NCT Number"),
-            "summary_field": ("Status",),
-            "link_field": ("url",),
+
+def fetch_clinical_trials(
+    condition: Optional[str] = None,
+    intervention: Optional[str] = None,
+    phase: Optional[str] = None,
+    status: Optional[str] = None,
+    location: Optional[str] = None,
+    *,
+    page_size: int = 50,
+    timeout: int = 20,
+    on_page: Optional[Callable[[pd.DataFrame], None]] = None,
+    max_results: Optional[int] = None,
+    backend: Optional[str] = None,
+    date_range: Optional[Tuple[str, str]] = None,
+    facility: Optional[str] = None,
+) -> pd.DataFrame:
+    """Query the ClinicalTrials.gov v2 API and return a DataFrame of studies.
+
+    Pages stream from the same generator as :func:`iter_clinical_trials` into
+    a single :class:`StudyRecordBuilder`, which is sized from the API's total
+    count and de-duplicates studies across pages. ``on_page`` is invoked with
+    the rows added by each page as soon as it has been parsed so callers can
+    report progress incrementally. ``max_results`` caps the number of studies
+    fetched; the returned frame records ``truncated`` and ``total_count`` in
+    ``attrs``. ``backend`` is passed through as for :func:`iter_clinical_trials`.
+    """
+
+    builder = StudyRecordBuilder()
+    meta: Dict[str, Any] = {"total_count": 0, "truncated": False}
+    for studies, page_meta in _iter_study_pages(
+        condition,
+        intervention,
+        phase,
+        status,
+        location,
+        page_size=page_size,
+        timeout=timeout,
+        max_results=max_results,
+        backend=backend,
+        date_range=date_range,
+        facility=facility,
+    ):
+        if not builder.capacity and page_meta["total_count"]:
+            expected = page_meta["total_count"]
+            builder.reserve(min(expected, max_results) if max_results else expected)
+        start = len(builder)
+        builder.extend(studies)
+        meta["total_count"] = page_meta["total_count"]
+        meta["truncated"] = meta["truncated"] or page_meta["truncated"]
+        if on_page is not None and len(builder) > start:
+            page = builder.build(start)
+            page.attrs.update(page_meta)
+            on_page(page)
+
+    df = builder.build()
+    df.attrs.update(meta)
+    return df
+
+# Upper bound on ``pageSize`` accepted by the v2 API.
+MAX_PAGE_SIZE = 1000
+
+
+def fetch_trials_by_id(
+    nct_ids: Iterable[str],
+    *,
+    timeout: int = 20,
+    backend: Optional[str] = None,
+    max_results: Optional[int] = None,
+) -> pd.DataFrame:
+    """Fetch specific studies by NCT number with a single batched request.
+
+    IDs are looked up with ``filter.ids`` (one request per 1,000 IDs) through
+    the same cached page fetcher as searches, so repeated lookups are served
+    from the disk cache or the local mirror. Rows follow the order of
+    ``nct_ids``; unknown IDs are simply absent.
+
+    ``max_results`` keeps only the first that many IDs; the skipped IDs are
+    counted in ``total_count`` and flag the frame as ``truncated``.
+    """
+
+    ordered = list(dict.fromkeys(nct_id.upper() for nct_id in nct_ids if nct_id))
+    skipped = ordered[max_results:] if max_results else []
+    ordered = ordered[:max_results] if max_results else ordered
+    backend = _resolve_backend(backend)
+    found: Dict[str, Dict[str, Any]] = {}
+
+    # Sorting keeps the cache key independent of the order IDs were mentioned in.
+    requested = sorted(ordered)
+    for start in range(0, len(requested), MAX_PAGE_SIZE):
+        chunk = requested[start:start + MAX_PAGE_SIZE]
+        params = {
+            "filter.ids": ",".join(chunk),
+            "pageSize": str(len(chunk)),
+            "fields": ",".join(STUDY_FIELDS),
         }
-    )
+        for study in _fetch_page(params, timeout, backend).get("studies", []):
+            nct_id = study.get("protocolSection", {}).get("identificationModule", {}).get("nctId")
+            if nct_id:
+                found[nct_id.upper()] = study
+
+    builder = StudyRecordBuilder(capacity=len(found))
+    builder.extend(found[nct_id] for nct_id in ordered if nct_id in found)
+    df = builder.build()
+    df.attrs.update({"total_count": len(df) + len(skipped), "truncated": bool(skipped)})
     return df
 
 # === Save & Display ===
@@ -158,12 +779,13 @@ def sanitize_filename(name: Optional[str]) -> Optional[str]:
 
     return re.sub(r"[^A-Za-z0-9_\-\.]", "_", name) if name else None
 
-def display_and_save_results(df: pd.DataFrame, filename: str) -> str:
-    """Persist the DataFrame to disk and render it if an IPython display exists."""
+def display_and_save_results(df: pd.DataFrame, filename: str) -> Optional[str]:
+    """Persist the DataFrame as an artifact and render it if an IPython display exists.
+
+    Returns the artifact path, or ``None`` when artifact writing is switched off.
+    """
 
-    os.makedirs("output", exist_ok=True)
     sanitized = sanitize_filename(filename) or "trials_results.csv"
-    filepath = os.path.join("output", sanitized)
 
     if display is not None:
         try:  # pragma: no cover - requires IPython rich repr
@@ -171,27 +793,63 @@ def display_and_save_results(df: pd.DataFrame, filename: str) -> str:
         except Exception:
             console.log("[yellow]Could not render dataframe; continuing.[/yellow]")
 
-    df.to_csv(filepath, index=False)
-    console.log(f"[green]Trials saved to {filepath}[/green]")
+    filepath = write_artifact(df, sanitized)
+    if filepath:
+        console.log(f"[green]Trials saved to {filepath}[/green]")
     return filepath
 
 # === Retriever Agent ===
-def retrieve_trials(parsed_query: Dict[str, Optional[str]], original_query: str) -> pd.DataFrame:
+def retrieve_trials(
+    parsed_query: Dict[str, Optional[str]],
+    original_query: str,
+    *,
+    on_page: Optional[Callable[[pd.DataFrame], None]] = None,
+    max_results: Optional[int] = None,
+) -> pd.DataFrame:
     console.rule("[bold magenta]Retriever Agent[/bold magenta]")
 
     condition = parsed_query.get("Condition/Disease")
-    drug = parsed_query.get("Intervention/Treatment/Drug")
-    location = parsed_query.get("Location")
-    status = parsed_query.get("Status")
-    phase = parsed_query.get("Phase") or extract_phase(original_query)
-
-    console.log(f"[cyan]Running retrieval with:[/cyan] {parsed_query}")
-
-    parts = [str(x) for x in [condition, drug, phase] if x]
+    drug = parsed_query.get("Intervention/Treatment/Drug")
+    location = parsed_query.get("Location")
+    status = parsed_query.get("Status")
+    phase = parsed_query.get("Phase") or extract_phase(original_query)
+    try:
+        date_range = parse_date_range(parsed_query.get("Date Range"))
+    except ValueError as exc:
+        console.log(f"[yellow]Ignoring unusable date range:[/yellow] {exc}")
+        date_range = None
+    facility = parsed_query.get("Facility Name")
+    nct_ids = extract_nct_ids(parsed_query.get("Study IDs/NCT IDs")) or extract_nct_ids(
+        original_query
+    )
+
+    console.log(f"[cyan]Running retrieval with:[/cyan] {parsed_query}")
+
+    if nct_ids:
+        parts = nct_ids[:5]
+    else:
+        parts = [str(x) for x in [condition, drug, phase, facility] if x]
     filename = "_".join(parts) + "_trials.csv" if parts else "trials_results.csv"
 
     try:
-        df = fetch_clinical_trials(condition, drug, phase, status, location)
+        if nct_ids:
+            # Specific studies were requested: skip the paginated search entirely.
+            console.log(f"[cyan]Looking up studies by ID:[/cyan] {', '.join(nct_ids)}")
+            df = fetch_trials_by_id(nct_ids, max_results=max_results)
+            if on_page is not None and not df.empty:
+                on_page(df)
+        else:
+            df = fetch_clinical_trials(
+                condition,
+                drug,
+                phase,
+                status,
+                location,
+                on_page=on_page,
+                max_results=max_results,
+                date_range=date_range,
+                facility=facility,
+            )
     except RuntimeError as exc:
         console.log(f"[red]Retriever failed: {exc}[/red]")
         return pd.DataFrame()
@@ -200,5 +858,11 @@ def retrieve_trials(parsed_query: Dict[str, Optional[str]], original_query: str)
         console.log("[yellow]No trials found for this query.[/yellow]")
         return df
 
+    if df.attrs.get("truncated"):
+        console.log(
+            f"[yellow]Result capped at {len(df)} of "
+            f"{df.attrs.get('total_count') or 'unknown'} matching trials.[/yellow]"
+        )
+
     display_and_save_results(df, filename)
     return df
@@ -0,0 +1,458 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""SQLite-backed local mirror of ClinicalTrials.gov studies.
+
+The mirror stores each study with the same ``protocolSection`` projection the
+retriever requests from the v2 API (see ``STUDY_FIELDS``) and indexes it for
+the parameters :func:`retriever.Clinical_Trials_Retriever_Agent.fetch_clinical_trials`
+sends upstream:
+
+* an FTS5 table over titles, conditions, interventions and locations answers
+  ``query.cond``, ``query.intr`` and ``query.locn``;
+* B-tree indexes on overall status, start date and on a ``study_phases``
+  table answer ``filter.overallStatus`` and the ``filter.advanced`` phase and
+  start-date expressions.
+
+:meth:`ClinicalTrialsStore.search` accepts the API parameter dictionary and
+returns a payload shaped like a v2 ``/studies`` response, so the retriever's
+paging, caps and parsing work unchanged against either backend.
+
+Populate a mirror from a bulk export (the ``ctg-studies.json.zip`` download, a
+directory of study JSON files, a JSON list or JSON Lines)::
+
+    python -m retriever.clinical_trials_store load ctg-studies.json.zip
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_DB_PATH = Path(
+    os.environ.get("GRID_CLINICAL_TRIALS_DB")
+    or Path(__file__).resolve().parent.parent / "output" / "clinical_trials.sqlite3"
+)
+
+# Modules persisted in the mirror payload; mirrors the API ``fields`` projection.
+PAYLOAD_MODULES = (
+    "identificationModule",
+    "statusModule",
+    "conditionsModule",
+    "armsInterventionsModule",
+    "designModule",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS studies (
+    nct_id TEXT PRIMARY KEY,
+    overall_status TEXT,
+    start_date TEXT,
+    last_update TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS studies_overall_status ON studies (overall_status);
+CREATE INDEX IF NOT EXISTS studies_start_date ON studies (start_date);
+CREATE INDEX IF NOT EXISTS studies_last_update ON studies (last_update);
+CREATE TABLE IF NOT EXISTS study_phases (
+    phase TEXT NOT NULL,
+    nct_id TEXT NOT NULL,
+    PRIMARY KEY (phase, nct_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS study_phases_nct_id ON study_phases (nct_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS studies_fts USING fts5(
+    title,
+    conditions,
+    interventions,
+    locations,
+    tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# ``query.*`` parameters and the FTS columns each one searches.
+_TEXT_PARAMS = {
+    "query.cond": ("title", "conditions"),
+    "query.intr": ("interventions",),
+    "query.locn": ("locations",),
+}
+_AREA_PATTERN = re.compile(
+    r"AREA\[(?P<area>\w+)\]"
+    r"(?:RANGE\[(?P<low>[^,\]]*),\s*(?P<high>[^\]]*)\]|\"(?P<quoted>[^\"]*)\"|\((?P<choices>[^)]*)\)|(?P<value>[^\s)]+))"
+)
+_TOKEN_PATTERN = re.compile(r"\w+", flags=re.UNICODE)
+# Upper-case boolean operators between phrases, as in the API's search syntax.
+_OPERATOR_PATTERN = re.compile(r"\s+(AND|OR)\s+")
+
+
+def _fts_expression(columns: Sequence[str], text: str) -> Optional[str]:
+    """Translate a ``query.*`` value into an FTS5 match on ``columns``.
+
+    The words of each phrase must all match; ``AND``/``OR`` between phrases
+    are kept, so ``breast cancer OR lung cancer`` matches either disease.
+    Only the words are quoted, which keeps FTS5 syntax out of user input.
+    """
+
+    parts = _OPERATOR_PATTERN.split(text or "")
+    expression = ""
+    operator = "AND"
+    for position, part in enumerate(parts):
+        if position % 2:
+            operator = part
+            continue
+        tokens = _TOKEN_PATTERN.findall(part)
+        if not tokens:
+            continue
+        phrase = "(" + " AND ".join('"' + token.replace('"', '""') + '"' for token in tokens) + ")"
+        expression = f"{expression} {operator} {phrase}" if expression else phrase
+    if not expression:
+        return None
+    return "{" + " ".join(columns) + "} : (" + expression + ")"
+
+
+def _full_date(value: Optional[str]) -> Optional[str]:
+    """Expand a ``YYYY`` or ``YYYY-MM`` date to the first day it covers.
+
+    Start dates are compared as strings against full ISO bounds, so a bare
+    month would otherwise sort before the first day of that month.
+    """
+
+    if not value:
+        return value
+    parts = value.split("-")
+    return "-".join(parts + ["01"] * (3 - len(parts)))
+
+
+def _study_record(study: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Extract the indexed columns and stored payload from a full study."""
+
+    protocol = study.get("protocolSection") or {}
+    identification = protocol.get("identificationModule") or {}
+    nct_id = identification.get("nctId")
+    if not nct_id:
+        return None
+
+    status = protocol.get("statusModule") or {}
+    conditions = protocol.get("conditionsModule") or {}
+    interventions = (protocol.get("armsInterventionsModule") or {}).get("interventions") or []
+    locations = (protocol.get("contactsLocationsModule") or {}).get("locations") or []
+    location_text = "; ".join(
+        ", ".join(
+            str(part)
+            for part in (
+                location.get("facility"),
+                location.get("city"),
+                location.get("state"),
+                location.get("country"),
+            )
+            if part
+        )
+        for location in locations
+    )
+    payload = {
+        "protocolSection": {
+            module: protocol[module] for module in PAYLOAD_MODULES if module in protocol
+        }
+    }
+    return {
+        "nct_id": nct_id,
+        "title": " ".join(
+            filter(None, (identification.get("briefTitle"), identification.get("officialTitle")))
+        ),
+        "overall_status": status.get("overallStatus"),
+        "start_date": _full_date((status.get("startDateStruct") or {}).get("date")),
+        "last_update": (status.get("lastUpdatePostDateStruct") or {}).get("date"),
+        "conditions": " ".join(
+            list(conditions.get("conditions") or []) + list(conditions.get("keywords") or [])
+        ),
+        "interventions": " ".join(
+            " ".join([item.get("name") or ""] + list(item.get("otherNames") or []))
+            for item in interventions
+        ),
+        "locations": location_text,
+        "phases": list((protocol.get("designModule") or {}).get("phases") or []),
+        "payload": json.dumps(payload, separators=(",", ":")),
+    }
+
+
+def iter_bulk_export(path: os.PathLike) -> Iterator[Dict[str, Any]]:
+    """Yield study payloads from a ClinicalTrials.gov bulk export."""
+
+    path = Path(path)
+
+    def _from_document(document: Any) -> Iterator[Dict[str, Any]]:
+        if isinstance(document, dict) and "studies" in document:
+            yield from document["studies"]
+        elif isinstance(document, list):
+            yield from document
+        elif isinstance(document, dict):
+            yield document
+
+    if path.is_dir():
+        for child in sorted(path.rglob("*.json")):
+            with open(child, "r", encoding="utf-8") as handle:
+                yield from _from_document(json.load(handle))
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for name in sorted(archive.namelist()):
+                if name.endswith(".json"):
+                    with archive.open(name) as handle:
+                        yield from _from_document(json.load(handle))
+    elif path.suffix in {".jsonl", ".ndjson"}:
+        with open(path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, "r", encoding="utf-8") as handle:
+            yield from _from_document(json.load(handle))
+
+
+class ClinicalTrialsStore:
+    """Indexed SQLite mirror answering ClinicalTrials.gov search parameters."""
+
+    def __init__(self, path: Optional[os.PathLike] = None) -> None:
+        self.path = Path(path or DEFAULT_DB_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(str(self.path), timeout=30)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            yield connection
+            connection.commit()
+        finally:
+            connection.close()
+
+    # --- Writes ---------------------------------------------------------
+    def upsert_studies(self, studies: Iterable[Dict[str, Any]], *, batch_size: int = 1000) -> Tuple[int, int]:
+        """Insert or replace ``studies`` keyed by NCT ID.
+
+        Each batch is committed on its own, so a long load or sync holds the
+        write lock for one batch at a time. Returns ``(inserted, updated)``
+        counts.
+        """
+
+        inserted = updated = 0
+        batch: List[Dict[str, Any]] = []
+        with self._connect() as connection:
+            for study in studies:
+                record = _study_record(study)
+                if record is None:
+                    continue
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    new, changed = self._write_batch(connection, batch)
+                    connection.commit()
+                    inserted, updated = inserted + new, updated + changed
+                    batch = []
+            if batch:
+                new, changed = self._write_batch(connection, batch)
+                inserted, updated = inserted + new, updated + changed
+        return inserted, updated
+
+    @staticmethod
+    def _write_batch(connection: sqlite3.Connection, batch: List[Dict[str, Any]]) -> Tuple[int, int]:
+        # A study repeated within one batch keeps its last version; writing
+        # it twice would insert a second FTS entry under the same rowid.
+        batch = list({record["nct_id"]: record for record in batch}.values())
+        ids = [record["nct_id"] for record in batch]
+        existing = set()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            existing.update(
+                row[0]
+                for row in connection.execute(
+                    f"SELECT nct_id FROM studies WHERE nct_id IN ({placeholders})", chunk
+                )
+            )
+
+        for record in batch:
+            # The upsert keeps the rowid stable, which keys the FTS entry.
+            rowid = connection.execute(
+                "INSERT INTO studies (nct_id, overall_status, start_date, last_update, payload) "
+                "VALUES (:nct_id, :overall_status, :start_date, :last_update, :payload) "
+                "ON CONFLICT (nct_id) DO UPDATE SET overall_status = excluded.overall_status, "
+                "start_date = excluded.start_date, last_update = excluded.last_update, "
+                "payload = excluded.payload RETURNING rowid",
+                record,
+            ).fetchone()[0]
+            if record["nct_id"] in existing:
+                connection.execute("DELETE FROM studies_fts WHERE rowid = ?", (rowid,))
+                connection.execute("DELETE FROM study_phases WHERE nct_id = ?", (record["nct_id"],))
+            connection.execute(
+                "INSERT INTO studies_fts (rowid, title, conditions, interventions, locations) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (rowid, record["title"], record["conditions"], record["interventions"], record["locations"]),
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO study_phases (phase, nct_id) VALUES (?, ?)",
+                [(phase, record["nct_id"]) for phase in record["phases"]],
+            )
+
+        updated = len(existing)
+        return len(batch) - updated, updated
+
+    def load_bulk_export(self, path: os.PathLike, *, batch_size: int = 1000) -> Tuple[int, int]:
+        """Load every study from a bulk export file or directory."""
+
+        return self.upsert_studies(iter_bulk_export(path), batch_size=batch_size)
+
+    def count(self) -> int:
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM studies").fetchone()[0]
+
+    def latest_update(self) -> Optional[str]:
+        """Return the most recent ``LastUpdatePostDate`` held in the mirror."""
+
+        with self._connect() as connection:
+            return connection.execute("SELECT MAX(last_update) FROM studies").fetchone()[0]
+
+    def get_state(self, key: str) -> Optional[str]:
+        with self._connect() as connection:
+            row = connection.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key: str, value: str) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+    # --- Reads ----------------------------------------------------------
+    def _where_clause(self, params: Dict[str, str]) -> Tuple[str, List[Any], bool]:
+        clauses: List[str] = []
+        args: List[Any] = []
+
+        match_terms = [
+            expression
+            for key, columns in _TEXT_PARAMS.items()
+            if (expression := _fts_expression(columns, params.get(key, "")))
+        ]
+
+        nct_ids = [value for value in (params.get("filter.ids") or "").split(",") if value]
+        if nct_ids:
+            clauses.append(f"s.nct_id IN ({','.join('?' * len(nct_ids))})")
+            args.extend(nct_ids)
+
+        statuses = [value for value in (params.get("filter.overallStatus") or "").split(",") if value]
+        if statuses:
+            clauses.append(f"s.overall_status IN ({','.join('?' * len(statuses))})")
+            args.extend(statuses)
+
+        for match in _AREA_PATTERN.finditer(params.get("filter.advanced") or ""):
+            area = match.group("area")
+            value = match.group("quoted") if match.group("quoted") is not None else match.group("value")
+            if area == "Phase" and (value or match.group("choices")):
+                phases = [value] if value else re.split(r"\s+OR\s+", match.group("choices").strip())
+                clauses.append(
+                    "EXISTS (SELECT 1 FROM study_phases p WHERE p.nct_id = s.nct_id "
+                    f"AND p.phase IN ({','.join('?' * len(phases))}))"
+                )
+                args.extend(phases)
+            elif area == "StartDate" and match.group("low") is not None:
+                low, high = match.group("low").strip(), match.group("high").strip()
+                if low and low.upper() != "MIN":
+                    clauses.append("s.start_date >= ?")
+                    args.append(low)
+                if high and high.upper() != "MAX":
+                    clauses.append("s.start_date <= ?")
+                    args.append(high)
+            elif area == "LocationFacility" and value:
+                expression = _fts_expression(("locations",), value)
+                if expression:
+                    match_terms.append(expression)
+            else:
+                logging.warning("Local trials mirror ignores unsupported filter AREA[%s]", area)
+
+        use_fts = bool(match_terms)
+        if use_fts:
+            clauses.insert(0, "studies_fts MATCH ?")
+            args.insert(0, " AND ".join(match_terms))
+
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        return where, args, use_fts
+
+    def search(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """Answer a v2 ``/studies`` parameter set from the mirror.
+
+        Supports the ``query.cond``/``query.intr``/``query.locn`` text
+        searches, ``filter.ids``, ``filter.overallStatus``, the ``AREA[Phase]``
+        (a single phase or an ``(A OR B)`` group), ``AREA[StartDate]RANGE[...]``
+        and ``AREA[LocationFacility]`` advanced filters, ``pageSize``,
+        ``pageToken`` (an offset) and ``countTotal``.
+        """
+
+        page_size = max(1, int(params.get("pageSize") or 10))
+        offset = int(params.get("pageToken") or 0)
+        where, args, use_fts = self._where_clause(params)
+        source = (
+            "studies_fts JOIN studies s ON s.rowid = studies_fts.rowid"
+            if use_fts
+            else "studies s"
+        )
+        order = "ORDER BY studies_fts.rank, s.nct_id" if use_fts else "ORDER BY s.nct_id"
+
+        with self._connect() as connection:
+            rows = connection.execute(
+                f"SELECT s.payload FROM {source}{where} {order} LIMIT ? OFFSET ?",
+                args + [page_size + 1, offset],
+            ).fetchall()
+            total = None
+            if str(params.get("countTotal", "")).lower() == "true" and not offset:
+                total = connection.execute(f"SELECT COUNT(*) FROM {source}{where}", args).fetchone()[0]
+
+        data: Dict[str, Any] = {"studies": [json.loads(row[0]) for row in rows[:page_size]]}
+        if len(rows) > page_size:
+            data["nextPageToken"] = str(offset + page_size)
+        if total is not None:
+            data["totalCount"] = total
+        return data
+
+
+_stores: Dict[str, ClinicalTrialsStore] = {}
+
+
+def get_store(path: Optional[os.PathLike] = None) -> ClinicalTrialsStore:
+    """Return a shared :class:`ClinicalTrialsStore` for ``path``."""
+
+    key = str(Path(path or DEFAULT_DB_PATH).resolve())
+    store = _stores.get(key)
+    if store is None:
+        store = _stores[key] = ClinicalTrialsStore(key)
+    return store
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the local ClinicalTrials.gov mirror.")
+    parser.add_argument("--db", default=str(DEFAULT_DB_PATH), help="SQLite database path")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    load = subcommands.add_parser("load", help="Load a bulk export into the mirror")
+    load.add_argument("export", help="Bulk export zip, directory, JSON or JSON Lines file")
+    load.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    store = ClinicalTrialsStore(args.db)
+    if args.command == "load":
+        inserted, updated = store.load_bulk_export(args.export, batch_size=args.batch_size)
+        print(f"Loaded {args.export}: {inserted} inserted, {updated} updated, {store.count()} total")
+
+
+if __name__ == "__main__":
+    main()
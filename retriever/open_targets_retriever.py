@@ -1,101 +1,465 @@
-import requests
+import os
+import hashlib
+import json
 import logging
+import threading
+import time
+from collections import OrderedDict
+
 import pandas as pd
 
+from retriever.open_targets_store import get_release
+from utils import http_client
+from utils.cache import get_cache, make_key
+from utils.fanout import map_concurrent
+
 BASE_URL = "https://api.platform.opentargets.org/api/v4/graphql"
-cache = {}
+TIMEOUT = float(os.environ.get("GRID_OPEN_TARGETS_TIMEOUT", "30"))
+# ``api`` queries the GraphQL API; ``local`` answers from a Parquet release.
+BACKEND = os.environ.get("GRID_OPEN_TARGETS_BACKEND", "api").lower()
+BACKENDS = ("api", "local")
+# Responses are shared by every worker on the host through the disk cache,
+# which evicts least-recently-used entries once it exceeds its size limit.
+CACHE_TTL = int(os.environ.get("GRID_OPEN_TARGETS_CACHE_TTL", str(24 * 60 * 60)))
+CACHE_SIZE_LIMIT = int(os.environ.get("GRID_OPEN_TARGETS_CACHE_SIZE_LIMIT", str(256 * 1024 * 1024)))
+# Entry bound of the per-process fallback used when diskcache is unavailable.
+MEMORY_CACHE_ENTRIES = int(os.environ.get("GRID_OPEN_TARGETS_MEMORY_CACHE_ENTRIES", "256"))
+
+
+class _MemoryCache:
+    """Small per-process LRU with expiry, mirroring the diskcache calls used here."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[0] is not None and entry[0] < time.time()):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, expire=None):
+        with self._lock:
+            self._entries[key] = (time.time() + expire if expire else None, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return self.hits, self.misses
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_memory_cache = _MemoryCache(MEMORY_CACHE_ENTRIES)
+
+
+def _response_cache():
+    # Hit/miss statistics are kept in the cache itself, so they cover every worker.
+    cache = get_cache("open_targets", size_limit=CACHE_SIZE_LIMIT, statistics=True)
+    return _memory_cache if cache is None else cache
+
+
+def _cache_key(query, variables):
+    # Whitespace in the GraphQL document is insignificant; make_key sorts
+    # the variables so their order does not matter either.
+    query_hash = hashlib.sha256(" ".join(query.split()).encode("utf-8")).hexdigest()
+    return make_key("open-targets", {"query": query_hash, "variables": variables or {}})
+
+
+def cache_stats():
+    """Return hit/miss counters and the size of the response cache."""
+    cache = _response_cache()
+    hits, misses = cache.stats()
+    lookups = hits + misses
+    return {
+        "backend": "memory" if cache is _memory_cache else "disk",
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / lookups, 3) if lookups else None,
+        "entries": len(cache),
+        "size_bytes": cache.volume() if cache is not _memory_cache else None,
+    }
+
+
+def clear_cache():
+    """Drop every cached response (e.g. after an Open Targets data release)."""
+    _response_cache().clear()
+
+
+def _post(query, variables):
+    response = http_client.post(
+        BASE_URL,
+        json={"query": query, "variables": variables},
+        headers={"Content-Type": "application/json"},
+        timeout=TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def _resolve_backend(backend):
+    resolved = (backend or BACKEND).lower()
+    if resolved not in BACKENDS:
+        raise ValueError(f"Unknown Open Targets backend '{resolved}'; expected one of {BACKENDS}")
+    return resolved
+
 
 def query_api(query, variables=None):
-    key = f"{query}-{variables}"
-    if key in cache:
+    cache = _response_cache()
+    key = _cache_key(query, variables)
+    cached = cache.get(key)
+    if cached is not None:
         logging.info(f"Cache hit for query with variables: {variables}")
-        return cache[key]
+        return cached
 
     try:
-        response = requests.post(
-            BASE_URL,
-            json={"query": query, "variables": variables},
-            headers={"Content-Type": "application/json"},
-        )
-        response.raise_for_status()
-        data = response.json()
+        data = _post(query, variables)
 
         if "errors" in data:
             logging.error(f"GraphQL errors: {data['errors']}")
             raise ValueError(f"GraphQL errors: {data['errors']}")
 
-        cache[key] = data
+        cache.set(key, data, expire=CACHE_TTL)
         return data
     except Exception as e:
         logging.error(f"API query failed: {e}")
         raise
 
-def query_disease_known_drugs(efo_id: str):
-    query = """
-    query ($efoId: String!) {
-      disease(efoId: $efoId) {
-        knownDrugs {
-          rows {
-            drug {
-              name
-              id
-              maximumClinicalTrialPhase
-            }
-            phase
-            label
-            targetClass
-          }
+
+# === Batched, paginated lookups ===
+# Each lookup kind is (root field, argument, connection field, row selection,
+# pagination style). Any mix of lookups is sent as one document with an alias
+# per lookup, e.g. ``l0: disease(efoId: $v0) { knownDrugs(size: 100) { ... } }``,
+# and the response is split back out per alias. Paginated connections are
+# followed page by page: knownDrugs with its cursor, associatedTargets by page
+# index (its rows come sorted by descending association score).
+KNOWN_DRUGS_ROWS = """
+      rows {
+        drug {
+          name
+          id
+          maximumClinicalTrialPhase
         }
-      }
-    }
+        phase
+        label
+        targetClass
+      }"""
+INDICATIONS_ROWS = """
+      rows {
+        disease {
+          name
+          id
+        }
+        maxPhaseForIndication
+      }"""
+ASSOCIATED_TARGETS_ROWS = """
+      rows {
+        target {
+          id
+          approvedSymbol
+          approvedName
+        }
+        score
+        datasourceScores {
+          id
+          score
+        }
+      }"""
+
+LOOKUPS = {
+    "disease_known_drugs": ("disease", "efoId", "knownDrugs", KNOWN_DRUGS_ROWS, "cursor"),
+    "drug_indications": ("drug", "chemblId", "indications", INDICATIONS_ROWS, None),
+    "target_associated_diseases": ("disease", "efoId", "associatedTargets", ASSOCIATED_TARGETS_ROWS, "page"),
+}
+# Upper bound on lookups per document, to keep single requests reasonable.
+BATCH_SIZE = max(1, int(os.environ.get("GRID_OPEN_TARGETS_BATCH_SIZE", "20")))
+# Rows requested per page, and the most rows kept per lookup (0 = no limit).
+PAGE_SIZE = max(1, int(os.environ.get("GRID_OPEN_TARGETS_PAGE_SIZE", "100")))
+ROW_BUDGET = int(os.environ.get("GRID_OPEN_TARGETS_ROW_BUDGET", "500"))
+# Associated targets scoring below this end the pagination early (0 = keep all).
+MIN_TARGET_SCORE = float(os.environ.get("GRID_OPEN_TARGETS_MIN_SCORE", "0"))
+
+
+class _Pager:
+    """Pagination state of one lookup."""
+
+    def __init__(self, kind, page_size=None, max_rows=None, min_score=None):
+        self.paging = LOOKUPS[kind][4]
+        self.max_rows = ROW_BUDGET if max_rows is None else max_rows
+        self.min_score = MIN_TARGET_SCORE if min_score is None else min_score
+        size = page_size or PAGE_SIZE
+        # Page indexes assume a constant size, so the budget caps it up front.
+        self.size = min(size, self.max_rows) if self.max_rows > 0 else size
+        self.position = 0 if self.paging == "page" else None
+        self.fetched = 0
+        self.kept = 0
+        self.done = False
+        self.partial = False
+
+    def accept(self, connection):
+        """Consume one page and return the rows to keep from it."""
+        connection = connection or {}
+        page = connection.get("rows") or []
+        self.fetched += len(page)
+        rows = page
+        if self.paging == "page" and self.min_score > 0:
+            rows = [row for row in page if (row.get("score") or 0) >= self.min_score]
+            # Rows are sorted by score, so every later page scores lower still.
+            self.done = len(rows) < len(page)
+        if self.max_rows > 0 and self.kept + len(rows) >= self.max_rows:
+            rows = rows[: self.max_rows - self.kept]
+            self.done = True
+        self.kept += len(rows)
+
+        count = connection.get("count")
+        # A short page is the last one, whatever the reported count.
+        if len(page) < self.size or self.paging is None or (count is not None and self.fetched >= count):
+            self.done = True
+        elif self.paging == "cursor":
+            self.position = connection.get("cursor")
+            self.done = self.done or not self.position
+        else:
+            self.position += 1
+        return rows
+
+
+def _connection_field(kind, variable, position=None, page_size=None):
+    root, argument, connection, rows, paging = LOOKUPS[kind]
+    size = page_size or PAGE_SIZE
+    if paging == "cursor":
+        cursor = f", cursor: {json.dumps(position)}" if position else ""
+        connection = f"{connection}(size: {size}{cursor}) {{\n      count\n      cursor"
+    elif paging == "page":
+        connection = f"{connection}(page: {{index: {position or 0}, size: {size}}}) {{\n      count"
+    else:
+        connection = f"{connection} {{"
+    return f"{root}({argument}: ${variable}) {{\n    {connection}{rows}\n    }}\n  }}"
+
+
+def build_batch_query(lookups, positions=None, page_size=None):
+    """Return an aliased GraphQL document and its variables for ``lookups``.
+
+    ``lookups`` is a sequence of ``(kind, identifier)`` pairs; the result
+    for the n-th pair is returned under the alias ``l<n>``. Lookups sharing
+    an identifier share a variable. ``positions`` maps a lookup to the page
+    cursor or index to request (the first page by default).
     """
-    variables = {"efoId": efo_id}
-    data = query_api(query, variables)
-    return data.get("data", {}).get("disease", {}).get("knownDrugs", {}).get("rows", [])
+    positions = positions or {}
+    variables, params, fields, names = {}, [], [], {}
+    for index, lookup in enumerate(lookups):
+        identifier = lookup[1]
+        name = names.get(identifier)
+        if name is None:
+            name = names[identifier] = f"v{len(names)}"
+            variables[name] = identifier
+            params.append(f"${name}: String!")
+        field = _connection_field(lookup[0], name, positions.get(lookup), page_size)
+        fields.append(f"  l{index}: {field}")
+    return "query (" + ", ".join(params) + ") {\n" + "\n".join(fields) + "\n}", variables
 
-def query_drug_indications(chembl_id: str):
-    query = """
-    query ($chemblId: String!) {
-      drug(chemblId: $chemblId) {
-        indications {
-          rows {
-            disease {
-              name
-              id
-            }
-            maxPhaseForIndication
-          }
-        }
-      }
-    }
+
+def _lookup_cache_key(lookup, pager):
+    # Keyed on the equivalent single-lookup document and the row budget,
+    # independent of how lookups were batched.
+    query, variables = build_batch_query([lookup], page_size=pager.size)
+    return _cache_key(query, {**variables, "max_rows": pager.max_rows, "min_score": pager.min_score})
+
+
+def _graphql_problems(payload):
+    # Errors with a path belong to one alias; errors without one fail the batch.
+    problems = {}
+    for error in payload.get("errors") or []:
+        path = error.get("path") or [None]
+        problems.setdefault(path[0], []).append(error)
+    if problems:
+        logging.error(f"GraphQL errors: {payload['errors']}")
+    return problems
+
+
+def _page_connection(payload, alias, kind):
+    return ((payload.get("data") or {}).get(alias) or {}).get(LOOKUPS[kind][2])
+
+
+def _local_payload(batch, positions=None, page_size=None):
+    """Answer a batch from the local release, shaped like the GraphQL response."""
+    positions = positions or {}
+    size = page_size or PAGE_SIZE
+    release = get_release()
+    data, errors = {}, []
+    for index, lookup in enumerate(batch):
+        alias = f"l{index}"
+        paging = LOOKUPS[lookup[0]][4]
+        position = positions.get(lookup)
+        offset = int(position or 0) * (size if paging == "page" else 1)
+        try:
+            count, found = release.lookup(*lookup, offset=offset, size=size if paging else None)
+        except Exception as e:
+            errors.append({"message": str(e), "path": [alias]})
+            continue
+        connection = {"count": count, "rows": found}
+        if paging == "cursor":
+            # The cursor is the offset of the next row.
+            connection["cursor"] = str(offset + len(found)) if offset + len(found) < count else None
+        data[alias] = {LOOKUPS[lookup[0]][2]: connection}
+    payload = {"data": data}
+    if errors:
+        payload["errors"] = errors
+    return payload
+
+
+def _execute(batch, positions, page_size, backend):
+    if backend == "local":
+        return _local_payload(batch, positions, page_size)
+    query, variables = build_batch_query(batch, positions, page_size)
+    return _post(query, variables)
+
+
+def _fetch_pages(batch, pagers, rows, errors, backend="api"):
+    positions = {lookup: pagers[lookup].position for lookup in batch}
+    try:
+        payload = _execute(batch, positions, pagers[batch[0]].size, backend)
+    except Exception as e:
+        logging.error(f"API query failed: {e}")
+        payload = {"errors": [{"message": str(e)}]}
+
+    problems = _graphql_problems(payload)
+    for index, lookup in enumerate(batch):
+        alias = f"l{index}"
+        pager = pagers[lookup]
+        failures = problems.get(alias) or problems.get(None)
+        if failures and not pager.fetched:
+            errors[lookup] = ValueError(f"GraphQL errors: {failures}")
+        elif failures:
+            # Keep the pages already collected but do not cache a partial result.
+            logging.warning(f"Stopped paging {lookup} after {pager.kept} rows: {failures}")
+            pager.done = pager.partial = True
+        else:
+            rows.setdefault(lookup, []).extend(pager.accept(_page_connection(payload, alias, lookup[0])))
+
+
+def fetch_lookups(lookups, *, max_rows=None, min_score=None, page_size=None, backend=None):
+    """Resolve ``(kind, identifier)`` lookups with as few requests as possible.
+
+    Cached lookups are answered locally. The rest are merged into aliased
+    documents of up to ``GRID_OPEN_TARGETS_BATCH_SIZE`` lookups each. Every
+    round trip fetches the next page of every lookup that still needs rows,
+    until each has reached its ``max_rows`` budget
+    (``GRID_OPEN_TARGETS_ROW_BUDGET``), run out of rows or, for associated
+    targets, dropped below ``min_score``. A typical multi-entity query
+    therefore costs a single request; larger ones send the batches of each
+    round concurrently. Returns ``(rows, errors)``: dicts keyed by lookup,
+    in request order, holding the result rows or the exception for lookups
+    that failed.
+
+    ``backend`` selects ``api`` (the GraphQL API) or ``local`` (the Parquet
+    release in :mod:`retriever.open_targets_store`); it defaults to
+    ``GRID_OPEN_TARGETS_BACKEND``. Both return identically shaped rows.
+    Local lookups bypass the response cache.
     """
-    variables = {"chemblId": chembl_id}
-    data = query_api(query, variables)
-    return data.get("data", {}).get("drug", {}).get("indications", {}).get("rows", [])
+    backend = _resolve_backend(backend)
+    unique = list(dict.fromkeys((kind, identifier) for kind, identifier in lookups))
+    cache = _response_cache() if backend == "api" else None
+    pagers = {lookup: _Pager(lookup[0], page_size, max_rows, min_score) for lookup in unique}
+    rows, errors, pending = {}, {}, []
+    for lookup in unique:
+        cached = cache.get(_lookup_cache_key(lookup, pagers[lookup])) if cache is not None else None
+        if cached is not None:
+            rows[lookup] = cached
+        else:
+            pending.append(lookup)
+    if len(unique) > len(pending):
+        logging.info(f"Cache hit for {len(unique) - len(pending)} of {len(unique)} Open Targets lookups")
 
-def query_target_associated_diseases(efo_id: str):
-    query = """
-    query ($efoId: String!) {
-      disease(efoId: $efoId) {
-        associatedTargets {
-          rows {
-            target {
-              id
-              approvedSymbol
-              approvedName
-            }
-            datasourceScores {
-              id
-              score
-            }
-          }
-        }
-      }
-    }
+    active = pending
+    while active:
+        # Batches of one round touch disjoint lookups, so they run concurrently.
+        batches = [active[start:start + BATCH_SIZE] for start in range(0, len(active), BATCH_SIZE)]
+        outcomes = map_concurrent(lambda batch: _fetch_pages(batch, pagers, rows, errors, backend), batches)
+        for batch, (_, error) in zip(batches, outcomes):
+            if error is not None:
+                logging.error(f"Open Targets batch failed: {error}")
+                errors.update({lookup: error for lookup in batch if lookup not in rows})
+                for lookup in batch:
+                    pagers[lookup].done = pagers[lookup].partial = True
+        active = [lookup for lookup in active if lookup not in errors and not pagers[lookup].done]
+
+    for lookup in pending:
+        if cache is not None and lookup not in errors and not pagers[lookup].partial:
+            cache.set(_lookup_cache_key(lookup, pagers[lookup]), rows[lookup], expire=CACHE_TTL)
+
+    # Copies, since a timed-out batch may still be appending in the background.
+    ordered = {lookup: list(rows[lookup]) for lookup in unique if lookup in rows and lookup not in errors}
+    return ordered, {lookup: errors[lookup] for lookup in unique if lookup in errors}
+
+
+def iter_lookup_rows(kind, identifier, *, max_rows=None, min_score=None, page_size=None, backend=None):
+    """Stream the rows of one lookup page by page, stopping at the budget.
+
+    Unlike :func:`fetch_lookups` this neither batches nor caches; it suits
+    callers that consume rows as they arrive and may stop early themselves.
     """
-    variables = {"efoId": efo_id}
-    data = query_api(query, variables)
-    return data.get("data", {}).get("disease", {}).get("associatedTargets", {}).get("rows", [])
+    backend = _resolve_backend(backend)
+    lookup = (kind, identifier)
+    pager = _Pager(kind, page_size, max_rows, min_score)
+    while not pager.done:
+        payload = _execute([lookup], {lookup: pager.position}, pager.size, backend)
+        problems = _graphql_problems(payload)
+        if problems:
+            raise ValueError(f"GraphQL errors: {payload['errors']}")
+        yield from pager.accept(_page_connection(payload, "l0", kind))
+
+
+def iter_known_drugs(efo_id, **budget):
+    """Stream a disease's known drugs, following the connection cursor."""
+    return iter_lookup_rows("disease_known_drugs", efo_id, **budget)
+
+
+def iter_associated_targets(efo_id, **budget):
+    """Stream a disease's associated targets, highest association score first."""
+    return iter_lookup_rows("target_associated_diseases", efo_id, **budget)
+
+
+def row_budget(max_results=None):
+    """Rows to fetch per lookup so that ``max_results`` ranked rows stay reachable."""
+    if ROW_BUDGET <= 0 or not max_results:
+        return ROW_BUDGET
+    return max(ROW_BUDGET, max_results)
+
+
+def collect_rows(rows, kind):
+    """Concatenate the rows of every ``kind`` lookup in ``rows``."""
+    return [row for (lookup_kind, _), found in rows.items() if lookup_kind == kind for row in found]
+
+
+def _lookup(kind, identifier):
+    rows, errors = fetch_lookups([(kind, identifier)])
+    if errors:
+        raise errors[(kind, identifier)]
+    return rows[(kind, identifier)]
+
+
+def query_disease_known_drugs(efo_id: str):
+    return _lookup("disease_known_drugs", efo_id)
+
+def query_drug_indications(chembl_id: str):
+    return _lookup("drug_indications", chembl_id)
+
+def query_target_associated_diseases(efo_id: str):
+    return _lookup("target_associated_diseases", efo_id)
 
 def merge_and_rank(disease_known_drugs_rows, drug_indications_rows, target_associated_diseases_rows):
     df_dkd = pd.json_normalize(disease_known_drugs_rows, sep='_') if disease_known_drugs_rows else pd.DataFrame()
@@ -132,3 +496,15 @@ def merge_and_rank(disease_known_drugs_rows, drug_indications_rows, target_assoc
     merged_1 = merged_1.sort_values(by='combined_score', ascending=False)
 
     return merged_1, df_tad
+
+def limit_results(df, max_results=None):
+    """Keep the top ``max_results`` rows of an already ranked frame.
+
+    ``total_count`` and ``truncated`` are recorded in ``df.attrs`` so callers
+    can report how much of the result set was kept.
+    """
+    total = len(df)
+    if max_results and total > max_results:
+        df = df.head(max_results).copy()
+    df.attrs.update({"total_count": total, "truncated": total > len(df)})
+    return df
@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""Local, memory-mapped index over an Open Targets Platform Parquet release.
+
+Open Targets publishes every platform release as Parquet datasets (for
+example ``ftp.ebi.ac.uk/pub/databases/opentargets/platform/<release>/output/etl/parquet/``).
+:class:`OpenTargetsRelease` answers the retriever's three lookups from a
+local copy of that directory without any network call:
+
+* ``disease_known_drugs`` from ``knownDrugsAggregated`` (joined with
+  ``molecule`` for the drug name and maximum clinical phase);
+* ``drug_indications`` from ``indication``;
+* ``target_associated_diseases`` from ``associationByOverallDirect`` (joined
+  with ``targets`` and ``associationByDatasourceDirect``).
+
+Parquet is compressed and encoded, so it cannot be mapped as it is. The
+first use of a dataset therefore converts the columns the lookups need into
+an uncompressed Arrow IPC file under ``<release>/_arrow/``. Its rows are
+already sorted into lookup order. Every process then opens that file with
+:func:`pyarrow.memory_map`, so all workers on a host share the same page
+cache instead of each holding a decoded copy. A process keeps only the start
+and end row of every EFO or ChEMBL ID. A lookup is a dictionary probe and a
+zero-copy slice of the matching rows. The rows have the same shape as the
+GraphQL selections in :mod:`retriever.open_targets_retriever`.
+
+A file is converted again when its Parquet source is newer. If the release
+directory is read-only, the dataset is read from Parquet into process
+memory instead. :meth:`OpenTargetsRelease.prepare` converts and indexes
+every dataset ahead of time; Celery pool processes call it on start-up. The
+conversion can also run on its own::
+
+    python -m retriever.open_targets_store prepare /data/opentargets/24.09
+
+Datasets are loaded independently, so a release without, say, the
+association datasets still answers the other lookups. Loading needs
+:mod:`pyarrow`.
+"""
+
+import argparse
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:  # pragma: no cover - optional dependency
+    import pyarrow as pa  # type: ignore
+    import pyarrow.compute as pc  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:  # pragma: no cover - the local backend is unavailable
+    pa = pc = pq = None
+
+DEFAULT_RELEASE_PATH = Path(
+    os.environ.get("GRID_OPEN_TARGETS_RELEASE")
+    or Path(__file__).resolve().parent.parent / "output" / "open_targets"
+)
+ARROW_DIR = "_arrow"
+
+# Dataset directory -> columns read from it.
+DATASETS = {
+    "knownDrugsAggregated": ("diseaseId", "drugId", "prefName", "phase", "label", "targetClass"),
+    "molecule": ("id", "name", "maximumClinicalTrialPhase"),
+    "indication": ("id", "indications"),
+    "associationByOverallDirect": ("diseaseId", "targetId", "score"),
+    "associationByDatasourceDirect": ("diseaseId", "targetId", "datasourceId", "score"),
+    "targets": ("id", "approvedSymbol", "approvedName"),
+}
+
+# Indexed dataset -> (key column, order of the rows within each key).
+INDEXES = {
+    "knownDrugsAggregated": ("diseaseId", (("phase", "descending"), ("drugId", "ascending"))),
+    "indication": ("id", ()),
+    "associationByOverallDirect": ("diseaseId", (("score", "descending"), ("targetId", "ascending"))),
+    "associationByDatasourceDirect": (
+        "diseaseId",
+        (("targetId", "ascending"), ("score", "descending"), ("datasourceId", "ascending")),
+    ),
+}
+
+Page = Tuple[int, List[Dict[str, Any]]]
+
+
+class _Index:
+    """Start and end row of every key in a table sorted by that key."""
+
+    def __init__(self, table, key: str) -> None:
+        self.table = table
+        self.spans: Dict[str, Tuple[int, int]] = {}
+        # Null keys sort last and are left out.
+        column = table.column(key)
+        column = column.slice(0, len(column) - column.null_count)
+        if not len(column):
+            return
+        # Runs of equal keys in the sorted column; dictionary codes follow
+        # first appearance, so code ``n`` is the ``n``-th run.
+        encoded = column.combine_chunks().dictionary_encode()
+        codes = encoded.indices.to_numpy()
+        starts = [0, *(codes[1:] != codes[:-1]).nonzero()[0] + 1]
+        stops = [*starts[1:], len(codes)]
+        self.spans = dict(zip(encoded.dictionary.to_pylist(), zip(starts, stops)))
+
+    def count(self, key: str) -> int:
+        start, stop = self.spans.get(key, (0, 0))
+        return stop - start
+
+    def rows(self, key: str, offset: int = 0, size: Optional[int] = None) -> List[Dict[str, Any]]:
+        start, stop = self.spans.get(key, (0, 0))
+        start = min(start + offset, stop)
+        if size is not None:
+            stop = min(stop, start + size)
+        if start >= stop:
+            return []
+        return self.table.slice(start, stop - start).to_pylist()
+
+    def rows_where(self, key: str, column: str, value: Any) -> List[Dict[str, Any]]:
+        """Rows of ``key`` whose ``column`` equals ``value``.
+
+        ``column`` must be the first column the rows are ordered by within a
+        key, so the matches are a contiguous run that two binary searches find.
+        """
+
+        values = self.table.column(column)
+        start, stop = self.spans.get(key, (0, 0))
+        first = _bisect(values, start, stop, lambda found: found < value)
+        last = _bisect(values, first, stop, lambda found: found <= value)
+        if first >= last:
+            return []
+        return self.table.slice(first, last - first).to_pylist()
+
+
+def _bisect(column, low: int, high: int, before) -> int:
+    """First position in ``column[low:high]`` whose value fails ``before``; nulls sort last."""
+
+    while low < high:
+        middle = (low + high) // 2
+        found = column[middle].as_py()
+        if found is not None and before(found):
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def _newest_mtime(location: Path) -> float:
+    return max((child.stat().st_mtime for child in location.rglob("*")), default=location.stat().st_mtime)
+
+
+class OpenTargetsRelease:
+    """Indexed Open Targets release answering the retriever's lookups."""
+
+    def __init__(self, path: Optional[os.PathLike] = None) -> None:
+        if pq is None:
+            raise RuntimeError("The local Open Targets backend requires pyarrow.")
+        self.path = Path(path or DEFAULT_RELEASE_PATH)
+        self._indexes: Dict[str, _Index] = {}
+        self._names: Dict[str, Dict[str, Tuple[Any, Any]]] = {}
+        self._lock = threading.Lock()
+
+    # --- Loading --------------------------------------------------------
+    def _source(self, dataset: str) -> Path:
+        location = self.path / dataset
+        if not location.exists():
+            raise FileNotFoundError(f"Open Targets dataset '{dataset}' not found under {self.path}")
+        return location
+
+    def _decode(self, dataset: str):
+        """Read the dataset's columns from Parquet, sorted into lookup order."""
+
+        table = pq.read_table(str(self._source(dataset)), columns=list(DATASETS[dataset]))
+        if dataset in INDEXES:
+            key, order_by = INDEXES[dataset]
+            table = table.take(pc.sort_indices(table, sort_keys=[(key, "ascending"), *order_by]))
+        return table
+
+    def convert(self, dataset: str) -> Path:
+        """Write the dataset as an uncompressed Arrow IPC file unless it is current."""
+
+        source = self._source(dataset)
+        target = self.path / ARROW_DIR / f"{dataset}.arrow"
+        if target.exists() and target.stat().st_mtime >= _newest_mtime(source):
+            return target
+        table = self._decode(dataset)
+        target.parent.mkdir(exist_ok=True)
+        # Written aside and renamed, so other processes never map a partial file.
+        partial = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with pa.OSFile(str(partial), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(partial, target)
+        finally:
+            partial.unlink(missing_ok=True)
+        return target
+
+    def _read(self, dataset: str):
+        try:
+            target = self.convert(dataset)
+        except FileNotFoundError:
+            raise
+        except OSError as exc:
+            logging.warning("Cannot convert Open Targets dataset '%s' (%s); reading it into memory.", dataset, exc)
+            return self._decode(dataset)
+        return pa.ipc.open_file(pa.memory_map(str(target), "r")).read_all()
+
+    def _index(self, dataset: str) -> _Index:
+        index = self._indexes.get(dataset)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(dataset)
+                if index is None:
+                    index = self._indexes[dataset] = _Index(self._read(dataset), INDEXES[dataset][0])
+        return index
+
+    def _lookup_table(self, dataset: str) -> Dict[str, Tuple[Any, Any]]:
+        """Map the ``id`` of a small reference dataset to its other two columns."""
+
+        names = self._names.get(dataset)
+        if names is None:
+            with self._lock:
+                names = self._names.get(dataset)
+                if names is None:
+                    try:
+                        columns = self._read(dataset).to_pydict()
+                    except FileNotFoundError as exc:
+                        logging.warning("%s; the names and phases it provides will be empty.", exc)
+                        columns = {}
+                    first, second = DATASETS[dataset][1:]
+                    names = self._names[dataset] = dict(
+                        zip(columns.get("id", []), zip(columns.get(first, []), columns.get(second, [])))
+                    )
+        return names
+
+    def prepare(self) -> List[str]:
+        """Convert and index every dataset present, returning their names.
+
+        Pool processes call this on start-up, so the first lookup does not
+        pay for the conversion or the index.
+        """
+
+        prepared = []
+        for dataset in DATASETS:
+            if not (self.path / dataset).exists():
+                continue
+            if dataset in INDEXES:
+                self._index(dataset)
+            else:
+                self._lookup_table(dataset)
+            prepared.append(dataset)
+        return prepared
+
+    # --- Lookups --------------------------------------------------------
+    def known_drugs(self, efo_id: str, offset: int = 0, size: Optional[int] = None) -> Page:
+        """Drugs with clinical evidence for a disease, highest phase first."""
+
+        index = self._index("knownDrugsAggregated")
+        molecules = self._lookup_table("molecule")
+        rows = []
+        for row in index.rows(efo_id, offset, size):
+            name, max_phase = molecules.get(row["drugId"], (None, None))
+            rows.append(
+                {
+                    "drug": {
+                        "name": name or row["prefName"],
+                        "id": row["drugId"],
+                        "maximumClinicalTrialPhase": max_phase,
+                    },
+                    "phase": row["phase"],
+                    "label": row["label"],
+                    "targetClass": row["targetClass"],
+                }
+            )
+        return index.count(efo_id), rows
+
+    def indications(self, chembl_id: str, offset: int = 0, size: Optional[int] = None) -> Page:
+        """Diseases a drug is indicated for, in release order."""
+
+        index = self._index("indication")
+        found = [
+            {
+                "disease": {"name": item.get("efoName"), "id": item.get("disease")},
+                "maxPhaseForIndication": item.get("maxPhaseForIndication"),
+            }
+            for row in index.rows(chembl_id)
+            for item in row["indications"] or []
+        ]
+        stop = None if size is None else offset + size
+        return len(found), found[offset:stop]
+
+    def associated_targets(self, efo_id: str, offset: int = 0, size: Optional[int] = None) -> Page:
+        """Targets directly associated with a disease, highest score first."""
+
+        index = self._index("associationByOverallDirect")
+        page = index.rows(efo_id, offset, size)
+        targets = self._lookup_table("targets")
+        datasource_scores: Dict[str, List[Dict[str, Any]]] = {}
+        if page:
+            try:
+                by_datasource = self._index("associationByDatasourceDirect")
+            except FileNotFoundError:
+                by_datasource = None
+            # Only the page's own targets are fetched, so deep pages of a
+            # disease with many associations do not rescan all of them.
+            for row in page if by_datasource else []:
+                datasource_scores[row["targetId"]] = [
+                    {"id": match["datasourceId"], "score": match["score"]}
+                    for match in by_datasource.rows_where(efo_id, "targetId", row["targetId"])
+                ]
+        rows = []
+        for row in page:
+            symbol, name = targets.get(row["targetId"], (None, None))
+            rows.append(
+                {
+                    "target": {"id": row["targetId"], "approvedSymbol": symbol, "approvedName": name},
+                    "score": row["score"],
+                    "datasourceScores": datasource_scores.get(row["targetId"], []),
+                }
+            )
+        return index.count(efo_id), rows
+
+    def lookup(self, kind: str, identifier: str, offset: int = 0, size: Optional[int] = None) -> Page:
+        """Return ``(count, rows)`` for a retriever lookup kind."""
+
+        method = _KINDS.get(kind)
+        if method is None:
+            raise ValueError(f"Unknown Open Targets lookup '{kind}'")
+        return getattr(self, method)(identifier, offset, size)
+
+
+_KINDS = {
+    "disease_known_drugs": "known_drugs",
+    "drug_indications": "indications",
+    "target_associated_diseases": "associated_targets",
+}
+
+_releases: Dict[str, OpenTargetsRelease] = {}
+_releases_lock = threading.Lock()
+
+
+def get_release(path: Optional[os.PathLike] = None) -> OpenTargetsRelease:
+    """Return a shared :class:`OpenTargetsRelease` for ``path``."""
+
+    key = str(Path(path or DEFAULT_RELEASE_PATH).resolve())
+    with _releases_lock:
+        release = _releases.get(key)
+        if release is None:
+            release = _releases[key] = OpenTargetsRelease(key)
+    return release
+
+
+def prepare_in_background(path: Optional[os.PathLike] = None) -> threading.Thread:
+    """Run :meth:`OpenTargetsRelease.prepare` for ``path`` on a daemon thread."""
+
+    def _prepare() -> None:
+        try:
+            prepared = get_release(path).prepare()
+        except Exception:  # pragma: no cover - lookups retry and report the error
+            logging.exception("Could not prepare the local Open Targets release")
+        else:
+            logging.info("Open Targets datasets ready: %s", ", ".join(prepared) or "none")
+
+    thread = threading.Thread(target=_prepare, name="grid-open-targets-prepare", daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the local Open Targets release.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    prepare = subcommands.add_parser("prepare", help="Convert a release to memory-mappable Arrow files")
+    prepare.add_argument("release", nargs="?", default=str(DEFAULT_RELEASE_PATH), help="Release directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "prepare":
+        release = OpenTargetsRelease(args.release)
+        print(f"Prepared {', '.join(release.prepare()) or 'no datasets'} under {release.path / ARROW_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""Pluggable writers for the tabular artifacts produced by each pipeline.
+
+Retrievers hand their result frames to :func:`write_artifact` instead of
+calling ``DataFrame.to_csv`` directly. The on-disk format and the write mode
+are chosen from the environment:
+
+``GRID_ARTIFACT_FORMAT``
+    ``csv`` (default), ``parquet`` or ``arrow`` (Feather v2 / Arrow IPC).
+    The columnar formats need :mod:`pyarrow`; without it CSV is written.
+``GRID_ARTIFACT_COMPRESSION``
+    Codec for the columnar formats (default ``zstd``).
+``GRID_ARTIFACT_MODE``
+    ``sync`` writes before returning, ``async`` hands the frame to a
+    background thread and ``off`` skips writing entirely.
+
+:func:`artifact_mode` overrides the mode for the current context, which is
+how the web application keeps artifact I/O off the request path.
+
+Outside a scope, artifacts keep their fixed names under ``GRID_ARTIFACT_DIR``.
+Inside :func:`collect_artifacts` they are stored by content instead: each
+file is named after the SHA-256 of its bytes under ``GRID_ARTIFACT_STORE_DIR``
+so identical result sets are written once, and the :class:`ArtifactScope`
+records which objects belong to the run (for example one web query).
+"""
+
+import atexit
+import contextvars
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Callable, Dict, Iterator, List, Optional, Union
+
+import pandas as pd
+
+try:  # pragma: no cover - optional dependency
+    import pyarrow  # type: ignore  # noqa: F401
+except ImportError:  # pragma: no cover - columnar formats fall back to CSV
+    pyarrow = None
+
+ARTIFACT_DIR = os.environ.get("GRID_ARTIFACT_DIR", "output")
+ARTIFACT_STORE_DIR = Path(
+    os.environ.get("GRID_ARTIFACT_STORE_DIR")
+    or Path(__file__).resolve().parent.parent / "output" / "artifacts"
+)
+ARTIFACT_FORMAT = os.environ.get("GRID_ARTIFACT_FORMAT", "csv").lower()
+ARTIFACT_COMPRESSION = os.environ.get("GRID_ARTIFACT_COMPRESSION", "zstd")
+ARTIFACT_MODE = os.environ.get("GRID_ARTIFACT_MODE", "sync").lower()
+ARTIFACT_WORKERS = int(os.environ.get("GRID_ARTIFACT_WORKERS", "2"))
+
+MODES = ("sync", "async", "off")
+
+# Writers accept either a file path or a binary buffer.
+Writer = Callable[[pd.DataFrame, Union[str, IO[bytes]]], None]
+
+_mode_override: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "grid_artifact_mode", default=None
+)
+_active_scope: contextvars.ContextVar[Optional["ArtifactScope"]] = contextvars.ContextVar(
+    "grid_artifact_scope", default=None
+)
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_pending: List[Future] = []
+
+
+def _write_csv(df: pd.DataFrame, target) -> None:
+    df.to_csv(target, index=False)
+
+
+def _write_parquet(df: pd.DataFrame, target) -> None:
+    df.to_parquet(target, index=False, compression=ARTIFACT_COMPRESSION)
+
+
+def _write_arrow(df: pd.DataFrame, target) -> None:
+    df.reset_index(drop=True).to_feather(target, compression=ARTIFACT_COMPRESSION)
+
+
+# format -> (file suffix, writer, needs pyarrow)
+WRITERS: Dict[str, tuple] = {
+    "csv": (".csv", _write_csv, False),
+    "parquet": (".parquet", _write_parquet, True),
+    "arrow": (".arrow", _write_arrow, True),
+}
+
+
+def register_writer(fmt: str, suffix: str, writer: Writer, *, needs_pyarrow: bool = False) -> None:
+    """Register an additional artifact format under ``fmt``."""
+
+    WRITERS[fmt.lower()] = (suffix, writer, needs_pyarrow)
+
+
+def resolve_format(fmt: Optional[str] = None) -> str:
+    """Return the usable format for ``fmt`` (default ``GRID_ARTIFACT_FORMAT``)."""
+
+    fmt = (fmt or ARTIFACT_FORMAT).lower()
+    if fmt not in WRITERS:
+        logging.warning("Unknown artifact format '%s'; writing CSV instead.", fmt)
+        return "csv"
+    if WRITERS[fmt][2] and pyarrow is None:
+        logging.warning("pyarrow is not installed; writing CSV instead of %s.", fmt)
+        return "csv"
+    return fmt
+
+
+def resolve_mode(mode: Optional[str] = None) -> str:
+    mode = (mode or _mode_override.get() or ARTIFACT_MODE).lower()
+    if mode not in MODES:
+        logging.warning("Unknown artifact mode '%s'; writing synchronously.", mode)
+        return "sync"
+    return mode
+
+
+@contextmanager
+def artifact_mode(mode: Optional[str]) -> Iterator[None]:
+    """Use ``mode`` for every artifact written within the ``with`` block."""
+
+    token = _mode_override.set(mode)
+    try:
+        yield
+    finally:
+        _mode_override.reset(token)
+
+
+def artifact_path(filename: str, fmt: str, directory: Optional[str] = None) -> str:
+    """Return where ``filename`` is written in ``fmt``, swapping its extension."""
+
+    stem, _ = os.path.splitext(filename)
+    return os.path.join(directory or ARTIFACT_DIR, stem + WRITERS[fmt][0])
+
+
+@dataclass(frozen=True)
+class StoredArtifact:
+    """A result table persisted in the content-addressed store."""
+
+    name: str
+    sha256: str
+    format: str
+    size: int
+    rows: int
+
+
+def object_path(sha256: str, fmt: str, store_dir: Optional[Path] = None) -> Path:
+    """Return the location of the stored object with digest ``sha256``."""
+
+    return Path(store_dir or ARTIFACT_STORE_DIR) / sha256[:2] / f"{sha256}{WRITERS[fmt][0]}"
+
+
+def store_object(df: pd.DataFrame, name: str, fmt: str, store_dir: Optional[Path] = None) -> StoredArtifact:
+    """Serialise ``df`` and store it under its content hash, once.
+
+    An object that already exists is left untouched, so re-running a query
+    that yields the same table costs no extra disk space.
+    """
+
+    buffer = io.BytesIO()
+    WRITERS[fmt][1](df, buffer)
+    data = buffer.getvalue()
+    digest = hashlib.sha256(data).hexdigest()
+
+    path = object_path(digest, fmt, store_dir)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so concurrent workers never observe partial files.
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        logging.info("Stored artifact %s as %s", name, path)
+    else:
+        logging.debug("Artifact %s already stored as %s", name, path)
+
+    stem, _ = os.path.splitext(name)
+    return StoredArtifact(
+        name=stem + WRITERS[fmt][0],
+        sha256=digest,
+        format=fmt,
+        size=len(data),
+        rows=len(df),
+    )
+
+
+class ArtifactScope:
+    """Collects the artifacts stored while the scope is active."""
+
+    def __init__(self, key: str, store_dir: Optional[Path] = None) -> None:
+        self.key = key
+        self.store_dir = store_dir
+        self._lock = threading.Lock()
+        self._entries: List[Union[StoredArtifact, Future]] = []
+
+    def _add(self, entry: Union[StoredArtifact, Future]) -> None:
+        with self._lock:
+            self._entries.append(entry)
+
+    def results(self, timeout: Optional[float] = None) -> List[StoredArtifact]:
+        """Return the stored artifacts, waiting for background writes.
+
+        Writes that failed or did not finish within ``timeout`` are skipped.
+        When several tables share a name the last one wins.
+        """
+
+        with self._lock:
+            entries = list(self._entries)
+
+        stored: Dict[str, StoredArtifact] = {}
+        for entry in entries:
+            if isinstance(entry, Future):
+                try:
+                    entry = entry.result(timeout=timeout)
+                except FutureTimeoutError:
+                    logging.warning("Artifact write for %s timed out", self.key)
+                    continue
+                except Exception:  # already logged by _write
+                    continue
+            stored[entry.name] = entry
+        return list(stored.values())
+
+
+@contextmanager
+def collect_artifacts(scope: Optional[ArtifactScope]) -> Iterator[Optional[ArtifactScope]]:
+    """Store every artifact written within the ``with`` block in ``scope``."""
+
+    token = _active_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _active_scope.reset(token)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=ARTIFACT_WORKERS, thread_name_prefix="grid-artifacts"
+                )
+    return _executor
+
+
+def _write(writer: Writer, df: pd.DataFrame, path: str) -> str:
+    try:
+        writer(df, path)
+    except Exception:
+        logging.exception("Failed to write artifact %s", path)
+        raise
+    logging.info("Results saved to: %s", path)
+    return path
+
+
+def _store(scope: ArtifactScope, df: pd.DataFrame, name: str, fmt: str) -> StoredArtifact:
+    try:
+        return store_object(df, name, fmt, scope.store_dir)
+    except Exception:
+        logging.exception("Failed to store artifact %s for %s", name, scope.key)
+        raise
+
+
+def _submit(fn, *args) -> Future:
+    future = _get_executor().submit(fn, *args)
+    with _executor_lock:
+        _pending[:] = [pending for pending in _pending if not pending.done()]
+        _pending.append(future)
+    return future
+
+
+def write_artifact(
+    df: pd.DataFrame,
+    filename: str,
+    *,
+    fmt: Optional[str] = None,
+    mode: Optional[str] = None,
+    directory: Optional[str] = None,
+) -> Optional[str]:
+    """Persist ``df`` as ``filename`` and return the artifact path.
+
+    Returns ``None`` when writing is switched off. In ``async`` mode the path
+    is returned immediately and the file appears once the background write
+    finishes; :func:`flush` waits for outstanding writes.
+
+    Within :func:`collect_artifacts` the table goes to the content-addressed
+    store and is recorded on the scope. The object path is returned for
+    synchronous writes; asynchronous ones resolve through
+    :meth:`ArtifactScope.results`.
+    """
+
+    mode = resolve_mode(mode)
+    if mode == "off":
+        return None
+
+    fmt = resolve_format(fmt)
+    scope = _active_scope.get()
+    # A shallow copy is enough to stop callers adding or dropping columns
+    # underneath the background writer.
+    if scope is not None:
+        if mode == "sync":
+            stored = _store(scope, df, filename, fmt)
+            scope._add(stored)
+            return str(object_path(stored.sha256, fmt, scope.store_dir))
+        scope._add(_submit(_store, scope, df.copy(deep=False), filename, fmt))
+        return None
+
+    path = artifact_path(filename, fmt, directory)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    writer = WRITERS[fmt][1]
+
+    if mode == "sync":
+        return _write(writer, df, path)
+
+    _submit(_write, writer, df.copy(deep=False), path)
+    return path
+
+
+def flush(timeout: Optional[float] = None) -> None:
+    """Block until every pending background write has finished."""
+
+    with _executor_lock:
+        pending, _pending[:] = list(_pending), []
+    for future in pending:
+        try:
+            future.result(timeout=timeout)
+        except Exception:  # already logged by _write
+            pass
+
+
+def _reset_executor() -> None:
+    # Worker threads do not survive a fork; start a fresh pool in the child.
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+    _pending.clear()
+
+
+atexit.register(flush)
+
+if hasattr(os, "register_at_fork"):  # pragma: no branch
+    os.register_at_fork(after_in_child=_reset_executor)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""Persistent, process-shared caches backed by :mod:`diskcache`.
+
+Each named cache lives in its own directory under ``GRID_CACHE_DIR`` (default
+``output/cache`` at the repository root). ``diskcache`` stores entries in
+SQLite with file locking, so every Celery worker process on a host reads and
+writes the same cache. Caches are size bounded (``GRID_CACHE_SIZE_LIMIT``
+bytes each) and evict least-recently-used entries once full. Set
+``GRID_CACHE_ENABLED=false`` to bypass caching entirely.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+try:  # pragma: no cover - optional dependency
+    import diskcache  # type: ignore
+except ImportError:  # pragma: no cover - caching is skipped without diskcache
+    diskcache = None
+
+CACHE_DIR = Path(
+    os.environ.get("GRID_CACHE_DIR")
+    or Path(__file__).resolve().parent.parent / "output" / "cache"
+)
+CACHE_ENABLED = os.environ.get("GRID_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}
+CACHE_SIZE_LIMIT = int(os.environ.get("GRID_CACHE_SIZE_LIMIT", str(512 * 1024 * 1024)))
+# Lifetime of cached LLM query parses, shared by every parser module.
+PARSE_CACHE_TTL = int(os.environ.get("GRID_PARSE_CACHE_TTL", str(7 * 24 * 60 * 60)))
+
+_caches: Dict[str, Any] = {}
+
+
+def get_cache(name: str, *, size_limit: Optional[int] = None, **settings: Any):
+    """Return the named on-disk cache, or ``None`` when caching is unavailable.
+
+    Extra ``settings`` (e.g. ``statistics=True`` for hit/miss counting) are
+    passed to :class:`diskcache.Cache` when the cache is first opened in
+    this process.
+    """
+
+    if not CACHE_ENABLED or diskcache is None:
+        return None
+
+    cache = _caches.get(name)
+    if cache is None:
+        try:
+            cache = diskcache.Cache(
+                str(CACHE_DIR / name),
+                size_limit=size_limit or CACHE_SIZE_LIMIT,
+                eviction_policy="least-recently-used",
+                **settings,
+            )
+        except Exception as exc:  # pragma: no cover - unwritable cache directory
+            logging.warning("Disk cache '%s' unavailable: %s", name, exc)
+            return None
+        _caches[name] = cache
+    return cache
+
+
+def make_key(namespace: str, payload: Any) -> str:
+    """Return a stable cache key for ``payload`` within ``namespace``.
+
+    The payload is serialised as canonical JSON (sorted keys) so logically
+    identical parameter sets map onto the same key regardless of ordering.
+    """
+
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+def normalize_text(text: Any) -> str:
+    """Normalise free text for use in a cache key.
+
+    Case and runs of whitespace do not change what a parser extracts, so
+    "Phase 2  Breast cancer" and "phase 2 breast cancer" share an entry.
+    """
+
+    return " ".join(str(text or "").split()).casefold()
+
+
+def _forget_caches() -> None:
+    # SQLite connections must not be shared with forked worker processes.
+    _caches.clear()
+
+
+if hasattr(os, "register_at_fork"):  # pragma: no branch
+    os.register_at_fork(after_in_child=_forget_caches)
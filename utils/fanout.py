@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""Bounded concurrent fan-out for independent blocking calls.
+
+The pipelines resolve several entities at once: ZOOMA and ChEMBL lookups per
+term, and Open Targets batches. :func:`map_concurrent` runs them on a small
+thread pool (``GRID_FANOUT_WORKERS``, default 8, within the shared HTTP
+client's per-host connection pool). The total latency is therefore close to
+the slowest call rather than the sum of all calls.
+
+Results come back in input order regardless of completion order, so merged
+output is deterministic. A call that raises, or that has not finished within
+``GRID_FANOUT_TIMEOUT`` seconds (per wave of ``workers`` calls), is reported
+as an error for its item without affecting the others. A timed-out call is
+abandoned rather than killed. The pool is shut down without waiting for it,
+so callers never block on a hung upstream.
+"""
+
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+FANOUT_WORKERS = max(1, int(os.environ.get("GRID_FANOUT_WORKERS", "8")))
+FANOUT_TIMEOUT = float(os.environ.get("GRID_FANOUT_TIMEOUT", "60"))
+
+Outcome = Tuple[Any, Optional[BaseException]]
+
+
+def map_concurrent(
+    func: Callable[[Any], Any],
+    items: Iterable[Any],
+    *,
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> List[Outcome]:
+    """Call ``func(item)`` for every item concurrently.
+
+    Returns one ``(value, error)`` pair per item, in input order; ``error``
+    is ``None`` on success, otherwise the raised exception or a
+    :class:`TimeoutError`.
+    """
+
+    items = list(items)
+    if not items:
+        return []
+    workers = min(max_workers or FANOUT_WORKERS, len(items))
+    timeout = FANOUT_TIMEOUT if timeout is None else timeout
+    # Items beyond the pool size queue behind earlier ones, so each wave of
+    # ``workers`` calls gets its own timeout.
+    deadline = time.monotonic() + timeout * math.ceil(len(items) / workers)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="grid-fanout")
+    try:
+        futures = [executor.submit(func, item) for item in items]
+        outcomes: List[Outcome] = []
+        for future in futures:
+            try:
+                outcomes.append((future.result(timeout=max(0.0, deadline - time.monotonic())), None))
+            except FutureTimeoutError:
+                future.cancel()
+                outcomes.append((None, TimeoutError(f"call did not finish within {timeout:g}s")))
+            except Exception as exc:
+                outcomes.append((None, exc))
+        return outcomes
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""Shared HTTP client used by every upstream integration.
+
+All retrievers and normalizers go through a single :class:`requests.Session`
+per process so TCP/TLS connections are kept alive and reused across pages,
+terms and pipelines. The session mounts an adapter with a per-host connection
+pool and a retry policy that backs off exponentially on connection errors,
+``429`` and ``5xx`` responses while honouring ``Retry-After`` headers.
+
+Tunables are read from the environment so deployments can adjust them
+without code changes:
+
+``GRID_HTTP_CONNECT_TIMEOUT`` / ``GRID_HTTP_READ_TIMEOUT``
+    Default connect and read timeouts in seconds.
+``GRID_HTTP_MAX_RETRIES`` / ``GRID_HTTP_BACKOFF_FACTOR``
+    Number of retries and the exponential backoff factor.
+``GRID_HTTP_MAX_RETRY_AFTER``
+    Upper bound (seconds) applied to server supplied ``Retry-After`` values.
+``GRID_HTTP_POOL_SIZE``
+    Maximum number of keep-alive connections kept per host.
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+Timeout = Union[float, Tuple[float, float]]
+
+CONNECT_TIMEOUT = float(os.environ.get("GRID_HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("GRID_HTTP_READ_TIMEOUT", "30"))
+MAX_RETRIES = int(os.environ.get("GRID_HTTP_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.environ.get("GRID_HTTP_BACKOFF_FACTOR", "0.5"))
+MAX_RETRY_AFTER = float(os.environ.get("GRID_HTTP_MAX_RETRY_AFTER", "60"))
+POOL_SIZE = int(os.environ.get("GRID_HTTP_POOL_SIZE", "10"))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# GraphQL lookups are read-only, so POST is retried alongside GET.
+RETRY_METHODS = frozenset({"GET", "HEAD", "POST"})
+
+DEFAULT_TIMEOUT: Tuple[float, float] = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+class _BoundedRetry(Retry):
+    """``Retry`` policy that caps how long a ``Retry-After`` header may stall us."""
+
+    def get_retry_after(self, response):  # type: ignore[override]
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, MAX_RETRY_AFTER)
+
+
+def build_retry() -> Retry:
+    """Return the retry policy mounted on the shared session."""
+
+    return _BoundedRetry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=MAX_RETRIES,
+        status=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=RETRY_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=POOL_SIZE,
+        pool_maxsize=POOL_SIZE,
+        max_retries=build_retry(),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session, creating it on first use."""
+
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def reset_session() -> None:
+    """Close and forget the shared session (e.g. after forking a worker)."""
+
+    global _session, _session_lock
+    session, _session = _session, None
+    _session_lock = threading.Lock()
+    if session is not None:
+        try:
+            session.close()
+        except Exception:  # pragma: no cover - best effort cleanup
+            logging.debug("Failed to close shared HTTP session", exc_info=True)
+
+
+if hasattr(os, "register_at_fork"):  # pragma: no branch
+    # Celery's prefork pool must not share sockets inherited from the parent.
+    os.register_at_fork(after_in_child=reset_session)
+
+
+def request(
+    method: str,
+    url: str,
+    *,
+    timeout: Optional[Timeout] = None,
+    **kwargs: Any,
+) -> requests.Response:
+    """Issue ``method`` against ``url`` through the shared session."""
+
+    return get_session().request(
+        method,
+        url,
+        timeout=DEFAULT_TIMEOUT if timeout is None else timeout,
+        **kwargs,
+    )
+
+
+def get(url: str, **kwargs: Any) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs: Any) -> requests.Response:
+    return request("POST", url, **kwargs)
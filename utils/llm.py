@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""Lazily constructed, process-wide LLM clients and chains.
+
+Building an ``Ollama`` client or an ``LLMChain`` pulls in LangChain and
+prepares connection state. Neither happens at import time: the first caller
+of :func:`get_llm` or :func:`get_chain` pays for it, and every later caller
+in the process reuses the same objects. Importing the agents, starting
+Django or collecting tests therefore never touches the LLM stack.
+
+``GRID_OLLAMA_MODEL`` selects the default model (``gemma2:latest``) and
+``GRID_OLLAMA_BASE_URL`` optionally points at a non-default Ollama server.
+``GRID_LLM_TIMEOUT`` bounds each request to the server, in seconds.
+
+Structured prompts ask for ``json_mode`` (Ollama's ``format="json"``) and a
+``num_predict`` cap, so the model emits exactly one JSON document and stops
+instead of rambling past it. ``GRID_LLM_NUM_PREDICT`` sets that cap for the
+parser prompts (256 tokens by default).
+
+``GRID_OLLAMA_KEEP_ALIVE`` (Ollama duration syntax, default ``30m``) tells
+the server how long to keep the model loaded after each request, so an idle
+spell shorter than that does not cost a full model load.
+"""
+
+import math
+import os
+import re
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+OLLAMA_MODEL = os.environ.get("GRID_OLLAMA_MODEL", "gemma2:latest")
+OLLAMA_BASE_URL = os.environ.get("GRID_OLLAMA_BASE_URL")
+LLM_TIMEOUT = float(os.environ.get("GRID_LLM_TIMEOUT", "60"))
+JSON_NUM_PREDICT = int(os.environ.get("GRID_LLM_NUM_PREDICT", "256"))
+KEEP_ALIVE = os.environ.get("GRID_OLLAMA_KEEP_ALIVE", "30m")
+
+_DURATION_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600}
+
+_llms: Dict[Tuple[str, bool, Optional[int]], Any] = {}
+_chains: Dict[Tuple[str, str, bool, Optional[int]], Any] = {}
+_lock = threading.RLock()
+
+
+def get_llm(
+    model: Optional[str] = None,
+    *,
+    json_mode: bool = False,
+    num_predict: Optional[int] = None,
+):
+    """Return the shared Ollama client for ``model``, creating it on first use.
+
+    ``json_mode`` constrains the output to a single JSON document and
+    ``num_predict`` caps the number of generated tokens.
+    """
+
+    key = (model or OLLAMA_MODEL, json_mode, num_predict)
+    llm = _llms.get(key)
+    if llm is None:
+        with _lock:
+            llm = _llms.get(key)
+            if llm is None:
+                from langchain_community.llms import Ollama
+
+                kwargs: Dict[str, Any] = {
+                    "model": key[0],
+                    "timeout": int(LLM_TIMEOUT),
+                    "keep_alive": KEEP_ALIVE,
+                }
+                if OLLAMA_BASE_URL:
+                    kwargs["base_url"] = OLLAMA_BASE_URL
+                if json_mode:
+                    kwargs["format"] = "json"
+                if num_predict:
+                    kwargs["num_predict"] = num_predict
+                llm = _llms[key] = Ollama(**kwargs)
+    return llm
+
+
+def get_chain(
+    name: str,
+    template: str,
+    input_variables: Sequence[str],
+    *,
+    model: Optional[str] = None,
+    json_mode: bool = False,
+    num_predict: Optional[int] = None,
+):
+    """Return the shared ``LLMChain`` registered as ``name`` for ``model``."""
+
+    key = (name, model or OLLAMA_MODEL, json_mode, num_predict)
+    chain = _chains.get(key)
+    if chain is None:
+        with _lock:
+            chain = _chains.get(key)
+            if chain is None:
+                from langchain.chains import LLMChain
+                from langchain.prompts import PromptTemplate
+
+                prompt = PromptTemplate(input_variables=list(input_variables), template=template)
+                llm = get_llm(model, json_mode=json_mode, num_predict=num_predict)
+                chain = _chains[key] = LLMChain(llm=llm, prompt=prompt)
+    return chain
+
+
+def keep_alive_seconds(value: Optional[str] = None) -> float:
+    """Return ``GRID_OLLAMA_KEEP_ALIVE`` in seconds (``inf`` when negative).
+
+    Unparseable values fall back to Ollama's own default of five minutes.
+    """
+
+    match = re.fullmatch(r"\s*(-?\d+(?:\.\d+)?)\s*([smh]?)\s*", str(KEEP_ALIVE if value is None else value))
+    if not match:
+        return 300.0
+    seconds = float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+    return math.inf if seconds < 0 else seconds
+
+
+def reset() -> None:
+    """Forget every client and chain (e.g. after forking a worker)."""
+
+    global _lock
+    _llms.clear()
+    _chains.clear()
+    _lock = threading.RLock()
+
+
+if hasattr(os, "register_at_fork"):  # pragma: no branch
+    # Clients hold HTTP connections that must not be shared with children.
+    os.register_at_fork(after_in_child=reset)
@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""Concurrency-limited gateway for every call to the local Ollama server.
+
+A single Ollama instance serves all Celery workers on a host. When too many
+generations run at once they all slow down, so every chain call goes through
+:func:`run` (or :func:`arun` from async code). The gateway:
+
+* holds one of ``GRID_LLM_MAX_CONCURRENCY`` slots for the duration of a
+  call. With :mod:`diskcache` the slots are shared by every process on the
+  host; otherwise the limit applies per process;
+* gives up with :class:`LLMBusyError` after waiting ``GRID_LLM_QUEUE_TIMEOUT``
+  seconds for a slot, and with :class:`LLMTimeoutError` once a call exceeds
+  its timeout (``GRID_LLM_TIMEOUT`` by default);
+* counts queue depth, in-flight calls, latencies and failures, readable
+  through :func:`metrics`. In-flight calls and queue depth count live
+  (expiring) slot and waiter entries, so the web process sees the workers'
+  calls and a worker that dies mid-call cannot leave either gauge inflated.
+  Call latencies are split into cold and warm: a call is cold when no call
+  to the same model finished within ``GRID_OLLAMA_KEEP_ALIVE`` before it
+  started, i.e. Ollama probably had to load the model first.
+
+A slot is released only when the underlying generation finishes, even if
+the caller has already timed out, so the limit holds against the server
+and not just against callers.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from utils.cache import get_cache
+from utils.llm import KEEP_ALIVE, LLM_TIMEOUT, OLLAMA_MODEL, keep_alive_seconds
+
+MAX_CONCURRENCY = max(1, int(os.environ.get("GRID_LLM_MAX_CONCURRENCY", "2")))
+QUEUE_TIMEOUT = float(os.environ.get("GRID_LLM_QUEUE_TIMEOUT", "120"))
+POLL_INTERVAL = 0.05
+
+_COUNTERS = (
+    "calls", "completed", "failed", "timeouts", "rejected", "wait_ms", "run_ms",
+    "cold_calls", "cold_run_ms", "warm_calls", "warm_run_ms", "escalations",
+)
+
+
+class LLMBusyError(RuntimeError):
+    """No concurrency slot became free within the queue timeout."""
+
+
+class LLMTimeoutError(RuntimeError):
+    """An LLM call did not finish within its timeout."""
+
+
+class _LocalSlots:
+    """Per-process fallback used when the shared disk cache is unavailable."""
+
+    def __init__(self) -> None:
+        self._semaphore = threading.BoundedSemaphore(MAX_CONCURRENCY)
+        self._lock = threading.Lock()
+        self.values: Dict[str, float] = {}
+        self.last_used: Dict[Optional[str], float] = {}
+        self.held = 0
+        self.queued = 0
+
+    def acquire(self, timeout: float) -> Optional[str]:
+        if not self._semaphore.acquire(timeout=timeout):
+            return None
+        with self._lock:
+            self.held += 1
+        return "local"
+
+    def release(self, token: str) -> None:
+        with self._lock:
+            self.held -= 1
+        self._semaphore.release()
+
+    def in_flight(self) -> int:
+        return self.held
+
+    def enqueue(self) -> str:
+        with self._lock:
+            self.queued += 1
+        return "local"
+
+    def dequeue(self, token: str) -> None:
+        with self._lock:
+            self.queued -= 1
+
+    def waiting(self) -> int:
+        return self.queued
+
+    def incr(self, key: str, delta: float = 1) -> None:
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + delta
+
+    def get(self, key: str) -> float:
+        return self.values.get(key, 0)
+
+    def touch(self, model: str) -> None:
+        self.last_used[model] = self.last_used[None] = time.time()
+
+    def idle_since(self, model: Optional[str] = None) -> Optional[float]:
+        return self.last_used.get(model)
+
+
+class _SharedSlots:
+    """Host-wide slots kept in the ``llm_gateway`` disk cache.
+
+    Each slot is a key added atomically with an expiry, so a worker that dies
+    mid-call cannot leak its slot for longer than the call timeout. Waiting
+    callers are likewise ``waiting:<token>`` keys that expire with the queue
+    timeout.
+    """
+
+    def __init__(self, cache) -> None:
+        self.cache = cache
+
+    def acquire(self, timeout: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+        expire = LLM_TIMEOUT + QUEUE_TIMEOUT
+        while True:
+            for index in range(MAX_CONCURRENCY):
+                key = f"slot:{index}"
+                if self.cache.add(key, token, expire=expire):
+                    return f"{key}|{token}"
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(POLL_INTERVAL)
+
+    def release(self, token: str) -> None:
+        key, value = token.split("|", 1)
+        with self.cache.transact():
+            if self.cache.get(key) == value:
+                self.cache.delete(key)
+
+    def in_flight(self) -> int:
+        # Expired slots are not ``in`` the cache, so a dead holder stops counting.
+        return sum(f"slot:{index}" in self.cache for index in range(MAX_CONCURRENCY))
+
+    def enqueue(self) -> str:
+        token = f"waiting:{uuid.uuid4().hex}"
+        self.cache.set(token, 1, expire=QUEUE_TIMEOUT + POLL_INTERVAL)
+        return token
+
+    def dequeue(self, token: str) -> None:
+        self.cache.delete(token)
+
+    def waiting(self) -> int:
+        # The gateway cache holds only slots, waiters and a few metrics.
+        return sum(
+            1
+            for key in self.cache.iterkeys()
+            if isinstance(key, str) and key.startswith("waiting:") and key in self.cache
+        )
+
+    def incr(self, key: str, delta: float = 1) -> None:
+        self.cache.incr(f"metric:{key}", delta, default=0)
+
+    def get(self, key: str) -> float:
+        return self.cache.get(f"metric:{key}", 0)
+
+    def touch(self, model: str) -> None:
+        now = time.time()
+        self.cache.set(f"last_used:{model}", now)
+        self.cache.set("last_used", now)
+
+    def idle_since(self, model: Optional[str] = None) -> Optional[float]:
+        return self.cache.get(f"last_used:{model}" if model else "last_used")
+
+
+_slots = None
+_slots_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_slots():
+    global _slots
+    if _slots is None:
+        with _slots_lock:
+            if _slots is None:
+                cache = get_cache("llm_gateway")
+                _slots = _SharedSlots(cache) if cache is not None else _LocalSlots()
+    return _slots
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _slots_lock:
+            if _executor is None:
+                # Calls only run while holding a slot, so this never queues.
+                _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="grid-llm")
+    return _executor
+
+
+@contextmanager
+def _waiting(slots) -> Iterator[None]:
+    token = slots.enqueue()
+    try:
+        yield
+    finally:
+        slots.dequeue(token)
+
+
+def _chain_model(chain) -> str:
+    model = getattr(getattr(chain, "llm", None), "model", None)
+    return model if isinstance(model, str) else OLLAMA_MODEL
+
+
+def _is_cold(slots, model: str, started: float) -> bool:
+    # Ollama keeps each model loaded on its own timer.
+    last_used = slots.idle_since(model)
+    return last_used is None or started - last_used > keep_alive_seconds()
+
+
+def run(
+    chain,
+    *args: Any,
+    name: str = "llm",
+    timeout: Optional[float] = None,
+    track_latency: bool = True,
+    model: Optional[str] = None,
+    **kwargs: Any,
+) -> str:
+    """Run ``chain.run(*args, **kwargs)`` within the gateway's limits.
+
+    Warm-up and liveness calls pass ``track_latency=False`` so they keep the
+    model resident without skewing the cold/warm latency figures. ``model``
+    names the model behind ``chain`` (read from the chain by default).
+    """
+
+    slots = _get_slots()
+    timeout = LLM_TIMEOUT if timeout is None else timeout
+    model = model or _chain_model(chain)
+
+    started = time.monotonic()
+    with _waiting(slots):
+        token = slots.acquire(QUEUE_TIMEOUT)
+    waited = time.monotonic() - started
+    slots.incr("calls")
+    slots.incr("wait_ms", int(waited * 1000))
+    if token is None:
+        slots.incr("rejected")
+        raise LLMBusyError(f"No LLM slot free after {QUEUE_TIMEOUT:g}s ({name})")
+
+    def call() -> str:
+        began = time.monotonic()
+        cold = _is_cold(slots, model, time.time())
+        try:
+            result = chain.run(*args, **kwargs)
+        except Exception:
+            slots.incr("failed")
+            raise
+        else:
+            run_ms = int((time.monotonic() - began) * 1000)
+            slots.incr("completed")
+            slots.touch(model)
+            if track_latency:
+                kind = "cold" if cold else "warm"
+                slots.incr(f"{kind}_calls")
+                slots.incr(f"{kind}_run_ms", run_ms)
+            return result
+        finally:
+            slots.incr("run_ms", int((time.monotonic() - began) * 1000))
+            slots.release(token)
+
+    try:
+        future = _get_executor().submit(call)
+    except Exception:
+        slots.release(token)
+        raise
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        slots.incr("timeouts")
+        logging.warning("LLM call '%s' timed out after %gs (waited %.1fs)", name, timeout, waited)
+        raise LLMTimeoutError(f"LLM call '{name}' timed out after {timeout:g}s") from None
+
+
+async def arun(
+    chain,
+    *args: Any,
+    name: str = "llm",
+    timeout: Optional[float] = None,
+    track_latency: bool = True,
+    model: Optional[str] = None,
+    **kwargs: Any,
+) -> str:
+    """Async variant of :func:`run`; waits for a slot without blocking the loop."""
+
+    return await asyncio.to_thread(
+        run, chain, *args, name=name, timeout=timeout, track_latency=track_latency, model=model, **kwargs
+    )
+
+
+def incr(key: str, delta: float = 1) -> None:
+    """Bump a counter reported by :func:`metrics` (e.g. ``escalations``)."""
+
+    _get_slots().incr(key, delta)
+
+
+def metrics() -> Dict[str, Any]:
+    """Return queue depth, in-flight calls and latency counters."""
+
+    slots = _get_slots()
+    values = {key: slots.get(key) for key in _COUNTERS}
+    finished = values["completed"] + values["failed"]
+    last_used = slots.idle_since()
+    return {
+        "max_concurrency": MAX_CONCURRENCY,
+        "shared": isinstance(slots, _SharedSlots),
+        "waiting": slots.waiting(),
+        "in_flight": slots.in_flight(),
+        "calls": int(values["calls"]),
+        "completed": int(values["completed"]),
+        "failed": int(values["failed"]),
+        "timeouts": int(values["timeouts"]),
+        "rejected": int(values["rejected"]),
+        "avg_wait_ms": round(values["wait_ms"] / values["calls"], 1) if values["calls"] else None,
+        "avg_run_ms": round(values["run_ms"] / finished, 1) if finished else None,
+        "cold_calls": int(values["cold_calls"]),
+        "avg_cold_run_ms": _average(values["cold_run_ms"], values["cold_calls"]),
+        "warm_calls": int(values["warm_calls"]),
+        "avg_warm_run_ms": _average(values["warm_run_ms"], values["warm_calls"]),
+        "escalations": int(values["escalations"]),
+        "idle_s": round(time.time() - last_used, 1) if last_used is not None else None,
+        "keep_alive": KEEP_ALIVE,
+    }
+
+
+def _average(total: float, count: float) -> Optional[float]:
+    return round(total / count, 1) if count else None
+
+
+def _reset() -> None:
+    # Threads and SQLite handles do not survive a fork.
+    global _slots, _executor, _slots_lock
+    _slots = None
+    _executor = None
+    _slots_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):  # pragma: no branch
+    os.register_at_fork(after_in_child=_reset)
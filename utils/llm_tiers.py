@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""Per-task model tiers with escalation when a reply fails validation.
+
+For the router's one-word label and for most field extractions, a small
+local model answers as well as ``gemma2`` in a fraction of the time. Each
+LLM task therefore has an ordered list of models. The first (small) tier
+answers by default. The next tier is only asked when the reply fails
+validation or the call errors, for example because the small model has not
+been pulled.
+
+``GRID_LLM_SMALL_MODEL`` followed by ``GRID_OLLAMA_MODEL`` is the default
+list. The small tier is opt-in: unset, it is the required
+``GRID_OLLAMA_MODEL`` itself, so stock installs never call a model that
+has not been pulled. ``GRID_LLM_MODELS_<TASK>`` overrides the list per task
+with a comma-separated list, e.g.
+``GRID_LLM_MODELS_ROUTER=qwen2.5:0.5b,gemma2:latest``. A single model
+disables escalation for that task. Run ``benchmarks/llm_tiers.py`` to
+compare the tiers' latency and accuracy before changing them.
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, TypeVar
+
+from utils import llm_gateway
+from utils.llm import OLLAMA_MODEL
+
+SMALL_MODEL = os.environ.get("GRID_LLM_SMALL_MODEL") or OLLAMA_MODEL
+TASKS = ("router", "ct-fields", "ot-entities", "combined")
+
+T = TypeVar("T")
+
+
+def _ladder(task: str) -> List[str]:
+    override = os.environ.get(f"GRID_LLM_MODELS_{task.upper().replace('-', '_')}")
+    candidates = override.split(",") if override else [SMALL_MODEL, OLLAMA_MODEL]
+    models: List[str] = []
+    for model in (candidate.strip() for candidate in candidates):
+        if model and model not in models:
+            models.append(model)
+    return models or [OLLAMA_MODEL]
+
+
+MODEL_TIERS: Dict[str, List[str]] = {task: _ladder(task) for task in TASKS}
+
+
+def models_for(task: str) -> List[str]:
+    """Return the models tried for ``task``, smallest first."""
+    return list(MODEL_TIERS.get(task) or _ladder(task))
+
+
+def tier_models() -> List[str]:
+    """Return every distinct model used by any task, in first-use order."""
+
+    models: List[str] = []
+    for ladder in MODEL_TIERS.values():
+        models.extend(model for model in ladder if model not in models)
+    return models
+
+
+@dataclass
+class TieredResult(Generic[T]):
+    """A validated reply and the tier that produced it."""
+
+    value: T
+    model: str
+    attempts: int
+
+
+def run_with_escalation(
+    task: str,
+    chain_for: Callable[[str], Any],
+    validate: Callable[[Any], Optional[T]],
+    *args: Any,
+    models: Optional[Sequence[str]] = None,
+    **kwargs: Any,
+) -> Optional[TieredResult[T]]:
+    """Run ``task`` on each tier in turn until ``validate`` accepts a reply.
+
+    ``chain_for(model)`` returns the chain for a tier and ``validate`` maps
+    the raw reply to a value, or ``None`` if the reply is unusable. Returns
+    ``None`` when every tier fails. The gateway's busy and timeout errors
+    propagate because a larger model would not fare better.
+    """
+
+    models = list(models or models_for(task))
+    for attempt, model in enumerate(models, start=1):
+        if attempt > 1:
+            llm_gateway.incr("escalations")
+        try:
+            output = llm_gateway.run(chain_for(model), *args, name=task, model=model, **kwargs)
+        except (llm_gateway.LLMBusyError, llm_gateway.LLMTimeoutError):
+            raise
+        except Exception as exc:
+            logging.warning("LLM task '%s' failed on %s: %s", task, model, exc)
+            continue
+        value = validate(output)
+        if value is not None:
+            return TieredResult(value, model, attempt)
+        logging.info("LLM task '%s' reply from %s failed validation: %r", task, model, output)
+    return None
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""Preload the Ollama model and keep it resident between queries.
+
+Loading ``gemma2`` takes several seconds, and that cost lands on whichever
+query first reaches a freshly started worker, or first arrives after Ollama
+has evicted the idle model. :func:`warm_up` sends a one-token generation
+to every model tier (see :mod:`utils.llm_tiers`) when a worker starts, so
+the models are loaded before a user waits on them. :func:`ping_all` sends
+the same request periodically, which both checks the server is alive and
+restarts the keep-alive timers.
+
+Both go through :mod:`utils.llm_gateway` with latency tracking disabled, so
+they respect the concurrency limit without distorting the cold/warm query
+latencies. The outcome of the latest ping per model is kept in the
+gateway's disk cache so every process on the host sees it.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from utils import llm_gateway
+from utils.cache import get_cache
+from utils.llm import OLLAMA_MODEL, get_chain
+from utils.llm_tiers import tier_models
+
+WARMUP_ENABLED = os.environ.get("GRID_LLM_WARMUP", "true").lower() in {"1", "true", "yes"}
+PING_TIMEOUT = float(os.environ.get("GRID_LLM_PING_TIMEOUT", "30"))
+
+PING_TEMPLATE = "{text}"
+
+_last_ping: Dict[str, Dict[str, Any]] = {}
+
+
+def get_ping_chain(model: Optional[str] = None):
+    """Return a chain that generates a single token."""
+    return get_chain("ping", PING_TEMPLATE, ["text"], model=model, num_predict=1)
+
+
+def _record(status: Dict[str, Any]) -> None:
+    cache = get_cache("llm_gateway")
+    if cache is None:
+        _last_ping[status["model"]] = status
+        return
+    with cache.transact():
+        statuses = cache.get("status:ping") or {}
+        statuses[status["model"]] = status
+        cache.set("status:ping", statuses)
+
+
+def ping(model: Optional[str] = None, *, name: str = "ping", timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Send a minimal generation and record whether, and how fast, it answered."""
+
+    started = time.monotonic()
+    status: Dict[str, Any] = {"model": model or OLLAMA_MODEL, "kind": name, "at": time.time()}
+    try:
+        llm_gateway.run(
+            get_ping_chain(model),
+            "OK",
+            name=name,
+            timeout=PING_TIMEOUT if timeout is None else timeout,
+            track_latency=False,
+            model=status["model"],
+        )
+    except Exception as exc:
+        status.update(ok=False, error=str(exc))
+        logging.warning("LLM %s failed: %s", name, exc)
+    else:
+        status["ok"] = True
+    status["latency_ms"] = int((time.monotonic() - started) * 1000)
+    _record(status)
+    return status
+
+
+def ping_all(name: str = "ping", timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Ping every model tier, smallest first."""
+    return [ping(model, name=name, timeout=timeout) for model in tier_models()]
+
+
+def warm_up() -> List[Dict[str, Any]]:
+    """Load every model tier into Ollama; each may take a full model load."""
+
+    # The load itself can exceed the ping timeout, so allow a full call.
+    return ping_all(name="warmup", timeout=llm_gateway.LLM_TIMEOUT)
+
+
+def warm_up_in_background() -> Optional[threading.Thread]:
+    """Start :func:`warm_up` on a daemon thread unless ``GRID_LLM_WARMUP`` is off."""
+
+    if not WARMUP_ENABLED:
+        return None
+    thread = threading.Thread(target=warm_up, name="grid-llm-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def last_ping() -> Dict[str, Dict[str, Any]]:
+    """Return the latest ping or warm-up outcome per model on this host."""
+
+    cache = get_cache("llm_gateway")
+    if cache is not None:
+        return cache.get("status:ping") or {}
+    return dict(_last_ping)
@@ -1,10 +1,17 @@
 from django.contrib import admin
 
-from .models import Query
+from .models import Query, QueryArtifact
+
+
+class QueryArtifactInline(admin.TabularInline):
+    model = QueryArtifact
+    extra = 0
+    readonly_fields = ('name', 'sha256', 'format', 'size', 'row_count', 'created_at')
 
 
 @admin.register(Query)
 class QueryAdmin(admin.ModelAdmin):
+    inlines = [QueryArtifactInline]
     list_display = ('id', 'user', 'short_text', 'status', 'created_at')
     list_filter = ('status', 'created_at')
     search_fields = ('text', 'user__username')
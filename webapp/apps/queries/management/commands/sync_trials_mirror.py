@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.queries.services import sync_trials_mirror
+
+
+class Command(BaseCommand):
+    help = 'Fetch ClinicalTrials.gov studies updated since the last sync into the local mirror.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='Override the stored watermark (YYYY-MM-DD).',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            stats = sync_trials_mirror(since=options.get('since'))
+        except (RuntimeError, ValueError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Synced trials updated since {stats['since']}: "
+            f"{stats['inserted']} inserted, {stats['updated']} updated "
+            f"in {stats['elapsed_seconds']:.1f}s (watermark {stats['watermark']})."
+        ))
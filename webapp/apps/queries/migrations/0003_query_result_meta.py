@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("queries", "0002_query_completed_at_query_duration_ms_query_progress_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="query",
+            name="result_meta",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
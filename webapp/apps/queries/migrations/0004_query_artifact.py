@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("queries", "0003_query_result_meta"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QueryArtifact",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=255)),
+                ("sha256", models.CharField(db_index=True, max_length=64)),
+                ("format", models.CharField(max_length=20)),
+                ("size", models.PositiveBigIntegerField(default=0)),
+                ("row_count", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("query", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="artifacts", to="queries.query")),
+            ],
+            options={
+                "ordering": ["name"],
+                "unique_together": {("query", "name")},
+            },
+        ),
+    ]
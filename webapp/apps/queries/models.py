@@ -18,6 +18,7 @@ class Query(models.Model):
     resolution = models.CharField(max_length=50, blank=True)
     router_rationale = models.TextField(blank=True)
     result_data = models.JSONField(blank=True, null=True)
+    result_meta = models.JSONField(default=dict, blank=True)
     error_message = models.TextField(blank=True)
     task_id = models.CharField(max_length=255, blank=True)
     progress = models.PositiveSmallIntegerField(default=0)
@@ -52,3 +53,26 @@ class QueryTemplate(models.Model):
 
     def __str__(self):
         return f"{self.name} ({self.user})"
+
+
+class QueryArtifact(models.Model):
+    """A result table written by a query run, stored by content hash.
+
+    Several queries may point at the same ``sha256`` when they produced
+    identical tables; the file itself is kept once in the artifact store.
+    """
+
+    query = models.ForeignKey(Query, on_delete=models.CASCADE, related_name='artifacts')
+    name = models.CharField(max_length=255)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    format = models.CharField(max_length=20)
+    size = models.PositiveBigIntegerField(default=0)
+    row_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('query', 'name')
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.sha256[:12]})"
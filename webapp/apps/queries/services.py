@@ -1,4 +1,5 @@
 import sys
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
 
@@ -259,10 +260,39 @@ def normalize_results(raw_results: Any) -> List[Dict[str, Any]]:
     return normalized
 
 
+def summarize_result_meta(raw_results: Any) -> Dict[str, Any]:
+    """Describe per-source result caps recorded on pipeline DataFrames."""
+
+    sources: Dict[str, Dict[str, Any]] = {}
+    if pd is None or not raw_results:
+        return {'truncated': False, 'sources': sources}
+
+    for entry in _iter_entries(raw_results):
+        if not isinstance(entry, pd.DataFrame):
+            continue
+        attrs = getattr(entry, 'attrs', {}) or {}
+        if 'truncated' not in attrs:
+            continue
+        source = str(attrs.get('source') or entry.__class__.__name__)
+        total = attrs.get('total_count')
+        sources[source] = {
+            'returned': len(entry),
+            'total': int(total) if total is not None else None,
+            'truncated': bool(attrs.get('truncated')),
+        }
+
+    return {
+        'truncated': any(item['truncated'] for item in sources.values()),
+        'sources': sources,
+    }
+
+
 ProgressCallback = Callable[[int, str], None]
 
 
-def execute_biomedical_query(query_text: str, progress_callback: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+def _ensure_agent_path() -> None:
+    """Make the repository root (agents, retrievers) importable from Django."""
+
     repo_root = Path(settings.BASE_DIR).resolve().parent
     base_dir = Path(settings.BASE_DIR).resolve()
 
@@ -271,8 +301,118 @@ def execute_biomedical_query(query_text: str, progress_callback: Optional[Progre
         if candidate_str not in sys.path:
             sys.path.insert(0, candidate_str)
 
+
+def sync_trials_mirror(since: Optional[str] = None) -> Dict[str, Any]:
+    """Bring the local ClinicalTrials.gov mirror up to date and return run stats."""
+
+    _ensure_agent_path()
+    from retriever.clinical_trials_sync import sync_trials_mirror as run_sync
+
+    return run_sync(since=since)
+
+
+@lru_cache(maxsize=None)
+def load_router():
+    """Import the agent router once per process and return ``DBFinder``.
+
+    The LLM clients behind it are built lazily on the first classification,
+    so this only pays for importing the pipelines. Import errors propagate
+    and are retried on the next call.
+    """
+
+    _ensure_agent_path()
+    from main import DBFinder
+
+    return DBFinder
+
+
+def open_artifact_scope(query_id: int):
+    """Return a scope that stores a query's artifacts by content hash."""
+
+    _ensure_agent_path()
+    from utils.artifacts import ArtifactScope
+
+    return ArtifactScope(f'query-{query_id}')
+
+
+def llm_gateway_metrics() -> Dict[str, Any]:
+    """Return the LLM gateway's queue depth and latency counters."""
+
+    _ensure_agent_path()
+    from utils.llm_gateway import metrics
+    from utils.llm_warmup import last_ping
+
+    return {**metrics(), 'last_ping': last_ping()}
+
+
+def open_targets_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters of the shared Open Targets response cache."""
+
+    _ensure_agent_path()
+    from retriever.open_targets_retriever import cache_stats
+
+    return cache_stats()
+
+
+def warm_up_llm(background: bool = True):
+    """Load every model tier into Ollama, on a daemon thread by default."""
+
+    _ensure_agent_path()
+    from utils import llm_warmup
+
+    if background:
+        return llm_warmup.warm_up_in_background()
+    return llm_warmup.warm_up()
+
+
+def warm_up_open_targets():
+    """Convert and index the local Open Targets release on a daemon thread.
+
+    Does nothing unless ``GRID_OPEN_TARGETS_BACKEND`` selects the local backend.
+    """
+
+    _ensure_agent_path()
+    from retriever import open_targets_retriever
+
+    if open_targets_retriever.BACKEND != 'local':
+        return None
+    from retriever.open_targets_store import prepare_in_background
+
+    return prepare_in_background()
+
+
+def ping_llm() -> Dict[str, Any]:
+    """Ping every model tier, restarting Ollama's keep-alive timers."""
+
+    _ensure_agent_path()
+    from utils.llm_warmup import ping_all
+
+    return {'pings': ping_all()}
+
+
+def artifact_file_path(sha256: str, fmt: str) -> Path:
+    """Return where the artifact store keeps the object ``sha256``."""
+
+    _ensure_agent_path()
+    from utils.artifacts import object_path
+
+    return object_path(sha256, fmt)
+
+
+def execute_biomedical_query(
+    query_text: str,
+    progress_callback: Optional[ProgressCallback] = None,
+    budgets: Optional[Dict[str, Optional[int]]] = None,
+    artifact_scope=None,
+) -> Dict[str, Any]:
+    """Route ``query_text`` through the agents and normalise their results.
+
+    When ``artifact_scope`` is given, the tables the pipelines write are
+    collected on it instead of overwriting the shared ``output/`` files.
+    """
+
     try:
-        from main import DBFinder
+        DBFinder = load_router()
     except Exception as exc:
         return {
             'classification': 'unavailable',
@@ -280,6 +420,9 @@ def execute_biomedical_query(query_text: str, progress_callback: Optional[Progre
             'error': f'Query router unavailable: {exc}'
         }
 
+    if budgets is None:
+        budgets = getattr(settings, 'GRID_RESULT_BUDGETS', {})
+
     finder = DBFinder()
     if progress_callback:
         try:
@@ -287,7 +430,14 @@ def execute_biomedical_query(query_text: str, progress_callback: Optional[Progre
         except Exception:
             pass
     try:
-        raw_results = finder.route_and_query(query_text, progress_callback=progress_callback)
+        from utils.artifacts import artifact_mode, collect_artifacts
+
+        with artifact_mode(getattr(settings, 'GRID_ARTIFACT_MODE', None)), collect_artifacts(artifact_scope):
+            raw_results = finder.route_and_query(
+                query_text,
+                progress_callback=progress_callback,
+                budgets=budgets,
+            )
     except Exception as exc:
         return {
             'classification': 'error',
@@ -313,5 +463,6 @@ def execute_biomedical_query(query_text: str, progress_callback: Optional[Progre
         'resolution': resolution,
         'rationale': rationale,
         'results': normalize_results(raw_results),
+        'meta': summarize_result_meta(raw_results),
         'error': None
     }
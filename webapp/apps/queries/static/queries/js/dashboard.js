@@ -180,6 +180,14 @@
         tagsInput.value = (payload.tags || []).join(', ');
         const exportBtn = drawerElement.querySelector('#drawer-export');
         exportBtn.dataset.queryId = payload.id;
+        const artifactsWrapper = drawerElement.querySelector('#drawer-artifacts');
+        const artifacts = payload.artifacts || [];
+        artifactsWrapper.innerHTML = artifacts.length
+            ? '<span class="text-uppercase text-muted me-2">Artifacts</span>' + artifacts.map((artifact) => (
+                `<a href="${artifact.url}" class="me-3">${artifact.name}</a>`
+            )).join('')
+            : '';
+        artifactsWrapper.classList.toggle('d-none', !artifacts.length);
 
         const tabs = drawerElement.querySelector('#sourceTabs');
         const tabContent = drawerElement.querySelector('#sourceTabContent');
@@ -223,7 +231,11 @@
                             ${link}
                         </div>`;
             }).join('');
-            pane.innerHTML = entries;
+            const cap = payload.result_meta?.sources?.[source];
+            const capNotice = cap && cap.truncated
+                ? `<p class="text-muted small mb-2">Showing top ${cap.returned} of ${cap.total ?? 'many'} results.</p>`
+                : '';
+            pane.innerHTML = capNotice + entries;
             tabContent.appendChild(pane);
         });
         resultDrawer.show();
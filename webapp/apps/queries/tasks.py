@@ -1,9 +1,59 @@
+import logging
+
 from celery import shared_task
+from celery.signals import worker_process_init
+from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
 
-from .models import Query
-from .services import execute_biomedical_query
+from .models import Query, QueryArtifact
+from .services import (
+    execute_biomedical_query,
+    open_artifact_scope,
+    ping_llm as run_llm_ping,
+    sync_trials_mirror as run_trials_mirror_sync,
+    warm_up_llm,
+    warm_up_open_targets,
+)
+
+
+@worker_process_init.connect
+def warm_up_worker_llm(**kwargs):
+    # Runs in each pool process after the fork; the load happens on a
+    # background thread because Celery limits how long process init may take.
+    try:
+        warm_up_llm(background=True)
+    except Exception:  # pragma: no cover - warm-up is best effort
+        logging.exception('Could not start LLM warm-up')
+
+
+@worker_process_init.connect
+def warm_up_worker_open_targets(**kwargs):
+    # Each pool process maps the shared Arrow files and builds its key spans
+    # before the first lookup instead of inside a user's request.
+    try:
+        warm_up_open_targets()
+    except Exception:  # pragma: no cover - warm-up is best effort
+        logging.exception('Could not start Open Targets warm-up')
+
+
+def link_query_artifacts(query: Query, scope, timeout=None) -> int:
+    """Record the artifacts collected in ``scope`` against ``query``."""
+
+    artifacts = [
+        QueryArtifact(
+            query=query,
+            name=stored.name,
+            sha256=stored.sha256,
+            format=stored.format,
+            size=stored.size,
+            row_count=stored.rows,
+        )
+        for stored in scope.results(timeout=timeout)
+    ]
+    QueryArtifact.objects.filter(query=query).delete()
+    QueryArtifact.objects.bulk_create(artifacts)
+    return len(artifacts)
 
 
 @shared_task(bind=True)
@@ -23,7 +73,8 @@ def process_query(self, query_id: int):
     def update_progress(value: int, stage: str):
         Query.objects.filter(pk=query.pk).update(progress=value, stage=stage)
 
-    result = execute_biomedical_query(query.text, progress_callback=update_progress)
+    scope = open_artifact_scope(query.pk)
+    result = execute_biomedical_query(query.text, progress_callback=update_progress, artifact_scope=scope)
 
     if result.get('error'):
         query.status = Query.Status.FAILED
@@ -33,6 +84,7 @@ def process_query(self, query_id: int):
     else:
         query.status = Query.Status.SUCCESS
         query.result_data = result.get('results', [])
+        query.result_meta = result.get('meta') or {}
         query.classification = result.get('classification') or ''
         query.resolution = result.get('resolution') or ''
         query.router_rationale = result.get('rationale') or ''
@@ -48,8 +100,32 @@ def process_query(self, query_id: int):
     with transaction.atomic():
         query.save()
 
+    # Linked after the results are saved so background artifact writes never
+    # delay the query becoming visible as completed.
+    if query.status == Query.Status.SUCCESS:
+        try:
+            link_query_artifacts(query, scope, timeout=getattr(settings, 'GRID_ARTIFACT_LINK_TIMEOUT', None))
+        except Exception:  # pragma: no cover - artifacts are best effort
+            logging.exception('Could not link artifacts for query %s', query.pk)
+
     return {
         'status': query.status,
         'classification': query.classification,
         'resolution': query.resolution,
     }
+
+
+@shared_task
+def sync_trials_mirror(since=None):
+    try:
+        stats = run_trials_mirror_sync(since=since)
+    except ValueError as exc:
+        # The mirror has not been bootstrapped from a bulk export yet.
+        return {'status': 'skipped', 'reason': str(exc)}
+    return {'status': 'success', **stats}
+
+
+@shared_task
+def ping_llm():
+    # Scheduled more often than GRID_OLLAMA_KEEP_ALIVE so the model stays loaded.
+    return run_llm_ping()
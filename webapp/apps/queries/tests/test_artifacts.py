@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from utils import artifacts
+
+
+class WriteArtifactTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = self._tmp.name
+        self.df = pd.DataFrame([{"drug": "olaparib", "score": 0.9}])
+
+    def tearDown(self) -> None:
+        artifacts.flush()
+        self._tmp.cleanup()
+
+    def test_sync_write_returns_existing_csv(self) -> None:
+        path = artifacts.write_artifact(self.df, "results.csv", mode="sync", fmt="csv", directory=self.directory)
+
+        self.assertTrue(Path(path).exists())
+        self.assertIn("olaparib", Path(path).read_text(encoding="utf-8"))
+
+    def test_off_mode_skips_writing(self) -> None:
+        path = artifacts.write_artifact(self.df, "results.csv", mode="off", directory=self.directory)
+
+        self.assertIsNone(path)
+        self.assertEqual(list(Path(self.directory).iterdir()), [])
+
+    def test_async_write_lands_after_flush(self) -> None:
+        path = artifacts.write_artifact(self.df, "results.csv", mode="async", fmt="csv", directory=self.directory)
+        artifacts.flush()
+
+        self.assertTrue(Path(path).exists())
+
+    def test_artifact_mode_overrides_default(self) -> None:
+        with artifacts.artifact_mode("off"):
+            self.assertIsNone(artifacts.write_artifact(self.df, "results.csv", directory=self.directory))
+        self.assertEqual(artifacts.resolve_mode(), artifacts.ARTIFACT_MODE)
+
+    def test_columnar_format_falls_back_to_csv_without_pyarrow(self) -> None:
+        with patch.object(artifacts, "pyarrow", None):
+            path = artifacts.write_artifact(
+                self.df, "results.csv", mode="sync", fmt="parquet", directory=self.directory
+            )
+
+        self.assertTrue(path.endswith("results.csv"))
+
+    def test_extension_follows_format(self) -> None:
+        self.assertTrue(artifacts.artifact_path("merged_results.csv", "parquet", "out").endswith(
+            "merged_results.parquet"
+        ))
+
+
+class ArtifactScopeTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.store_dir = Path(self._tmp.name)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_identical_tables_are_stored_once(self) -> None:
+        df = pd.DataFrame([{"target": "BRCA1", "score": 0.5}])
+        first = artifacts.ArtifactScope("query-1", self.store_dir)
+        second = artifacts.ArtifactScope("query-2", self.store_dir)
+
+        with artifacts.collect_artifacts(first):
+            artifacts.write_artifact(df, "targets_only.csv", mode="sync", fmt="csv")
+        with artifacts.collect_artifacts(second):
+            artifacts.write_artifact(df.copy(), "targets_only.csv", mode="async", fmt="csv")
+
+        [stored_first] = first.results()
+        [stored_second] = second.results(timeout=5)
+        self.assertEqual(stored_first.sha256, stored_second.sha256)
+        self.assertEqual(stored_first.rows, 1)
+        objects = [path for path in self.store_dir.rglob("*") if path.is_file()]
+        self.assertEqual(objects, [artifacts.object_path(stored_first.sha256, "csv", self.store_dir)])
+
+    def test_scope_does_not_touch_fixed_output_names(self) -> None:
+        scope = artifacts.ArtifactScope("query-3", self.store_dir)
+        with tempfile.TemporaryDirectory() as output_dir, artifacts.collect_artifacts(scope):
+            path = artifacts.write_artifact(
+                pd.DataFrame([{"a": 1}]), "merged_results.csv", mode="sync", fmt="csv", directory=output_dir
+            )
+            self.assertEqual(list(Path(output_dir).iterdir()), [])
+
+        self.assertTrue(path.startswith(str(self.store_dir)))
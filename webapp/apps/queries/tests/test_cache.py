@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import json
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from utils.cache import make_key, normalize_text
+
+
+class CacheKeyTests(SimpleTestCase):
+    def test_normalize_text_ignores_case_and_spacing(self) -> None:
+        self.assertEqual(
+            normalize_text("  Phase 2\tBreast   Cancer trials "),
+            normalize_text("phase 2 breast cancer trials"),
+        )
+
+    def test_make_key_is_order_independent(self) -> None:
+        self.assertEqual(
+            make_key("ct-parse", {"prompt": "v1", "text": "x"}),
+            make_key("ct-parse", {"text": "x", "prompt": "v1"}),
+        )
+
+    def test_make_key_separates_prompt_versions(self) -> None:
+        self.assertNotEqual(
+            make_key("ct-parse", {"prompt": "v1", "text": "x"}),
+            make_key("ct-parse", {"prompt": "v2", "text": "x"}),
+        )
+
+
+class _DictCache(dict):
+    def set(self, key, value, expire=None):
+        self[key] = value
+
+
+class ParseCacheTests(SimpleTestCase):
+    QUERY = "Long-term cardiovascular outcomes of semaglutide"
+
+    def setUp(self) -> None:
+        from query_parser import Clinical_Trials_Query_Parser_Agent as agent
+        from query_parser import open_targets_query_parser as ot_parser
+        from utils import llm_gateway
+
+        self.agent = agent
+        self.ot_parser = ot_parser
+        self.cache = _DictCache()
+        for patcher in (
+            patch.object(agent, "get_cache", return_value=self.cache),
+            patch.object(ot_parser, "get_cache", return_value=self.cache),
+            # Keep gateway slots and metrics out of the shared disk cache.
+            patch.object(llm_gateway, "_slots", llm_gateway._LocalSlots()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_cached_parse_skips_the_chain(self) -> None:
+        fields = dict(self.agent.fallback_extract(""), **{"Condition/Disease": "heart disease"})
+        self.cache[self.agent._parse_cache_key(self.QUERY.upper())] = fields
+
+        with patch.object(self.agent, "get_keyword_chain") as get_chain:
+            parsed = self.agent.parse_query(self.QUERY)
+
+        get_chain.assert_not_called()
+        self.assertEqual(parsed, fields)
+
+    def test_fallback_parse_is_not_cached(self) -> None:
+        chain = MagicMock()
+        chain.run.side_effect = ConnectionError("ollama down")
+
+        with patch.object(self.agent, "get_keyword_chain", return_value=chain):
+            parsed = self.agent.parse_query(self.QUERY)
+
+        self.assertEqual(parsed, self.agent.fallback_extract(""))
+        self.assertEqual(self.cache, {})
+
+    def test_cached_entities_skip_the_chain(self) -> None:
+        chain = MagicMock()
+        chain.run.return_value = json.dumps({"drug": ["semaglutide"], "disease": [], "target": []})
+        parser = self.ot_parser.QueryParser()
+
+        with patch.object(self.ot_parser.QueryParser, "chain_for", return_value=chain):
+            first = parser.extract_entities(self.QUERY)
+            second = parser.extract_entities(self.QUERY)
+
+        self.assertEqual(first, second)
+        chain.run.assert_called_once()
+
+    def test_unusable_entities_are_not_cached(self) -> None:
+        chain = MagicMock()
+        chain.run.return_value = "no entities here"
+
+        with patch.object(self.ot_parser.QueryParser, "chain_for", return_value=chain):
+            result = self.ot_parser.QueryParser().extract_entities(self.QUERY)
+
+        self.assertEqual(result, "null")
+        self.assertEqual(self.cache, {})
@@ -1,18 +1,61 @@
 from __future__ import annotations
 
 import os
+import tempfile
 from pathlib import Path
+from unittest.mock import MagicMock, patch
 
+import diskcache
 import pandas as pd
 from django.test import SimpleTestCase
 
 from retriever.Clinical_Trials_Retriever_Agent import (
+    StudyRecordBuilder,
     display_and_save_results,
+    extract_nct_ids,
     extract_phase,
+    fetch_clinical_trials,
+    fetch_trials_by_id,
+    iter_clinical_trials,
+    normalize_phase,
+    normalize_phases,
+    normalize_status,
+    parse_date_range,
+    retrieve_trials,
     sanitize_filename,
 )
 
 
+def _study(nct_id: str, phases=("PHASE2",)) -> dict:
+    return {
+        "protocolSection": {
+            "identificationModule": {"nctId": nct_id, "briefTitle": f"Trial {nct_id}"},
+            "statusModule": {"overallStatus": "RECRUITING"},
+            "conditionsModule": {"conditions": ["Breast Cancer"]},
+            "armsInterventionsModule": {"interventions": [{"name": "Drug A"}]},
+            "designModule": {"phases": list(phases)},
+        }
+    }
+
+
+def _page(studies, next_token=None) -> MagicMock:
+    response = MagicMock()
+    payload = {"studies": studies}
+    if next_token:
+        payload["nextPageToken"] = next_token
+    response.json.return_value = payload
+    return response
+
+
+class UncachedTestCase(SimpleTestCase):
+    """Run retriever tests against the mocked API instead of the disk cache."""
+
+    def setUp(self) -> None:
+        patcher = patch("retriever.Clinical_Trials_Retriever_Agent.get_cache", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
 class ExtractPhaseTests(SimpleTestCase):
     def test_returns_none_when_no_phase_present(self) -> None:
         self.assertIsNone(extract_phase("Latest immunotherapy approaches"))
@@ -24,6 +67,162 @@ class ExtractPhaseTests(SimpleTestCase):
         self.assertEqual(extract_phase("looking for Phase II studies"), "Phase 2")
 
 
+class NctIdLookupTests(UncachedTestCase):
+    def test_extract_nct_ids_from_text_and_lists(self) -> None:
+        self.assertEqual(
+            extract_nct_ids("Compare nct01234567, NCT07654321 and NCT01234567"),
+            ["NCT01234567", "NCT07654321"],
+        )
+        self.assertEqual(extract_nct_ids(["NCT00000001", None]), ["NCT00000001"])
+        self.assertEqual(extract_nct_ids(None), [])
+
+    @patch("retriever.Clinical_Trials_Retriever_Agent.display_and_save_results")
+    @patch("retriever.Clinical_Trials_Retriever_Agent.http_client.get")
+    def test_retrieve_trials_uses_batched_id_lookup(self, mock_get: MagicMock, mock_save: MagicMock) -> None:
+        mock_get.return_value = _page([_study("NCT00000002"), _study("NCT00000001")])
+        parsed = {"Condition/Disease": "breast cancer", "Study IDs/NCT IDs": "NCT00000002, NCT00000001"}
+
+        df = retrieve_trials(parsed, "Tell me about NCT00000002 and NCT00000001")
+
+        mock_get.assert_called_once()
+        params = mock_get.call_args.kwargs["params"]
+        self.assertEqual(params["filter.ids"], "NCT00000001,NCT00000002")
+        self.assertNotIn("query.cond", params)
+        self.assertEqual(list(df["NCT Number"]), ["NCT00000002", "NCT00000001"])
+        mock_save.assert_called_once()
+
+    @patch("retriever.Clinical_Trials_Retriever_Agent.http_client.get")
+    def test_id_lookup_respects_max_results(self, mock_get: MagicMock) -> None:
+        mock_get.return_value = _page([_study("NCT00000003")])
+
+        df = fetch_trials_by_id(["NCT00000003", "NCT00000001", "NCT00000002"], max_results=1)
+
+        self.assertEqual(mock_get.call_args.kwargs["params"]["filter.ids"], "NCT00000003")
+        self.assertEqual(list(df["NCT Number"]), ["NCT00000003"])
+        self.assertEqual((df.attrs["total_count"], df.attrs["truncated"]), (3, True))
+
+
+class ServerSideFilterTests(UncachedTestCase):
+    def test_normalize_phase_variants(self) -> None:
+        self.assertEqual(normalize_phase("Phase II"), "PHASE2")
+        self.assertEqual(normalize_phase("phase 3"), "PHASE3")
+        self.assertEqual(normalize_phase("PHASE4"), "PHASE4")
+        self.assertEqual(normalize_phase("Early Phase 1"), "EARLY_PHASE1")
+        self.assertIsNone(normalize_phase("pivotal"))
+
+    def test_normalize_phases_splits_multi_phase_values(self) -> None:
+        self.assertEqual(normalize_phases("Phase 2 / Phase 3"), ["PHASE2", "PHASE3"])
+        self.assertEqual(normalize_phases("phase II or III"), ["PHASE2", "PHASE3"])
+        self.assertEqual(normalize_phases("Phase 1/2"), ["PHASE1", "PHASE2"])
+        self.assertEqual(normalize_phases("N/A"), ["NA"])
+        self.assertEqual(normalize_phases("pivotal"), [])
+
+    @patch("retriever.Clinical_Trials_Retriever_Agent.http_client.get")
+    def test_multi_phase_values_are_sent_as_one_or_group(self, mock_get: MagicMock) -> None:
+        mock_get.return_value = _page([_study("NCT00000001", phases=("PHASE3",))])
+
+        df = fetch_clinical_trials(condition="breast cancer", phase="Phase 2 / Phase 3")
+
+        params = mock_get.call_args.kwargs["params"]
+        self.assertEqual(params["filter.advanced"], "AREA[Phase](PHASE2 OR PHASE3)")
+        self.assertEqual(list(df["NCT Number"]), ["NCT00000001"])
+
+    def test_normalize_status_variants(self) -> None:
+        self.assertEqual(normalize_status("Recruiting"), "RECRUITING")
+        self.assertEqual(normalize_status("Active, not recruiting"), "ACTIVE_NOT_RECRUITING")
+        self.assertEqual(
+            normalize_status("not yet recruiting or completed"),
+            "NOT_YET_RECRUITING,COMPLETED",
+        )
+        self.assertIsNone(normalize_status("whenever"))
+
+    def test_parse_date_range_variants(self) -> None:
+        self.assertEqual(parse_date_range("2019-2021"), ("2019-01-01", "2021-12-31"))
+        self.assertEqual(parse_date_range("between 2018 and 2020"), ("2018-01-01", "2020-12-31"))
+        self.assertEqual(parse_date_range("since 2020"), ("2020-01-01", "MAX"))
+        self.assertEqual(parse_date_range("after 2020"), ("2021-01-01", "MAX"))
+        self.assertEqual(parse_date_range("2015 onwards"), ("2015-01-01", "MAX"))
+        self.assertEqual(parse_date_range("trials from 2019-03 and later"), ("2019-03-01", "MAX"))
+        self.assertEqual(parse_date_range("before 2018-06"), ("MIN", "2018-05-31"))
+        self.assertEqual(parse_date_range("in 2022"), ("2022-01-01", "2022-12-31"))
+        self.assertEqual(parse_date_range({"start": "2020-02", "end": None}), ("2020-02-01", "MAX"))
+        self.assertIsNone(parse_date_range("recently"))
+
+    def test_parse_date_range_validates_months_and_reads_year_spans(self) -> None:
+        self.assertEqual(parse_date_range("2015-16"), ("2015-01-01", "2016-12-31"))
+        self.assertEqual(parse_date_range("before 2015-16"), ("MIN", "2014-12-31"))
+        self.assertEqual(parse_date_range("2015-16 to 2018-19"), ("2015-01-01", "2019-12-31"))
+        self.assertEqual(parse_date_range("2015-06"), ("2015-06-01", "2015-06-30"))
+        with self.assertRaises(ValueError):
+            parse_date_range("2015-02-30")
+        with self.assertRaises(ValueError):
+            parse_date_range("2015-13")
+
+    @patch("retriever.Clinical_Trials_Retriever_Agent.display_and_save_results")
+    @patch("retriever.Clinical_Trials_Retriever_Agent.http_client.get")
+    def test_unusable_date_range_is_dropped(self, mock_get: MagicMock, mock_save: MagicMock) -> None:
+        mock_get.return_value = _page([_study("NCT00000001")])
+
+        df = retrieve_trials({"Condition/Disease": "asthma", "Date Range": "2015-02-30"}, "asthma trials")
+
+        self.assertNotIn("filter.advanced", mock_get.call_args.kwargs["params"])
+        self.assertEqual(list(df["NCT Number"]), ["NCT00000001"])
+
+    @patch("retriever.Clinical_Trials_Retriever_Agent.display_and_save_results")
+    @patch("retriever.Clinical_Trials_Retriever_Agent.http_client.get")
+    def test_date_range_and_facility_are_pushed_down(self, mock_get: MagicMock, mock_save: MagicMock) -> None:
+        mock_get.return_value = _page([_study("NCT00000001")])
+        parsed = {
+            "Condition/Disease": "melanoma",
+            "Phase": "Phase 3",
+            "Date Range": "2019 to 2021",
+            "Facility Name": "Mayo Clinic",
+        }
+
+        retrieve_trials(parsed, "phase 3 melanoma trials at Mayo Clinic from 2019 to 2021")
+
+        params = mock_get.call_args.kwargs["params"]
+        self.assertEqual(
+            params["filter.advanced"],
+            'AREA[Phase]PHASE3 AND AREA[StartDate]RANGE[2019-01-01,2021-12-31] '
+            'AND AREA[LocationFacility]"Mayo Clinic"',
+        )
+
+    @patch("retriever.Clinical_Trials_Retriever_Agent.http_client.get")
+    def test_filters_and_projection_are_sent_to_api(self, mock_get: MagicMock) -> None:
+        mock_get.return_value = _page([_study("NCT00000001", phases=("PHASE2",))])
+
+        df = fetch_clinical_trials(condition="asthma", phase="Phase 2", status="Recruiting")
+
+        params = mock_get.call_args.kwargs["params"]
+        self.assertEqual(params["filter.advanced"], "AREA[Phase]PHASE2")
+        self.assertEqual(params["filter.overallStatus"], "RECRUITING")
+        self.assertIn("protocolSection.designModule", params["fields"].split(","))
+        self.assertEqual(list(df["NCT Number"]), ["NCT00000001"])
+
+
+class StudyRecordBuilderTests(SimpleTestCase):
+    def test_deduplicates_while_adding(self) -> None:
+        builder = StudyRecordBuilder(capacity=2)
+
+        added = builder.extend([_study("NCT1"), _study("NCT2"), _study("NCT1"), _study("NCT3")])
+
+        self.assertEqual(added, 3)
+        self.assertEqual(len(builder), 3)
+        self.assertGreaterEqual(builder.capacity, 3)
+        df = builder.build()
+        self.assertEqual(list(df["NCT Number"]), ["NCT1", "NCT2", "NCT3"])
+        self.assertEqual(df.iloc[0]["Interventions"], "Drug A")
+        self.assertEqual(df.iloc[0]["url"], "https://clinicaltrials.gov/study/NCT1")
+        self.assertEqual(df.attrs["source"], "ClinicalTrials.gov")
+
+    def test_build_from_offset_returns_new_rows_only(self) -> None:
+        builder = StudyRecordBuilder()
+        builder.extend([_study("NCT1"), _study("NCT2")])
+
+        self.assertEqual(list(builder.build(1)["NCT Number"]), ["NCT2"])
+
+
 class SanitizeFilenameTests(SimpleTestCase):
     def test_replaces_illegal_characters(self) -> None:
         self.assertEqual(sanitize_filename("lung cancer?:phase 2"), "lung_cancer__phase_2")
@@ -48,3 +247,92 @@ class DisplayAndSaveResultsTests(SimpleTestCase):
         finally:
             if os.path.exists(output_path):
                 os.remove(output_path)
+
+
+@patch("retriever.Clinical_Trials_Retriever_Agent.http_client.get")
+class IterClinicalTrialsTests(UncachedTestCase):
+    def test_pages_are_fetched_lazily(self, mock_get: MagicMock) -> None:
+        mock_get.side_effect = [
+            _page([_study("NCT00000001")], next_token="token-2"),
+            _page([_study("NCT00000002")]),
+        ]
+
+        pages = iter_clinical_trials(condition="breast cancer")
+        first = next(pages)
+
+        self.assertEqual(list(first["NCT Number"]), ["NCT00000001"])
+        self.assertEqual(first.attrs["source"], "ClinicalTrials.gov")
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_fetch_concatenates_and_deduplicates_pages(self, mock_get: MagicMock) -> None:
+        mock_get.side_effect = [
+            _page([_study("NCT00000001"), _study("NCT00000002")], next_token="token-2"),
+            _page([_study("NCT00000002"), _study("NCT00000003")]),
+        ]
+        seen_pages = []
+
+        df = fetch_clinical_trials(condition="breast cancer", on_page=seen_pages.append)
+
+        self.assertEqual(list(df["NCT Number"]), ["NCT00000001", "NCT00000002", "NCT00000003"])
+        self.assertEqual(len(seen_pages), 2)
+        self.assertEqual(mock_get.call_args.kwargs["params"]["pageToken"], "token-2")
+
+    def test_max_results_stops_paging_and_marks_truncation(self, mock_get: MagicMock) -> None:
+        first_page = _page([_study("NCT00000001"), _study("NCT00000002")], next_token="token-2")
+        first_page.json.return_value["totalCount"] = 40
+        mock_get.side_effect = [
+            first_page,
+            _page([_study("NCT00000003"), _study("NCT00000004")], next_token="token-3"),
+        ]
+
+        df = fetch_clinical_trials(condition="cancer", max_results=3, page_size=50)
+
+        self.assertEqual(list(df["NCT Number"]), ["NCT00000001", "NCT00000002", "NCT00000003"])
+        self.assertTrue(df.attrs["truncated"])
+        self.assertEqual(df.attrs["total_count"], 40)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_get.call_args.kwargs["params"]["pageSize"], "3")
+
+    def test_uncapped_fetch_is_not_truncated(self, mock_get: MagicMock) -> None:
+        mock_get.return_value = _page([_study("NCT00000001")])
+
+        df = fetch_clinical_trials(condition="asthma", max_results=5)
+
+        self.assertFalse(df.attrs["truncated"])
+
+    def test_empty_result_returns_typed_frame(self, mock_get: MagicMock) -> None:
+        mock_get.return_value = _page([])
+
+        df = fetch_clinical_trials(condition="nothing")
+
+        self.assertTrue(df.empty)
+        self.assertIn("NCT Number", df.columns)
+
+
+@patch("retriever.Clinical_Trials_Retriever_Agent.http_client.get")
+class PageCacheTests(SimpleTestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.cache = diskcache.Cache(tmpdir.name)
+        self.addCleanup(self.cache.close)
+        patcher = patch("retriever.Clinical_Trials_Retriever_Agent.get_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_search_is_served_from_cache(self, mock_get: MagicMock) -> None:
+        mock_get.return_value = _page([_study("NCT00000001")])
+
+        first = fetch_clinical_trials(condition="asthma", status="Recruiting")
+        second = fetch_clinical_trials(status="Recruiting", condition="asthma")
+
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(list(first["NCT Number"]), list(second["NCT Number"]))
+
+    def test_different_parameters_miss_the_cache(self, mock_get: MagicMock) -> None:
+        mock_get.return_value = _page([_study("NCT00000001")])
+
+        fetch_clinical_trials(condition="asthma")
+        fetch_clinical_trials(condition="asthma", phase="Phase 2")
+
+        self.assertEqual(mock_get.call_count, 2)
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import tempfile
+from functools import partial
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from retriever.Clinical_Trials_Retriever_Agent import fetch_clinical_trials
+from retriever.clinical_trials_store import ClinicalTrialsStore, iter_bulk_export
+
+
+def _full_study(nct_id, title, conditions, intervention, status="RECRUITING", phases=("PHASE2",), country="Germany"):
+    return {
+        "protocolSection": {
+            "identificationModule": {"nctId": nct_id, "briefTitle": title},
+            "statusModule": {
+                "overallStatus": status,
+                "startDateStruct": {"date": "2021-03-01"},
+                "lastUpdatePostDateStruct": {"date": "2024-05-01"},
+            },
+            "conditionsModule": {"conditions": list(conditions)},
+            "armsInterventionsModule": {"interventions": [{"name": intervention}]},
+            "designModule": {"phases": list(phases), "studyType": "INTERVENTIONAL"},
+            "contactsLocationsModule": {
+                "locations": [{"facility": "University Hospital", "city": "Berlin", "country": country}]
+            },
+            "descriptionModule": {"briefSummary": "Not mirrored"},
+        },
+        "derivedSection": {"miscInfoModule": {}},
+    }
+
+
+STUDIES = [
+    _full_study("NCT00000001", "Olaparib in breast cancer", ["Breast Cancer"], "Olaparib"),
+    _full_study("NCT00000002", "Pembrolizumab for lung cancer", ["Lung Cancer"], "Pembrolizumab",
+                status="COMPLETED", phases=("PHASE3",), country="France"),
+    _full_study("NCT00000003", "Trastuzumab breast study", ["Breast Neoplasms"], "Trastuzumab",
+                phases=("PHASE1", "PHASE2")),
+]
+
+
+class ClinicalTrialsStoreTests(SimpleTestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.tmp = Path(tmpdir.name)
+        self.store = ClinicalTrialsStore(self.tmp / "mirror.sqlite3")
+        self.assertEqual(self.store.upsert_studies(STUDIES), (3, 0))
+
+    def _ids(self, params):
+        return [study["protocolSection"]["identificationModule"]["nctId"]
+                for study in self.store.search(params)["studies"]]
+
+    def test_full_text_and_indexed_filters(self) -> None:
+        self.assertEqual(sorted(self._ids({"query.cond": "breast cancer"})), ["NCT00000001"])
+        self.assertEqual(sorted(self._ids({"query.cond": "breast"})), ["NCT00000001", "NCT00000003"])
+        self.assertEqual(self._ids({"query.intr": "pembrolizumab"}), ["NCT00000002"])
+        self.assertEqual(self._ids({"query.locn": "france"}), ["NCT00000002"])
+        self.assertEqual(
+            sorted(self._ids({"filter.overallStatus": "RECRUITING", "filter.advanced": "AREA[Phase]PHASE2"})),
+            ["NCT00000001", "NCT00000003"],
+        )
+
+    def test_boolean_operators_between_phrases(self) -> None:
+        self.assertEqual(
+            sorted(self._ids({"query.cond": "breast cancer OR lung cancer"})),
+            ["NCT00000001", "NCT00000002"],
+        )
+        self.assertEqual(self._ids({"query.cond": "breast AND neoplasms"}), ["NCT00000003"])
+        self.assertEqual(self._ids({"query.cond": "breast or lung"}), [])
+
+    def test_phase_or_group(self) -> None:
+        self.assertEqual(
+            sorted(self._ids({"filter.advanced": "AREA[Phase](PHASE1 OR PHASE3)"})),
+            ["NCT00000002", "NCT00000003"],
+        )
+
+    def test_start_date_and_facility_filters(self) -> None:
+        self.store.upsert_studies([
+            _full_study("NCT00000004", "Later breast study", ["Breast Cancer"], "Drug Q", country="Spain"),
+        ])
+
+        self.assertEqual(
+            sorted(self._ids({"filter.advanced": "AREA[StartDate]RANGE[2021-01-01,2021-12-31]"})),
+            ["NCT00000001", "NCT00000002", "NCT00000003", "NCT00000004"],
+        )
+        self.assertEqual(self._ids({"filter.advanced": "AREA[StartDate]RANGE[MIN,2020-12-31]"}), [])
+        self.assertEqual(
+            sorted(self._ids({
+                "query.cond": "breast",
+                "filter.advanced": 'AREA[Phase]PHASE2 AND AREA[LocationFacility]"University Hospital"',
+            })),
+            ["NCT00000001", "NCT00000003", "NCT00000004"],
+        )
+        self.assertEqual(self._ids({"filter.advanced": 'AREA[LocationFacility]"Mayo Clinic"'}), [])
+
+    def test_month_precision_start_dates_match_their_month(self) -> None:
+        study = _full_study("NCT00000005", "Month-only start", ["Asthma"], "Drug M")
+        study["protocolSection"]["statusModule"]["startDateStruct"] = {"date": "2022-06"}
+        self.store.upsert_studies([study])
+
+        self.assertEqual(
+            self._ids({"filter.advanced": "AREA[StartDate]RANGE[2022-06-01,2022-06-30]"}),
+            ["NCT00000005"],
+        )
+
+    def test_opening_the_store_does_not_wait_for_a_writer(self) -> None:
+        writer = sqlite3.connect(str(self.tmp / "mirror.sqlite3"), timeout=0)
+        self.addCleanup(writer.close)
+        writer.execute("BEGIN IMMEDIATE")
+
+        with patch("sqlite3.connect", partial(sqlite3.connect, timeout=0)):
+            store = ClinicalTrialsStore(self.tmp / "mirror.sqlite3")
+
+        self.assertEqual(store.count(), 3)
+
+    def test_each_batch_is_committed_as_it_is_written(self) -> None:
+        committed = []
+
+        def studies():
+            for index in range(4):
+                if index == 2:
+                    with sqlite3.connect(str(self.tmp / "mirror.sqlite3")) as reader:
+                        committed.append(reader.execute("SELECT COUNT(*) FROM studies").fetchone()[0])
+                yield _full_study(f"NCT1000000{index}", "Batch study", ["Gout"], "Drug B")
+
+        self.assertEqual(self.store.upsert_studies(studies(), batch_size=2), (4, 0))
+        self.assertEqual(committed, [5])
+
+    def test_id_filter(self) -> None:
+        self.assertEqual(
+            sorted(self._ids({"filter.ids": "NCT00000003,NCT00000001,NCT99999999"})),
+            ["NCT00000001", "NCT00000003"],
+        )
+
+    def test_paging_and_total_count(self) -> None:
+        first = self.store.search({"pageSize": "2", "countTotal": "true"})
+        self.assertEqual(first["totalCount"], 3)
+        self.assertEqual(len(first["studies"]), 2)
+        second = self.store.search({"pageSize": "2", "pageToken": first["nextPageToken"]})
+        self.assertEqual(len(second["studies"]), 1)
+        self.assertNotIn("nextPageToken", second)
+
+    def test_upsert_replaces_existing_rows(self) -> None:
+        updated = _full_study("NCT00000001", "Olaparib adjuvant study", ["Ovarian Cancer"], "Olaparib",
+                              status="COMPLETED")
+        self.assertEqual(self.store.upsert_studies([updated]), (0, 1))
+        self.assertEqual(self.store.count(), 3)
+        self.assertEqual(self._ids({"query.cond": "ovarian"}), ["NCT00000001"])
+        self.assertEqual(self._ids({"query.cond": "breast cancer"}), [])
+
+    def test_duplicate_ids_in_one_batch_keep_the_last_version(self) -> None:
+        first = _full_study("NCT00000009", "First title", ["Asthma"], "Drug A")
+        second = _full_study("NCT00000009", "Second title", ["Asthma"], "Drug B")
+
+        self.assertEqual(self.store.upsert_studies([first, second]), (1, 0))
+        self.assertEqual(self.store.count(), 4)
+        self.assertEqual(self._ids({"query.intr": "Drug B"}), ["NCT00000009"])
+        self.assertEqual(self._ids({"query.intr": "Drug A"}), [])
+
+    def test_payload_matches_api_projection(self) -> None:
+        study = self.store.search({"query.intr": "olaparib"})["studies"][0]
+        self.assertEqual(
+            set(study["protocolSection"]),
+            {"identificationModule", "statusModule", "conditionsModule",
+             "armsInterventionsModule", "designModule"},
+        )
+
+    def test_bulk_export_formats(self) -> None:
+        jsonl = self.tmp / "export.jsonl"
+        jsonl.write_text("\n".join(json.dumps(study) for study in STUDIES), encoding="utf-8")
+        export_dir = self.tmp / "export"
+        export_dir.mkdir()
+        for study in STUDIES:
+            nct_id = study["protocolSection"]["identificationModule"]["nctId"]
+            (export_dir / f"{nct_id}.json").write_text(json.dumps(study), encoding="utf-8")
+
+        self.assertEqual(len(list(iter_bulk_export(jsonl))), 3)
+        self.assertEqual(len(list(iter_bulk_export(export_dir))), 3)
+
+    def test_local_backend_matches_api_backend(self) -> None:
+        with patch("retriever.Clinical_Trials_Retriever_Agent.get_store", return_value=self.store):
+            local = fetch_clinical_trials(condition="breast", status="Recruiting", backend="local")
+
+        response = MagicMock()
+        response.json.return_value = self.store.search({"query.cond": "breast"})
+        with patch("retriever.Clinical_Trials_Retriever_Agent.http_client.get", return_value=response), \
+                patch("retriever.Clinical_Trials_Retriever_Agent.get_cache", return_value=None):
+            remote = fetch_clinical_trials(condition="breast", status="Recruiting", backend="api")
+
+        self.assertEqual(list(local.columns), list(remote.columns))
+        self.assertEqual(local.to_dict(orient="records"), remote.to_dict(orient="records"))
+        self.assertEqual(local.attrs["source"], remote.attrs["source"])
+        self.assertEqual(local.attrs["total_count"], 2)
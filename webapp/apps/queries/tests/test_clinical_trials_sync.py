@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from retriever.clinical_trials_store import ClinicalTrialsStore
+from retriever.clinical_trials_sync import WATERMARK_KEY, sync_trials_mirror
+
+from .test_clinical_trials_store import STUDIES, _full_study
+
+
+def _response(studies, next_token=None) -> MagicMock:
+    response = MagicMock()
+    payload = {"studies": studies}
+    if next_token:
+        payload["nextPageToken"] = next_token
+    response.json.return_value = payload
+    return response
+
+
+@patch("retriever.clinical_trials_sync.http_client.get")
+class SyncTrialsMirrorTests(SimpleTestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.store = ClinicalTrialsStore(Path(tmpdir.name) / "mirror.sqlite3")
+        self.store.upsert_studies(STUDIES)
+
+    def test_upserts_updates_since_latest_mirrored_date(self, mock_get: MagicMock) -> None:
+        changed = _full_study("NCT00000001", "Olaparib in breast cancer", ["Breast Cancer"], "Olaparib",
+                              status="COMPLETED")
+        changed["protocolSection"]["statusModule"]["lastUpdatePostDateStruct"]["date"] = "2024-06-10"
+        added = _full_study("NCT00000009", "New study", ["Asthma"], "Drug Z")
+        mock_get.side_effect = [_response([changed], next_token="t2"), _response([added])]
+
+        stats = sync_trials_mirror(self.store)
+
+        params = mock_get.call_args_list[0].kwargs["params"]
+        self.assertEqual(params["filter.advanced"], "AREA[LastUpdatePostDate]RANGE[2024-05-01,MAX]")
+        self.assertIn("protocolSection.contactsLocationsModule.locations", params["fields"])
+        self.assertEqual((stats["inserted"], stats["updated"], stats["pages"]), (1, 1, 2))
+        self.assertEqual(stats["watermark"], "2024-06-10")
+        self.assertEqual(self.store.get_state(WATERMARK_KEY), "2024-06-10")
+        self.assertEqual(self.store.count(), 4)
+
+    def test_stored_watermark_takes_precedence(self, mock_get: MagicMock) -> None:
+        self.store.set_state(WATERMARK_KEY, "2025-01-01")
+        mock_get.return_value = _response([])
+
+        stats = sync_trials_mirror(self.store)
+
+        self.assertEqual(stats["since"], "2025-01-01")
+        self.assertEqual(stats["fetched"], 0)
+
+    def test_empty_mirror_requires_bootstrap(self, mock_get: MagicMock) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            empty = ClinicalTrialsStore(Path(tmpdir) / "empty.sqlite3")
+            with self.assertRaises(ValueError):
+                sync_trials_mirror(empty)
+        mock_get.assert_not_called()
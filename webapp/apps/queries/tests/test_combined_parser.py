@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import json
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from query_parser import combined_parser
+from query_parser.combined_parser import QueryAnalysis, analyze_query, coerce_analysis
+from utils import llm_gateway
+
+
+class _DictCache(dict):
+    def set(self, key, value, expire=None):
+        self[key] = value
+
+
+LLM_REPLY = {
+    "route": "both",
+    "clinical_trials": {"Condition/Disease": "heart failure", "Phase": None, "Location": "null"},
+    "entities": {"drug": ["semaglutide"], "disease": "heart failure", "target": []},
+}
+
+
+class AnalyzeQueryTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.cache = _DictCache()
+        patcher = patch.object(combined_parser, "get_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Keep gateway slots and metrics out of the developer's disk cache.
+        gateway = patch.object(llm_gateway, "get_cache", return_value=None)
+        gateway.start()
+        self.addCleanup(gateway.stop)
+        llm_gateway._reset()
+        self.addCleanup(llm_gateway._reset)
+
+    def test_rule_based_queries_skip_the_llm(self) -> None:
+        with patch.object(combined_parser, "get_combined_chain") as get_chain:
+            analysis = analyze_query("phase 2 breast cancer trials recruiting in Germany")
+
+        get_chain.assert_not_called()
+        self.assertEqual(analysis.route, "clinical_trials")
+        self.assertEqual(analysis.source, "rules")
+        self.assertEqual(analysis.entities["disease"], ["breast cancer"])
+
+    def test_negated_and_ambiguous_queries_take_the_llm_path(self) -> None:
+        chain = MagicMock()
+        chain.run.return_value = json.dumps(LLM_REPLY)
+
+        with patch.object(combined_parser, "get_combined_chain", return_value=chain):
+            for query in (
+                "phase 2 breast cancer trials not recruiting in Germany in 2020",
+                "recruiting phase 2 breast cancer trials in Germany without tamoxifen",
+                "open label phase 3 trials of pembrolizumab in melanoma in the United States",
+            ):
+                with self.subTest(query=query):
+                    self.assertEqual(analyze_query(query).source, "llm")
+
+        self.assertEqual(chain.run.call_count, 3)
+
+    def test_targets_route_to_open_targets(self) -> None:
+        analysis = analyze_query("Breast cancer drugs targeting BRCA1")
+
+        self.assertEqual(analysis.route, "open_targets")
+
+    def test_single_llm_call_returns_route_fields_and_entities(self) -> None:
+        chain = MagicMock()
+        chain.run.return_value = json.dumps(LLM_REPLY)
+        query = "Does semaglutide improve long-term heart failure outcomes?"
+
+        with patch.object(combined_parser, "get_combined_chain", return_value=chain):
+            analysis = analyze_query(query)
+            cached = analyze_query(query)
+
+        chain.run.assert_called_once()
+        self.assertEqual(analysis.route, "both")
+        self.assertEqual(analysis.fields["Condition/Disease"], "heart failure")
+        self.assertIsNone(analysis.fields["Location"])
+        self.assertEqual(analysis.entities["disease"], ["heart failure"])
+        self.assertEqual(cached.source, "cache")
+
+    def test_unusable_reply_returns_none(self) -> None:
+        chain = MagicMock()
+        chain.run.return_value = '{"route": "maybe"}'
+
+        with patch.object(combined_parser, "get_combined_chain", return_value=chain):
+            self.assertIsNone(analyze_query("Does semaglutide improve long-term heart failure outcomes?"))
+        self.assertEqual(self.cache, {})
+
+    def test_coerce_rejects_non_objects(self) -> None:
+        self.assertIsNone(coerce_analysis(["clinical_trials"]))
+
+
+class RouterUsesAnalysisTests(SimpleTestCase):
+    def test_pipelines_receive_precomputed_inputs(self) -> None:
+        import main
+
+        analysis = QueryAnalysis(
+            route="both",
+            fields={"Condition/Disease": "melanoma"},
+            entities={"drug": [], "disease": ["melanoma"], "target": []},
+            source="llm",
+        )
+        with patch.object(main, "analyze_query", return_value=analysis), \
+                patch.object(main, "run_clinical_trials", return_value=None) as trials, \
+                patch.object(main, "run_open_targets", return_value=[]) as targets, \
+                patch.object(main.DBFinder, "classify_query") as classify:
+            finder = main.DBFinder()
+            finder.route_and_query("melanoma", budgets={"clinical_trials": 5})
+
+        classify.assert_not_called()
+        trials.assert_called_once_with("melanoma", max_results=5, parsed=analysis.fields)
+        targets.assert_called_once_with("melanoma", max_results=None, entities=analysis.entities)
+        self.assertEqual(finder.last_classification, "both")
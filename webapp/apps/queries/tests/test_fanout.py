@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import threading
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from utils.fanout import map_concurrent
+
+
+class MapConcurrentTests(SimpleTestCase):
+    def test_results_keep_input_order(self) -> None:
+        def slow_square(value):
+            time.sleep(0.01 * (5 - value))
+            return value * value
+
+        outcomes = map_concurrent(slow_square, range(5))
+
+        self.assertEqual([value for value, _ in outcomes], [0, 1, 4, 9, 16])
+        self.assertTrue(all(error is None for _, error in outcomes))
+
+    def test_calls_overlap(self) -> None:
+        barrier = threading.Barrier(3, timeout=1)
+
+        # Deadlocks (and times out) unless all three calls run at once.
+        outcomes = map_concurrent(lambda _: barrier.wait(), range(3), max_workers=3)
+
+        self.assertTrue(all(error is None for _, error in outcomes))
+
+    def test_errors_and_timeouts_are_per_item(self) -> None:
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def call(value):
+            if value == "boom":
+                raise ValueError("boom")
+            if value == "hang":
+                release.wait(5)
+            return value
+
+        outcomes = map_concurrent(call, ["ok", "boom", "hang"], timeout=0.05)
+
+        self.assertEqual(outcomes[0], ("ok", None))
+        self.assertIsInstance(outcomes[1][1], ValueError)
+        self.assertIsInstance(outcomes[2][1], TimeoutError)
+
+
+class ConcurrentNormalizationTests(SimpleTestCase):
+    def test_terms_are_normalized_concurrently_in_order(self) -> None:
+        import open_targets_copy
+
+        def zooma(term):
+            time.sleep(0.05 if term == "asthma" else 0)
+            if term == "olaparib":
+                raise ValueError("no EFO")
+            return f"EFO_{term}"
+
+        entities = {"drug": ["olaparib"], "disease": ["asthma", "melanoma"], "target": []}
+        with patch.object(open_targets_copy.Normalizer, "get_efo_id_from_zooma", side_effect=zooma), \
+                patch.object(open_targets_copy.Normalizer, "get_chembl_id", return_value="CHEMBL1"):
+            results = open_targets_copy.extract_and_normalize("ignored", entities=entities)
+
+        self.assertEqual([item["efo_id"] for item in results["disease"]], ["EFO_asthma", "EFO_melanoma"])
+        self.assertEqual(results["drug"], [{"term": "olaparib", "efo_id": None, "chembl_id": "CHEMBL1"}])
+        self.assertEqual(results["target"], [])
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from utils import http_client
+
+
+class SharedSessionTests(SimpleTestCase):
+    def tearDown(self) -> None:
+        http_client.reset_session()
+
+    def test_session_is_reused(self) -> None:
+        self.assertIs(http_client.get_session(), http_client.get_session())
+
+    def test_reset_session_builds_a_new_one(self) -> None:
+        first = http_client.get_session()
+        http_client.reset_session()
+        self.assertIsNot(first, http_client.get_session())
+
+    def test_adapter_retries_rate_limits_and_server_errors(self) -> None:
+        adapter = http_client.get_session().get_adapter("https://clinicaltrials.gov")
+        retry = adapter.max_retries
+        self.assertIn(429, retry.status_forcelist)
+        self.assertIn(503, retry.status_forcelist)
+        self.assertIn("POST", retry.allowed_methods)
+        self.assertTrue(retry.respect_retry_after_header)
+
+    def test_retry_after_is_capped(self) -> None:
+        retry = http_client.build_retry()
+        response = MagicMock()
+        response.headers = {"Retry-After": "3600"}
+        response.getheader.return_value = "3600"
+        with patch.object(http_client, "MAX_RETRY_AFTER", 5):
+            self.assertEqual(retry.get_retry_after(response), 5)
+
+    def test_default_timeout_is_applied(self) -> None:
+        with patch.object(http_client.get_session(), "request") as mock_request:
+            http_client.get("https://example.org", params={"q": "x"})
+            self.assertEqual(mock_request.call_args.kwargs["timeout"], http_client.DEFAULT_TIMEOUT)
+
+            http_client.post("https://example.org", json={}, timeout=3)
+            self.assertEqual(mock_request.call_args.kwargs["timeout"], 3)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from utils import llm, llm_gateway
+
+
+class _DictCache(dict):
+    def set(self, key, value, expire=None):
+        self[key] = value
+
+
+class LazyLLMTests(SimpleTestCase):
+    def tearDown(self) -> None:
+        llm.reset()
+
+    def test_importing_agents_does_not_build_llms(self) -> None:
+        llm.reset()
+        import main  # noqa: F401
+        import query_parser.Clinical_Trials_Query_Parser_Agent  # noqa: F401
+        import query_parser.open_targets_query_parser  # noqa: F401
+
+        self.assertEqual(llm._llms, {})
+        self.assertEqual(llm._chains, {})
+
+    def test_llm_is_built_once_per_model(self) -> None:
+        with patch("langchain_community.llms.Ollama") as ollama:
+            first = llm.get_llm("gemma2:latest")
+            second = llm.get_llm("gemma2:latest")
+            llm.get_llm("llama3")
+
+        self.assertIs(first, second)
+        self.assertEqual(ollama.call_count, 2)
+
+    def test_json_mode_constrains_output(self) -> None:
+        with patch("langchain_community.llms.Ollama") as ollama:
+            llm.get_llm("gemma2:latest", json_mode=True, num_predict=64)
+
+        kwargs = ollama.call_args.kwargs
+        self.assertEqual(kwargs["format"], "json")
+        self.assertEqual(kwargs["num_predict"], 64)
+
+
+class ParseQueryTests(SimpleTestCase):
+    def setUp(self) -> None:
+        from query_parser import Clinical_Trials_Query_Parser_Agent as agent
+
+        self.agent = agent
+        self.cache = _DictCache()
+        patcher = patch.object(agent, "get_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Keep gateway slots and metrics out of the developer's disk cache.
+        gateway = patch.object(llm_gateway, "get_cache", return_value=None)
+        gateway.start()
+        self.addCleanup(gateway.stop)
+        llm_gateway._reset()
+        self.addCleanup(llm_gateway._reset)
+
+    def test_simple_queries_skip_the_llm(self) -> None:
+        with patch.object(self.agent, "get_keyword_chain") as get_chain:
+            parsed = self.agent.parse_query("phase 2 breast cancer trials recruiting in Germany")
+
+        get_chain.assert_not_called()
+        self.assertEqual(parsed["Phase"], "Phase 2")
+
+    def test_llm_parses_are_cached(self) -> None:
+        chain = MagicMock()
+        chain.run.return_value = json.dumps({"Condition/Disease": "heart disease"})
+        query = "Long-term cardiovascular outcomes of semaglutide"
+
+        with patch.object(self.agent, "get_keyword_chain", return_value=chain):
+            first = self.agent.parse_query(query)
+            second = self.agent.parse_query(query.upper())
+
+        self.assertEqual(first, second)
+        chain.run.assert_called_once()
+
+    def test_replies_outside_the_schema_fall_back(self) -> None:
+        chain = MagicMock()
+        chain.run.return_value = 'Sure! {"Condition/Disease": "heart disease"}'
+
+        with patch.object(self.agent, "get_keyword_chain", return_value=chain):
+            parsed = self.agent.parse_query("Long-term cardiovascular outcomes of semaglutide")
+
+        self.assertEqual(parsed, self.agent.fallback_extract(""))
+        self.assertEqual(self.cache, {})
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import diskcache
+from django.test import SimpleTestCase
+
+from utils import llm_gateway, llm_warmup
+
+
+class _SlowChain:
+    def __init__(self, delay: float = 0.05) -> None:
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def run(self, text: str) -> str:
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return text.upper()
+
+
+class LLMGatewayTests(SimpleTestCase):
+    def setUp(self) -> None:
+        # Per-process slots keep the tests independent of the disk cache.
+        patcher = patch.object(llm_gateway, "get_cache", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        llm_gateway._reset()
+        self.addCleanup(llm_gateway._reset)
+
+    def test_concurrency_is_limited(self) -> None:
+        chain = _SlowChain()
+        threads = [threading.Thread(target=llm_gateway.run, args=(chain, "q")) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLessEqual(chain.peak, llm_gateway.MAX_CONCURRENCY)
+        metrics = llm_gateway.metrics()
+        self.assertEqual(metrics["completed"], 6)
+        self.assertEqual(metrics["waiting"], 0)
+        self.assertEqual(metrics["in_flight"], 0)
+        self.assertFalse(metrics["shared"])
+
+    def test_timeout_raises_and_is_counted(self) -> None:
+        with self.assertRaises(llm_gateway.LLMTimeoutError):
+            llm_gateway.run(_SlowChain(delay=0.2), "q", timeout=0.01)
+
+        self.assertEqual(llm_gateway.metrics()["timeouts"], 1)
+
+    def test_busy_gateway_rejects_after_queue_timeout(self) -> None:
+        slots = llm_gateway._get_slots()
+        tokens = [slots.acquire(0) for _ in range(llm_gateway.MAX_CONCURRENCY)]
+        try:
+            with patch.object(llm_gateway, "QUEUE_TIMEOUT", 0.01), self.assertRaises(llm_gateway.LLMBusyError):
+                llm_gateway.run(MagicMock(), "q")
+        finally:
+            for token in tokens:
+                slots.release(token)
+        self.assertEqual(llm_gateway.metrics()["rejected"], 1)
+
+    def test_failures_propagate(self) -> None:
+        chain = MagicMock()
+        chain.run.side_effect = ConnectionError("ollama down")
+
+        with self.assertRaises(ConnectionError):
+            llm_gateway.run(chain, "q")
+        self.assertEqual(llm_gateway.metrics()["failed"], 1)
+
+    def test_arun(self) -> None:
+        self.assertEqual(asyncio.run(llm_gateway.arun(_SlowChain(delay=0), "q")), "Q")
+
+    def test_latency_is_split_into_cold_and_warm(self) -> None:
+        chain = _SlowChain(delay=0)
+        llm_gateway.run(chain, "q")
+        llm_gateway.run(chain, "q")
+        with patch.object(llm_gateway, "keep_alive_seconds", return_value=-1):
+            llm_gateway.run(chain, "q")
+
+        metrics = llm_gateway.metrics()
+        self.assertEqual(metrics["cold_calls"], 2)
+        self.assertEqual(metrics["warm_calls"], 1)
+        self.assertIsNotNone(metrics["idle_s"])
+
+    def test_warmth_is_tracked_per_model(self) -> None:
+        chain = _SlowChain(delay=0)
+        llm_gateway.run(chain, "q", model="small", track_latency=False)
+        llm_gateway.run(chain, "q", model="large")
+        llm_gateway.run(chain, "q", model="small")
+
+        metrics = llm_gateway.metrics()
+        self.assertEqual(metrics["cold_calls"], 1)
+        self.assertEqual(metrics["warm_calls"], 1)
+
+    def test_untracked_calls_keep_the_model_warm(self) -> None:
+        chain = _SlowChain(delay=0)
+        llm_gateway.run(chain, "ping", track_latency=False)
+        llm_gateway.run(chain, "q")
+
+        metrics = llm_gateway.metrics()
+        self.assertEqual(metrics["cold_calls"], 0)
+        self.assertEqual(metrics["warm_calls"], 1)
+
+
+class SharedSlotsTests(SimpleTestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.cache = diskcache.Cache(tmpdir.name)
+        self.addCleanup(self.cache.close)
+        self.slots = llm_gateway._SharedSlots(self.cache)
+
+    def test_in_flight_counts_live_slots(self) -> None:
+        token = self.slots.acquire(0)
+        self.assertEqual(self.slots.in_flight(), 1)
+
+        self.slots.release(token)
+        self.assertEqual(self.slots.in_flight(), 0)
+
+    def test_slot_of_a_dead_worker_stops_counting_once_expired(self) -> None:
+        self.cache.add("slot:0", "dead-worker", expire=0.05)
+        self.assertEqual(self.slots.in_flight(), 1)
+
+        time.sleep(0.1)
+        self.assertEqual(self.slots.in_flight(), 0)
+
+
+    def test_waiters_are_counted_across_processes(self) -> None:
+        other_process = llm_gateway._SharedSlots(self.cache)
+        token = other_process.enqueue()
+        self.assertEqual(self.slots.waiting(), 1)
+
+        other_process.dequeue(token)
+        self.assertEqual(self.slots.waiting(), 0)
+
+    def test_waiter_of_a_dead_worker_stops_counting_once_expired(self) -> None:
+        with patch.object(llm_gateway, "QUEUE_TIMEOUT", 0):
+            self.slots.enqueue()
+        self.assertEqual(self.slots.waiting(), 1)
+
+        time.sleep(0.1)
+        self.assertEqual(self.slots.waiting(), 0)
+
+
+class LLMWarmupTests(SimpleTestCase):
+    def setUp(self) -> None:
+        for module in (llm_gateway, llm_warmup):
+            patcher = patch.object(module, "get_cache", return_value=None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        llm_gateway._reset()
+        self.addCleanup(llm_gateway._reset)
+        self.addCleanup(llm_warmup._last_ping.clear)
+
+    def test_ping_records_success(self) -> None:
+        with patch.object(llm_warmup, "get_ping_chain", return_value=_SlowChain(delay=0)):
+            status = llm_warmup.ping()
+
+        self.assertTrue(status["ok"])
+        self.assertEqual(llm_warmup.last_ping()[status["model"]], status)
+        self.assertEqual(llm_gateway.metrics()["cold_calls"], 0)
+
+    def test_failed_warm_up_is_recorded_not_raised(self) -> None:
+        chain = MagicMock()
+        chain.run.side_effect = ConnectionError("ollama down")
+        with patch.object(llm_warmup, "get_ping_chain", return_value=chain), \
+                patch.object(llm_warmup, "tier_models", return_value=["small", "large"]):
+            statuses = llm_warmup.warm_up()
+
+        self.assertEqual([status["model"] for status in statuses], ["small", "large"])
+        self.assertFalse(statuses[0]["ok"])
+        self.assertEqual(statuses[0]["kind"], "warmup")
+        self.assertIn("ollama down", llm_warmup.last_ping()["large"]["error"])
+
+    def test_background_warm_up_can_be_disabled(self) -> None:
+        with patch.object(llm_warmup, "WARMUP_ENABLED", False):
+            self.assertIsNone(llm_warmup.warm_up_in_background())
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import os
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from utils import llm_gateway, llm_tiers
+
+
+def _chain(reply):
+    chain = MagicMock()
+    if isinstance(reply, Exception):
+        chain.run.side_effect = reply
+    else:
+        chain.run.return_value = reply
+    return chain
+
+
+def _label(reply):
+    return reply if reply in {"clinical_trials", "open_targets"} else None
+
+
+class ModelTierTests(SimpleTestCase):
+    def setUp(self) -> None:
+        patcher = patch.object(llm_gateway, "get_cache", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        llm_gateway._reset()
+        self.addCleanup(llm_gateway._reset)
+
+    def test_small_tier_answers_when_valid(self) -> None:
+        chains = {"small": _chain("open_targets"), "large": _chain("clinical_trials")}
+
+        result = llm_tiers.run_with_escalation("router", chains.get, _label, "q", models=["small", "large"])
+
+        self.assertEqual((result.value, result.model, result.attempts), ("open_targets", "small", 1))
+        chains["large"].run.assert_not_called()
+
+    def test_invalid_reply_escalates(self) -> None:
+        chains = {"small": _chain("trials?"), "large": _chain("clinical_trials")}
+
+        result = llm_tiers.run_with_escalation("router", chains.get, _label, "q", models=["small", "large"])
+
+        self.assertEqual((result.value, result.model, result.attempts), ("clinical_trials", "large", 2))
+        self.assertEqual(llm_gateway.metrics()["escalations"], 1)
+
+    def test_errors_escalate_and_exhaustion_returns_none(self) -> None:
+        chains = {"small": _chain(ConnectionError("model not found")), "large": _chain("maybe")}
+
+        self.assertIsNone(
+            llm_tiers.run_with_escalation("router", chains.get, _label, "q", models=["small", "large"])
+        )
+
+    def test_timeouts_do_not_escalate(self) -> None:
+        chain_for = MagicMock(return_value=_chain("open_targets"))
+        with patch.object(llm_gateway, "run", side_effect=llm_gateway.LLMTimeoutError("slow")), \
+                self.assertRaises(llm_gateway.LLMTimeoutError):
+            llm_tiers.run_with_escalation("router", chain_for, _label, "q", models=["small", "large"])
+        chain_for.assert_called_once_with("small")
+
+    def test_per_task_override(self) -> None:
+        with patch.dict(os.environ, {"GRID_LLM_MODELS_CT_FIELDS": "tiny, gemma2:latest ,tiny"}):
+            self.assertEqual(llm_tiers._ladder("ct-fields"), ["tiny", "gemma2:latest"])
+
+    def test_default_ladder_uses_only_the_required_model(self) -> None:
+        with patch.object(llm_tiers, "SMALL_MODEL", llm_tiers.OLLAMA_MODEL):
+            self.assertEqual(llm_tiers._ladder("router"), [llm_tiers.OLLAMA_MODEL])
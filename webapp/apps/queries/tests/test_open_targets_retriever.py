@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import tempfile
+from unittest.mock import MagicMock, patch
+
+import diskcache
+from django.test import SimpleTestCase
+
+from retriever import open_targets_retriever
+from retriever.open_targets_retriever import (
+    _MemoryCache,
+    _cache_key,
+    build_batch_query,
+    cache_stats,
+    collect_rows,
+    fetch_lookups,
+    iter_associated_targets,
+    query_disease_known_drugs,
+)
+
+
+def _payload(payload):
+    response = MagicMock()
+    response.json.return_value = payload
+    return response
+
+
+def _response(rows):
+    return _payload({"data": {"l0": {"knownDrugs": {"rows": rows}}}})
+
+
+@patch("retriever.open_targets_retriever.http_client.post")
+class ResponseCacheTests(SimpleTestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.cache = diskcache.Cache(tmpdir.name, statistics=True)
+        self.addCleanup(self.cache.close)
+        patcher = patch.object(open_targets_retriever, "get_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_query_is_served_from_cache(self, mock_post: MagicMock) -> None:
+        mock_post.return_value = _response([{"drug": {"name": "olaparib"}}])
+
+        first = query_disease_known_drugs("EFO_0000305")
+        second = query_disease_known_drugs("EFO_0000305")
+
+        self.assertEqual(first, second)
+        mock_post.assert_called_once()
+        stats = cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+        self.assertEqual(stats["backend"], "disk")
+
+    def test_errors_are_not_cached(self, mock_post: MagicMock) -> None:
+        failing = MagicMock()
+        failing.json.return_value = {"errors": [{"message": "bad efo"}]}
+        mock_post.return_value = failing
+
+        with self.assertRaises(ValueError):
+            query_disease_known_drugs("EFO_bad")
+        self.assertEqual(len(self.cache), 0)
+
+
+@patch("retriever.open_targets_retriever.http_client.post")
+class BatchedLookupTests(SimpleTestCase):
+    LOOKUPS = [
+        ("disease_known_drugs", "EFO_0000305"),
+        ("target_associated_diseases", "EFO_0000305"),
+        ("drug_indications", "CHEMBL521686"),
+    ]
+
+    def setUp(self) -> None:
+        patcher = patch.object(open_targets_retriever, "_response_cache", return_value=_MemoryCache(16))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_all_lookups_share_one_request(self, mock_post: MagicMock) -> None:
+        mock_post.return_value = _payload({"data": {
+            "l0": {"knownDrugs": {"rows": [{"drug": {"name": "olaparib"}}]}},
+            "l1": {"associatedTargets": {"rows": [{"target": {"approvedSymbol": "BRCA1"}}]}},
+            "l2": {"indications": {"rows": [{"disease": {"name": "breast cancer"}}]}},
+        }})
+
+        rows, errors = fetch_lookups(self.LOOKUPS)
+
+        mock_post.assert_called_once()
+        sent = mock_post.call_args.kwargs["json"]
+        self.assertEqual(sent["variables"], {"v0": "EFO_0000305", "v1": "CHEMBL521686"})
+        self.assertEqual(errors, {})
+        self.assertEqual(list(rows), self.LOOKUPS)
+        self.assertEqual(collect_rows(rows, "drug_indications"), [{"disease": {"name": "breast cancer"}}])
+
+        # A second pass, even in a different batch, is answered from the cache.
+        again, _ = fetch_lookups(self.LOOKUPS[1:])
+        mock_post.assert_called_once()
+        self.assertEqual(again[self.LOOKUPS[1]], rows[self.LOOKUPS[1]])
+
+    def test_errors_are_attributed_to_their_alias(self, mock_post: MagicMock) -> None:
+        mock_post.return_value = _payload({
+            "data": {"l0": {"knownDrugs": {"rows": []}}, "l1": None, "l2": {"indications": None}},
+            "errors": [{"message": "not found", "path": ["l1", "associatedTargets"]}],
+        })
+
+        rows, errors = fetch_lookups(self.LOOKUPS)
+
+        self.assertEqual(list(errors), [self.LOOKUPS[1]])
+        self.assertEqual(rows, {self.LOOKUPS[0]: [], self.LOOKUPS[2]: []})
+
+    def test_large_batches_are_split(self, mock_post: MagicMock) -> None:
+        mock_post.return_value = _payload({"data": {}})
+        lookups = [("drug_indications", f"CHEMBL{index}") for index in range(5)]
+
+        with patch.object(open_targets_retriever, "BATCH_SIZE", 2):
+            rows, _ = fetch_lookups(lookups)
+
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(len(rows), 5)
+
+
+def _drugs(start, count):
+    return [{"drug": {"name": f"drug-{index}"}} for index in range(start, start + count)]
+
+
+def _targets(*scores):
+    return [{"target": {"id": f"T{index}"}, "score": score} for index, score in enumerate(scores)]
+
+
+@patch("retriever.open_targets_retriever.http_client.post")
+class PaginationTests(SimpleTestCase):
+    DRUGS = ("disease_known_drugs", "EFO_1")
+    TARGETS = ("target_associated_diseases", "EFO_1")
+
+    def setUp(self) -> None:
+        self.cache = _MemoryCache(16)
+        patcher = patch.object(open_targets_retriever, "_response_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pages_are_followed_in_batched_rounds(self, mock_post: MagicMock) -> None:
+        mock_post.side_effect = [
+            _payload({"data": {
+                "l0": {"knownDrugs": {"count": 5, "cursor": "c1", "rows": _drugs(0, 2)}},
+                "l1": {"associatedTargets": {"count": 3, "rows": _targets(0.9, 0.8)}},
+            }}),
+            _payload({"data": {
+                "l0": {"knownDrugs": {"count": 5, "cursor": "c2", "rows": _drugs(2, 2)}},
+                "l1": {"associatedTargets": {"count": 3, "rows": _targets(0.7)}},
+            }}),
+            _payload({"data": {"l0": {"knownDrugs": {"count": 5, "cursor": None, "rows": _drugs(4, 1)}}}}),
+        ]
+
+        rows, errors = fetch_lookups([self.DRUGS, self.TARGETS], page_size=2, max_rows=0)
+
+        self.assertEqual(errors, {})
+        self.assertEqual(len(rows[self.DRUGS]), 5)
+        self.assertEqual(len(rows[self.TARGETS]), 3)
+        self.assertEqual(mock_post.call_count, 3)
+        second = mock_post.call_args_list[1].kwargs["json"]["query"]
+        self.assertIn('cursor: "c1"', second)
+        self.assertIn("page: {index: 1, size: 2}", second)
+
+    def test_row_budget_stops_early(self, mock_post: MagicMock) -> None:
+        mock_post.return_value = _payload({"data": {
+            "l0": {"knownDrugs": {"count": 1000, "cursor": "next", "rows": _drugs(0, 3)}},
+        }})
+
+        rows, _ = fetch_lookups([self.DRUGS], max_rows=3)
+
+        mock_post.assert_called_once()
+        self.assertIn("knownDrugs(size: 3)", mock_post.call_args.kwargs["json"]["query"])
+        self.assertEqual(len(rows[self.DRUGS]), 3)
+
+    def test_low_scoring_targets_end_pagination(self, mock_post: MagicMock) -> None:
+        mock_post.return_value = _payload({"data": {
+            "l0": {"associatedTargets": {"count": 500, "rows": _targets(0.9, 0.6, 0.2)}},
+        }})
+
+        rows, _ = fetch_lookups([self.TARGETS], page_size=3, max_rows=0, min_score=0.5)
+
+        mock_post.assert_called_once()
+        self.assertEqual([row["score"] for row in rows[self.TARGETS]], [0.9, 0.6])
+
+    def test_failed_later_page_keeps_rows_but_is_not_cached(self, mock_post: MagicMock) -> None:
+        mock_post.side_effect = [
+            _payload({"data": {"l0": {"knownDrugs": {"count": 4, "cursor": "c1", "rows": _drugs(0, 2)}}}}),
+            ConnectionError("reset"),
+        ]
+
+        rows, errors = fetch_lookups([self.DRUGS], page_size=2, max_rows=0)
+
+        self.assertEqual(errors, {})
+        self.assertEqual(len(rows[self.DRUGS]), 2)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_streaming_iterator_fetches_lazily(self, mock_post: MagicMock) -> None:
+        mock_post.side_effect = [
+            _payload({"data": {"l0": {"associatedTargets": {"count": 4, "rows": _targets(0.9, 0.8)}}}}),
+            _payload({"data": {"l0": {"associatedTargets": {"count": 4, "rows": _targets(0.7, 0.6)}}}}),
+        ]
+
+        stream = iter_associated_targets("EFO_1", page_size=2, max_rows=0)
+        first = next(stream)
+
+        self.assertEqual(first["score"], 0.9)
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(len([first, *stream]), 4)
+        self.assertEqual(mock_post.call_count, 2)
+
+
+class CacheKeyTests(SimpleTestCase):
+    def test_key_ignores_whitespace_and_variable_order(self) -> None:
+        self.assertEqual(
+            _cache_key("query ($a: String!) {\n  x(a: $a) }", {"a": "1", "b": 2}),
+            _cache_key("query ($a: String!) { x(a: $a) }", {"b": 2, "a": "1"}),
+        )
+        self.assertNotEqual(_cache_key("query { x }", {"a": "1"}), _cache_key("query { x }", {"a": "2"}))
+
+    def test_batch_query_aliases_each_lookup(self) -> None:
+        query, variables = build_batch_query([("disease_known_drugs", "EFO_1"), ("drug_indications", "CHEMBL1")])
+
+        self.assertIn("l0: disease(efoId: $v0)", query)
+        self.assertIn("l1: drug(chemblId: $v1)", query)
+        self.assertEqual(variables, {"v0": "EFO_1", "v1": "CHEMBL1"})
+
+
+class MemoryCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used_entries(self) -> None:
+        cache = _MemoryCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+
+    def test_expired_entries_are_misses(self) -> None:
+        cache = _MemoryCache(max_entries=2)
+        with patch("retriever.open_targets_retriever.time.time", side_effect=[100.0, 200.0]):
+            cache.set("a", 1, expire=10)
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats(), (0, 1))
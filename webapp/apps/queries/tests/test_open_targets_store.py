@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from retriever import open_targets_retriever, open_targets_store
+from retriever.open_targets_retriever import fetch_lookups, iter_known_drugs
+from retriever.open_targets_store import OpenTargetsRelease
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - exercised only without pyarrow
+    pa = pq = None
+
+DATASETS = {
+    "knownDrugsAggregated": {
+        "diseaseId": ["EFO_1", "EFO_2", "EFO_1", "EFO_1"],
+        "drugId": ["CHEMBL1", "CHEMBL2", "CHEMBL2", "CHEMBL3"],
+        "prefName": ["ONE", "TWO", "TWO", "THREE"],
+        "phase": [2.0, 4.0, 4.0, 1.0],
+        "label": ["d1", "d2", "d1", "d1"],
+        "targetClass": [["Enzyme"], ["Kinase"], ["Kinase"], []],
+    },
+    "molecule": {
+        "id": ["CHEMBL1", "CHEMBL2"],
+        "name": ["DRUG ONE", "DRUG TWO"],
+        "maximumClinicalTrialPhase": [3.0, 4.0],
+    },
+    "indication": {
+        "id": ["CHEMBL1"],
+        "indications": [[
+            {"disease": "EFO_1", "efoName": "disease one", "maxPhaseForIndication": 3.0},
+            {"disease": "EFO_2", "efoName": "disease two", "maxPhaseForIndication": 1.0},
+        ]],
+    },
+    "associationByOverallDirect": {
+        "diseaseId": ["EFO_1", "EFO_1", "EFO_2", "EFO_1"],
+        "targetId": ["ENSG1", "ENSG2", "ENSG1", "ENSG3"],
+        "score": [0.4, 0.9, 0.5, 0.7],
+    },
+    "associationByDatasourceDirect": {
+        "diseaseId": ["EFO_1", "EFO_1", "EFO_1"],
+        "targetId": ["ENSG2", "ENSG2", "ENSG1"],
+        "datasourceId": ["chembl", "europepmc", "chembl"],
+        "score": [0.8, 0.3, 0.4],
+    },
+    "targets": {
+        "id": ["ENSG1", "ENSG2", "ENSG3"],
+        "approvedSymbol": ["T1", "T2", "T3"],
+        "approvedName": ["target one", "target two", "target three"],
+    },
+}
+
+
+def _write_release(root: Path, datasets=DATASETS) -> None:
+    for name, columns in datasets.items():
+        (root / name).mkdir()
+        pq.write_table(pa.table(columns), str(root / name / "part-00000.parquet"))
+
+
+@unittest.skipIf(pq is None, "pyarrow is not installed")
+class OpenTargetsReleaseTests(SimpleTestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        _write_release(Path(tmpdir.name))
+        self.release = OpenTargetsRelease(tmpdir.name)
+
+    def test_known_drugs_match_the_graphql_rows(self) -> None:
+        count, rows = self.release.known_drugs("EFO_1")
+
+        self.assertEqual(count, 3)
+        self.assertEqual(rows[0], {
+            "drug": {"name": "DRUG TWO", "id": "CHEMBL2", "maximumClinicalTrialPhase": 4.0},
+            "phase": 4.0,
+            "label": "d1",
+            "targetClass": ["Kinase"],
+        })
+        # Drugs missing from ``molecule`` keep their aggregated name.
+        self.assertEqual([row["drug"]["name"] for row in rows], ["DRUG TWO", "DRUG ONE", "THREE"])
+
+    def test_indications_are_flattened(self) -> None:
+        count, rows = self.release.indications("CHEMBL1")
+
+        self.assertEqual(count, 2)
+        self.assertEqual(rows[0], {"disease": {"name": "disease one", "id": "EFO_1"}, "maxPhaseForIndication": 3.0})
+
+    def test_associated_targets_are_ranked_and_paged(self) -> None:
+        count, first = self.release.associated_targets("EFO_1", 0, 2)
+        _, second = self.release.associated_targets("EFO_1", 2, 2)
+
+        self.assertEqual(count, 3)
+        self.assertEqual([row["target"]["approvedSymbol"] for row in first + second], ["T2", "T3", "T1"])
+        self.assertEqual(first[0]["datasourceScores"], [{"id": "chembl", "score": 0.8}, {"id": "europepmc", "score": 0.3}])
+        self.assertEqual(first[1]["datasourceScores"], [])
+
+    def test_datasource_scores_are_fetched_per_page_target(self) -> None:
+        index = self.release._index("associationByDatasourceDirect")
+
+        with patch.object(index, "rows", side_effect=AssertionError("whole disease read")):
+            _, page = self.release.associated_targets("EFO_1", 2, 1)
+
+        self.assertEqual(page[0]["datasourceScores"], [{"id": "chembl", "score": 0.4}])
+        self.assertEqual(index.rows_where("EFO_1", "targetId", "ENSG3"), [])
+        self.assertEqual(index.rows_where("EFO_404", "targetId", "ENSG1"), [])
+
+    def test_unknown_identifiers_have_no_rows(self) -> None:
+        self.assertEqual(self.release.known_drugs("EFO_404"), (0, []))
+        self.assertEqual(self.release.indications("CHEMBL404"), (0, []))
+
+
+@unittest.skipIf(pq is None, "pyarrow is not installed")
+class ArrowConversionTests(SimpleTestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.root = Path(tmpdir.name)
+        _write_release(self.root, {name: DATASETS[name] for name in ("knownDrugsAggregated", "molecule")})
+
+    def test_datasets_are_converted_once_and_mapped(self) -> None:
+        self.assertEqual(OpenTargetsRelease(self.root).prepare(), ["knownDrugsAggregated", "molecule"])
+        converted = self.root / "_arrow" / "knownDrugsAggregated.arrow"
+        self.assertTrue(converted.exists())
+
+        with patch.object(open_targets_store.pq, "read_table", side_effect=AssertionError("Parquet re-read")):
+            count, rows = OpenTargetsRelease(self.root).known_drugs("EFO_1")
+
+        self.assertEqual(count, 3)
+        self.assertEqual([row["drug"]["id"] for row in rows], ["CHEMBL2", "CHEMBL1", "CHEMBL3"])
+
+    def test_newer_parquet_is_converted_again(self) -> None:
+        OpenTargetsRelease(self.root).prepare()
+        columns = dict(DATASETS["knownDrugsAggregated"], phase=[2.0, 4.0, 4.0, 4.0])
+        source = self.root / "knownDrugsAggregated" / "part-00000.parquet"
+        pq.write_table(pa.table(columns), str(source))
+        converted = (self.root / "_arrow" / "knownDrugsAggregated.arrow").stat().st_mtime
+        os.utime(source, (converted + 10, converted + 10))
+
+        _, rows = OpenTargetsRelease(self.root).known_drugs("EFO_1")
+
+        self.assertEqual([row["drug"]["id"] for row in rows], ["CHEMBL2", "CHEMBL3", "CHEMBL1"])
+
+    def test_prepare_in_background_indexes_the_shared_release(self) -> None:
+        with patch.dict(open_targets_store._releases, clear=True):
+            open_targets_store.prepare_in_background(self.root).join(timeout=10)
+            release = open_targets_store.get_release(self.root)
+
+        self.assertIn("knownDrugsAggregated", release._indexes)
+        self.assertIn("molecule", release._names)
+
+    def test_unwritable_release_is_read_into_memory(self) -> None:
+        release = OpenTargetsRelease(self.root)
+
+        with patch.object(release, "convert", side_effect=PermissionError("read-only")), \
+                self.assertLogs(level="WARNING") as logs:
+            count, _ = release.known_drugs("EFO_1")
+
+        self.assertEqual(count, 3)
+        self.assertIn("reading it into memory", logs.output[0])
+
+
+@unittest.skipIf(pq is None, "pyarrow is not installed")
+@patch("retriever.open_targets_retriever.http_client.post")
+class LocalBackendTests(SimpleTestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.root = Path(tmpdir.name)
+        _write_release(self.root, {name: DATASETS[name] for name in ("knownDrugsAggregated", "molecule")})
+        patcher = patch.object(open_targets_retriever, "get_release", return_value=OpenTargetsRelease(self.root))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lookups_are_paged_without_the_network(self, mock_post) -> None:
+        lookup = ("disease_known_drugs", "EFO_1")
+
+        rows, errors = fetch_lookups([lookup], page_size=2, max_rows=0, backend="local")
+
+        mock_post.assert_not_called()
+        self.assertEqual(errors, {})
+        self.assertEqual([row["drug"]["id"] for row in rows[lookup]], ["CHEMBL2", "CHEMBL1", "CHEMBL3"])
+        self.assertEqual(len(list(iter_known_drugs("EFO_1", page_size=1, backend="local"))), 3)
+
+    def test_missing_datasets_fail_only_their_lookups(self, mock_post) -> None:
+        drugs, targets = ("disease_known_drugs", "EFO_1"), ("target_associated_diseases", "EFO_1")
+
+        rows, errors = fetch_lookups([drugs, targets], backend="local")
+
+        self.assertEqual(len(rows[drugs]), 3)
+        self.assertIn("associationByOverallDirect", str(errors[targets]))
+
+
+@unittest.skipIf(pq is None, "pyarrow is not installed")
+class MissingReferenceDatasetTests(SimpleTestCase):
+    def test_missing_molecule_dataset_is_logged(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        _write_release(Path(tmpdir.name), {"knownDrugsAggregated": DATASETS["knownDrugsAggregated"]})
+        release = OpenTargetsRelease(tmpdir.name)
+
+        with self.assertLogs(level="WARNING") as logs:
+            count, rows = release.known_drugs("EFO_1")
+
+        self.assertIn("'molecule' not found", logs.output[0])
+        self.assertEqual(count, 3)
+        self.assertEqual(rows[0]["drug"], {"name": "TWO", "id": "CHEMBL2", "maximumClinicalTrialPhase": None})
+
+
+class BackendSelectionTests(SimpleTestCase):
+    def test_unknown_backend_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            fetch_lookups([("disease_known_drugs", "EFO_1")], backend="ftp")
+
+    def test_release_requires_pyarrow(self) -> None:
+        with patch.object(open_targets_store, "pq", None), self.assertRaises(RuntimeError):
+            OpenTargetsRelease("/nonexistent")
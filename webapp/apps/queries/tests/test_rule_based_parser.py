@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from django.test import SimpleTestCase
+
+from query_parser.rule_based_parser import FIELDS, rule_based_parse
+
+
+class RuleBasedParserTests(SimpleTestCase):
+    def test_parses_simple_trial_query_confidently(self) -> None:
+        parse = rule_based_parse("phase 2 breast cancer trials recruiting in Germany")
+
+        self.assertTrue(parse.confident)
+        self.assertEqual(set(parse.fields), set(FIELDS))
+        self.assertEqual(parse.fields["Condition/Disease"], "breast cancer")
+        self.assertEqual(parse.fields["Phase"], "Phase 2")
+        self.assertEqual(parse.fields["Status"], "recruiting")
+        self.assertEqual(parse.fields["Location"], "Germany")
+        self.assertIsNone(parse.fields["Intervention/Treatment/Drug"])
+
+    def test_extracts_dates_facilities_and_phase_ranges(self) -> None:
+        parse = rule_based_parse("Phase I/II melanoma studies at Mayo Clinic from 2019 to 2021")
+
+        self.assertTrue(parse.confident)
+        self.assertEqual(parse.fields["Phase"], "Phase 1 / Phase 2")
+        self.assertEqual(parse.fields["Facility Name"], "Mayo Clinic")
+        self.assertEqual(parse.fields["Date Range"], "from 2019 to 2021")
+
+    def test_fills_open_targets_entities(self) -> None:
+        parse = rule_based_parse("Breast cancer drugs targeting BRCA1 such as olaparib")
+
+        self.assertTrue(parse.confident)
+        self.assertEqual(parse.entities, {"drug": ["olaparib"], "disease": ["breast cancer"], "target": ["BRCA1"]})
+
+    def test_nct_ids_are_collected(self) -> None:
+        parse = rule_based_parse("show nct01234567 and NCT07654321")
+
+        self.assertEqual(parse.fields["Study IDs/NCT IDs"], "NCT01234567, NCT07654321")
+        self.assertTrue(parse.confident)
+
+    def test_unexplained_words_lower_confidence(self) -> None:
+        parse = rule_based_parse("What are the long-term cardiovascular outcomes of semaglutide?")
+
+        self.assertFalse(parse.confident)
+        self.assertIn("cardiovascular", parse.unmatched)
+
+    def test_no_subject_means_no_confidence(self) -> None:
+        self.assertEqual(rule_based_parse("recruiting trials in Germany").confidence, 0.0)
+
+    def test_gene_symbols_must_be_upper_case(self) -> None:
+        parse = rule_based_parse("breast cancer trials that met the kit criteria")
+
+        self.assertEqual(parse.entities["target"], [])
+        self.assertFalse(parse.confident)
+
+    def test_single_unexplained_word_in_a_long_query_is_not_confident(self) -> None:
+        parse = rule_based_parse("completed phase 3 trials of metformin for diabetes that failed in Germany")
+
+        self.assertFalse(parse.confident)
+        self.assertEqual(parse.unmatched, ["failed"])
+
+    def test_negated_queries_fall_through(self) -> None:
+        for query in (
+            "phase 2 breast cancer trials not recruiting in Germany in 2020",
+            "recruiting phase 2 breast cancer trials in Germany without tamoxifen",
+        ):
+            with self.subTest(query=query):
+                parse = rule_based_parse(query)
+                self.assertFalse(parse.confident)
+                self.assertTrue(parse.negations)
+
+    def test_negation_inside_a_status_is_understood(self) -> None:
+        parse = rule_based_parse("breast cancer trials not yet recruiting in Germany")
+
+        self.assertTrue(parse.confident)
+        self.assertEqual(parse.fields["Status"], "not yet recruiting")
+
+    def test_open_label_is_not_a_status(self) -> None:
+        parse = rule_based_parse("open label phase 3 trials of pembrolizumab in melanoma in the United States")
+
+        self.assertIsNone(parse.fields["Status"])
+        self.assertFalse(parse.confident)
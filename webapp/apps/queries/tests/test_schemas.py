@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from query_parser import open_targets_query_parser
+from query_parser.open_targets_query_parser import QueryParser
+from query_parser.schemas import (
+    TRIAL_FIELDS,
+    decode_json_object,
+    validate_entities,
+    validate_trial_fields,
+)
+from retriever.Clinical_Trials_Retriever_Agent import parse_date_range
+from utils import llm_gateway
+
+
+class _DictCache(dict):
+    def set(self, key, value, expire=None):
+        self[key] = value
+
+
+class SchemaValidationTests(SimpleTestCase):
+    def test_decode_accepts_only_a_json_object(self) -> None:
+        self.assertEqual(decode_json_object('{"drug": []}'), {"drug": []})
+        self.assertIsNone(decode_json_object('["drug"]'))
+        self.assertIsNone(decode_json_object('```json\n{"drug": []}\n```'))
+        self.assertIsNone(decode_json_object(""))
+
+    def test_trial_fields_are_completed_and_coerced(self) -> None:
+        fields = validate_trial_fields({"Phase": ["Phase 2", "Phase 3"], "Location": "N/A"})
+
+        self.assertEqual(tuple(fields), TRIAL_FIELDS)
+        self.assertEqual(fields["Phase"], "Phase 2, Phase 3")
+        self.assertIsNone(fields["Location"])
+
+    def test_structured_date_ranges_keep_both_bounds(self) -> None:
+        cases = [
+            ({"start": "2015", "end": "2020"}, ("2015-01-01", "2020-12-31")),
+            (["2015", "2020"], ("2015-01-01", "2020-12-31")),
+            ({"from": "2018-06", "to": None}, ("2018-06-01", "MAX")),
+            ({"start": "null", "end": "2019"}, ("MIN", "2019-12-31")),
+        ]
+        for value, expected in cases:
+            with self.subTest(value=value):
+                fields = validate_trial_fields({"Date Range": value})
+                self.assertEqual(parse_date_range(fields["Date Range"]), expected)
+
+    def test_location_objects_are_joined_on_their_values(self) -> None:
+        fields = validate_trial_fields({"Location": {"city": "Boston", "country": "USA"}})
+
+        self.assertEqual(fields["Location"], "Boston, USA")
+
+    def test_unrelated_objects_are_rejected(self) -> None:
+        self.assertIsNone(validate_trial_fields({"answer": "melanoma"}))
+        self.assertIsNone(validate_entities({"answer": "melanoma"}))
+
+    def test_entities_become_string_lists(self) -> None:
+        entities = validate_entities({"drug": "olaparib", "disease": None, "target": ["BRCA1", ""]})
+
+        self.assertEqual(entities, {"drug": ["olaparib"], "disease": [], "target": ["BRCA1"]})
+
+
+class ParseEntitiesTests(SimpleTestCase):
+    QUERY = "Which compounds modulate autophagy in neurodegeneration?"
+
+    def setUp(self) -> None:
+        self.cache = _DictCache()
+        patcher = patch.object(open_targets_query_parser, "get_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Keep gateway slots and metrics out of the developer's disk cache.
+        gateway = patch.object(llm_gateway, "get_cache", return_value=None)
+        gateway.start()
+        self.addCleanup(gateway.stop)
+        llm_gateway._reset()
+        self.addCleanup(llm_gateway._reset)
+
+    def _parse(self, reply: str):
+        chain = MagicMock()
+        chain.run.return_value = reply
+        with patch.object(QueryParser, "chain_for", return_value=chain):
+            return QueryParser().parse_entities(self.QUERY)
+
+    def test_valid_reply_is_validated_and_cached(self) -> None:
+        entities = self._parse('{"drug": [], "disease": "neurodegeneration"}')
+
+        self.assertEqual(entities, {"drug": [], "disease": ["neurodegeneration"], "target": []})
+        self.assertEqual(list(self.cache.values()), [entities])
+
+    def test_invalid_reply_returns_none(self) -> None:
+        self.assertIsNone(self._parse("I could not find any entities."))
+        self.assertEqual(self.cache, {})
@@ -3,7 +3,7 @@ from __future__ import annotations
 import pandas as pd
 from django.test import SimpleTestCase
 
-from apps.queries.services import normalize_results
+from apps.queries.services import normalize_results, summarize_result_meta
 
 
 class NormalizeResultsTests(SimpleTestCase):
@@ -61,3 +61,23 @@ class NormalizeResultsTests(SimpleTestCase):
         fields = {item['label']: item['value'] for item in entry['fields']}
         self.assertEqual(fields['Mechanism'], 'Inhibitor')
         self.assertEqual(fields['Score'], '0.82')
+
+
+class SummarizeResultMetaTests(SimpleTestCase):
+    def test_reports_truncated_sources(self) -> None:
+        trials = pd.DataFrame([{'NCT Number': 'NCT1'}, {'NCT Number': 'NCT2'}])
+        trials.attrs.update({'source': 'ClinicalTrials.gov', 'total_count': 1200, 'truncated': True})
+        targets = pd.DataFrame([{'target.id': 'ENSG1'}])
+        targets.attrs.update({'source': 'Open Targets targets', 'total_count': 1, 'truncated': False})
+
+        meta = summarize_result_meta([trials, [targets], {'name': 'ignored'}])
+
+        self.assertTrue(meta['truncated'])
+        self.assertEqual(
+            meta['sources']['ClinicalTrials.gov'],
+            {'returned': 2, 'total': 1200, 'truncated': True},
+        )
+        self.assertFalse(meta['sources']['Open Targets targets']['truncated'])
+
+    def test_uncapped_results_are_not_truncated(self) -> None:
+        self.assertEqual(summarize_result_meta([pd.DataFrame()]), {'truncated': False, 'sources': {}})
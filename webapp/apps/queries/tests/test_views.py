@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import tempfile
 from datetime import timedelta
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 from django.contrib.auth import get_user_model
@@ -8,7 +10,7 @@ from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
-from apps.queries.models import Query, QueryTemplate
+from apps.queries.models import Query, QueryArtifact, QueryTemplate
 
 
 class DashboardViewTests(TestCase):
@@ -109,6 +111,35 @@ class DashboardViewTests(TestCase):
         self.assertEqual(response['Content-Type'], 'text/csv')
         self.assertIn('ClinicalTrials.gov', response.content.decode())
 
+    def test_download_artifact_serves_stored_object(self) -> None:
+        query = Query.objects.create(user=self.user, text='Artifact query', status=Query.Status.SUCCESS)
+        artifact = QueryArtifact.objects.create(
+            query=query, name='merged_results.csv', sha256='ab' * 32, format='csv', size=8, row_count=1
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            stored = Path(tmp) / 'object.csv'
+            stored.write_text('drug\nX\n', encoding='utf-8')
+            with patch('apps.queries.views.artifact_file_path', return_value=stored):
+                response = self.client.get(reverse('queries:artifact', args=[query.id, artifact.id]))
+                content = b''.join(response.streaming_content)
+                response.close()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('query-%d-merged_results.csv' % query.id, response['Content-Disposition'])
+        self.assertEqual(content, b'drug\nX\n')
+
+        payload = self.client.get(reverse('queries:status', args=[query.id])).json()
+        self.assertEqual(payload['artifacts'][0]['name'], 'merged_results.csv')
+
+    def test_download_artifact_is_scoped_to_owner(self) -> None:
+        other = get_user_model().objects.create_user(username='bob', password='password123')
+        query = Query.objects.create(user=other, text='Private', status=Query.Status.SUCCESS)
+        artifact = QueryArtifact.objects.create(query=query, name='a.csv', sha256='cd' * 32, format='csv')
+
+        response = self.client.get(reverse('queries:artifact', args=[query.id, artifact.id]))
+
+        self.assertEqual(response.status_code, 404)
+
     @patch('apps.queries.views.process_query.delay')
     def test_rerun_query_clones_existing(self, mock_delay: MagicMock) -> None:
         original = Query.objects.create(user=self.user, text='Original query', tags=['a'])
@@ -128,7 +159,10 @@ class DashboardViewTests(TestCase):
         self.assertEqual(query.tags, ['one', 'two'])
 
     def test_pipeline_health_endpoint(self) -> None:
-        with patch('apps.queries.views.process_query') as mock_task, patch('apps.queries.views.requests.get') as mock_get:
+        with patch('apps.queries.views.process_query') as mock_task, \
+                patch('apps.queries.views.requests.get') as mock_get, \
+                patch('apps.queries.views.llm_gateway_metrics', return_value={'waiting': 0, 'in_flight': 1}), \
+                patch('apps.queries.views.open_targets_cache_stats', return_value={'hits': 3, 'misses': 1}):
             inspector = MagicMock()
             inspector.ping.return_value = {'worker': 'pong'}
             mock_task.app.control.inspect.return_value = inspector
@@ -142,6 +176,8 @@ class DashboardViewTests(TestCase):
             self.assertTrue(payload['celery_ok'])
             self.assertTrue(payload['checks']['clinical_trials'])
             self.assertTrue(payload['checks']['open_targets'])
+            self.assertEqual(payload['llm']['in_flight'], 1)
+            self.assertEqual(payload['open_targets_cache']['hits'], 3)
 
 
 @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
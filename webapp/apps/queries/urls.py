@@ -6,6 +6,7 @@ from .views import (
     create_template,
     delete_query,
     delete_template,
+    download_artifact,
     export_query_results,
     pipeline_health,
     query_status,
@@ -24,6 +25,7 @@ urlpatterns = [
     path('templates/create/', create_template, name='template-create'),
     path('templates/<int:pk>/delete/', delete_template, name='template-delete'),
     path('export/<int:pk>/', export_query_results, name='export'),
+    path('artifacts/<int:pk>/<int:artifact_pk>/', download_artifact, name='artifact'),
     path('health/', pipeline_health, name='health'),
     path('', DashboardView.as_view(), name='dashboard'),
 ]
@@ -5,18 +5,38 @@ import requests
 from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.decorators.http import require_POST
 from django.views.generic import FormView, TemplateView
 
 from .forms import QueryForm, QueryTemplateForm, SignUpForm
-from .models import Query, QueryTemplate
+from .models import Query, QueryArtifact, QueryTemplate
+from .services import artifact_file_path, llm_gateway_metrics, open_targets_cache_stats
 from .tasks import process_query
 
+ARTIFACT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+}
+
+
+def _artifact_payload(query: Query):
+    return [
+        {
+            'name': artifact.name,
+            'format': artifact.format,
+            'size': artifact.size,
+            'rows': artifact.row_count,
+            'url': reverse('queries:artifact', args=[query.pk, artifact.pk]),
+        }
+        for artifact in query.artifacts.all()
+    ]
+
 
 class SignUpView(FormView):
     template_name = 'registration/signup.html'
@@ -40,7 +60,9 @@ class DashboardView(TemplateView):
         context['template_form'] = QueryTemplateForm()
 
         queries = list(
-            Query.objects.filter(user=self.request.user).order_by('-created_at')
+            Query.objects.filter(user=self.request.user)
+            .prefetch_related('artifacts')
+            .order_by('-created_at')
         )
         context['queries_payload'] = [
             {
@@ -51,6 +73,8 @@ class DashboardView(TemplateView):
                 'classification': query.classification,
                 'resolution': query.resolution,
                 'results': query.result_data or [],
+                'result_meta': query.result_meta or {},
+                'artifacts': _artifact_payload(query),
                 'error': query.error_message,
                 'progress': query.progress,
                 'stage': query.stage,
@@ -129,6 +153,8 @@ def query_status(request, pk: int):
         'resolution': query.resolution,
         'text': query.text,
         'results': query.result_data or [],
+        'result_meta': query.result_meta or {},
+        'artifacts': _artifact_payload(query),
         'error': query.error_message,
         'created_at': query.created_at.strftime('%Y-%m-%d %H:%M:%S'),
         'progress': query.progress,
@@ -236,6 +262,20 @@ def export_query_results(request, pk: int):
     return response
 
 
+@login_required
+def download_artifact(request, pk: int, artifact_pk: int):
+    artifact = get_object_or_404(QueryArtifact, pk=artifact_pk, query__pk=pk, query__user=request.user)
+    path = artifact_file_path(artifact.sha256, artifact.format)
+    if not path.exists():
+        raise Http404('Artifact is no longer available.')
+    return FileResponse(
+        open(path, 'rb'),
+        as_attachment=True,
+        filename=f'query-{pk}-{artifact.name}',
+        content_type=ARTIFACT_CONTENT_TYPES.get(artifact.format, 'application/octet-stream'),
+    )
+
+
 @login_required
 def pipeline_health(request):
     celery_ok = True
@@ -265,10 +305,22 @@ def pipeline_health(request):
             checks[name] = False
             checks[f'{name}_error'] = str(exc)
 
+    try:
+        llm_metrics = llm_gateway_metrics()
+    except Exception as exc:  # pragma: no cover - metrics are informational
+        llm_metrics = {'error': str(exc)}
+
+    try:
+        open_targets_cache = open_targets_cache_stats()
+    except Exception as exc:  # pragma: no cover - metrics are informational
+        open_targets_cache = {'error': str(exc)}
+
     payload = {
         'timestamp': timezone.now().isoformat(),
         'celery_ok': celery_ok,
         'celery_error': celery_error,
         'checks': checks,
+        'llm': llm_metrics,
+        'open_targets_cache': open_targets_cache,
     }
     return JsonResponse(payload)
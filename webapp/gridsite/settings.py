@@ -94,3 +94,28 @@ CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/
 CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
 CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'False').lower() in {'1', 'true', 'yes'}
 CELERY_TASK_EAGER_PROPAGATES = True
+
+# Hourly incremental refresh of the local ClinicalTrials.gov mirror (run `celery -A gridsite beat`).
+CELERY_BEAT_SCHEDULE = {
+    'sync-trials-mirror': {
+        'task': 'apps.queries.tasks.sync_trials_mirror',
+        'schedule': float(os.environ.get('GRID_CLINICAL_TRIALS_SYNC_INTERVAL', '3600')),
+    },
+    # Liveness ping that also keeps the Ollama model loaded between queries.
+    'ping-llm': {
+        'task': 'apps.queries.tasks.ping_llm',
+        'schedule': float(os.environ.get('GRID_LLM_PING_INTERVAL', '240')),
+    },
+}
+
+# Maximum number of results each source may contribute to a stored query.
+GRID_RESULT_BUDGETS = {
+    'clinical_trials': int(os.environ.get('GRID_CLINICAL_TRIALS_MAX_RESULTS', '500')),
+    'open_targets': int(os.environ.get('GRID_OPEN_TARGETS_MAX_RESULTS', '200')),
+}
+
+# How web-triggered queries write their CSV/Parquet artifacts: 'async' keeps the
+# writes off the task's critical path, 'off' skips them, 'sync' blocks on them.
+GRID_ARTIFACT_MODE = os.environ.get('GRID_WEB_ARTIFACT_MODE', 'async')
+# Seconds a finished task waits for its background artifact writes before linking them.
+GRID_ARTIFACT_LINK_TIMEOUT = float(os.environ.get('GRID_ARTIFACT_LINK_TIMEOUT', '60'))